@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+主持人抽取器 benchmark：舊版 regex 實作 vs host_extractor
+用法：
+  python3 bench_host_extractor.py [corpus_dir] [--from-cache] [--rounds N]
+  --from-cache  先將 HTTP cache 入面嘅集數頁面匯出到 corpus_dir
+每個頁面都會比對兩個實作嘅結果，唔一致會列出嚟（exit code 1）
+"""
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import time
+
+import host_extractor
+
+BASE_DIR = os.environ.get('RTHK_PODCAST_DIR', os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CORPUS_DIR = os.path.join(BASE_DIR, 'bench', 'episode_pages')
+ALLOWED_HOSTS = ['蘇奭', '邱逸', '馬鼎盛', '馮天樂', '岑逸飛']
+
+
+def clean_html(text):
+    return re.sub(r'<[^>]+>', '', text).strip()
+
+
+def legacy_analyse(text):
+    """run_update.check_host_qualification 舊版（regex）實作"""
+    ep_hosts = []
+    ep_guests = []
+    programme_hosts = []
+
+    pop_match = re.search(r'popEpiTit.*?</div>\s*</div>\s*</div>', text, re.DOTALL)
+    if pop_match:
+        section = pop_match.group(0)
+        epidesc_match = re.search(r'epidesc.*?</div>', section, re.DOTALL)
+        if epidesc_match:
+            epidesc = epidesc_match.group(0)
+            ep_hosts = [clean_html(h) for h in re.findall(r'(?<![人])主持[：:]([^\n<\r]+)', epidesc) if clean_html(h)]
+            ep_guests = [clean_html(g) for g in re.findall(r'嘉賓[：:]([^\n<\r]+)', epidesc) if clean_html(g)]
+        programme_hosts = [clean_html(h) for h in re.findall(r'主持人[：:]([^\n<\r]+)', section) if clean_html(h)]
+
+    check_people = (ep_hosts + ep_guests) if ep_hosts else programme_hosts
+    matched = [h for h in ALLOWED_HOSTS if any(h in p for p in check_people)]
+    return {'qualify': len(matched) > 0, 'matched': matched, 'hosts': ep_hosts, 'guests': ep_guests}
+
+
+def export_from_cache(corpus_dir):
+    """將 http_cache 入面 /episode/ 頁面寫成 <ep_id>.html"""
+    import http_cache
+    os.makedirs(corpus_dir, exist_ok=True)
+    count = 0
+    for meta_path in glob.glob(os.path.join(http_cache.HTTP_CACHE_DIR, '*.json')):
+        try:
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            continue
+        m = re.search(r'/episode/(\d+)$', meta.get('url', ''))
+        if not m:
+            continue
+        with open(meta_path[:-5] + '.body', 'rb') as f:
+            body = f.read()
+        with open(os.path.join(corpus_dir, f'{m.group(1)}.html'), 'wb') as f:
+            f.write(body.decode(meta.get('encoding') or 'utf-8', errors='replace').encode('utf-8'))
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('corpus_dir', nargs='?', default=DEFAULT_CORPUS_DIR)
+    parser.add_argument('--from-cache', action='store_true')
+    parser.add_argument('--rounds', type=int, default=20)
+    args = parser.parse_args()
+
+    if args.from_cache:
+        print(f'由 HTTP cache 匯出 {export_from_cache(args.corpus_dir)} 個頁面到 {args.corpus_dir}')
+
+    pages = {}
+    for path in sorted(glob.glob(os.path.join(args.corpus_dir, '*.html'))):
+        with open(path, 'r', encoding='utf-8', errors='replace') as f:
+            pages[os.path.basename(path)] = f.read()
+    if not pages:
+        print(f'{args.corpus_dir} 冇頁面；先跑一次 run_update.py 再用 --from-cache 匯出')
+        return 2
+
+    matcher = host_extractor.HostMatcher(ALLOWED_HOSTS)
+    mismatches = []
+    for name, html in pages.items():
+        new = host_extractor.analyse(html, matcher)
+        new = {k: new[k] for k in ('qualify', 'matched', 'hosts', 'guests')}
+        old = legacy_analyse(html)
+        if new != old:
+            mismatches.append((name, old, new))
+
+    def timed(fn):
+        t0 = time.perf_counter()
+        for _ in range(args.rounds):
+            for html in pages.values():
+                fn(html)
+        return (time.perf_counter() - t0) / (args.rounds * len(pages))
+
+    legacy_t = timed(legacy_analyse)
+    new_t = timed(lambda html: host_extractor.analyse(html, matcher))
+    total_kb = sum(len(h.encode('utf-8')) for h in pages.values()) / 1024
+
+    print(f'頁面: {len(pages)} 個（共 {total_kb:.0f}KB），每個跑 {args.rounds} 次')
+    print(f'舊版 regex:      {legacy_t * 1000:.3f} ms/頁')
+    print(f'host_extractor: {new_t * 1000:.3f} ms/頁（{legacy_t / new_t if new_t else 0:.1f}x）')
+    if mismatches:
+        print(f'❌ {len(mismatches)} 個頁面結果唔一致：')
+        for name, old, new in mismatches:
+            print(f'  {name}\n    舊: {old}\n    新: {new}')
+        return 1
+    print('✅ 所有頁面結果一致')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
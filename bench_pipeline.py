@@ -0,0 +1,330 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+端到端 pipeline benchmark：run_update → generate_rss → publish_github 對住本地 stand-in 跑
+（RTHK / IA S3 / GitHub，見 bench_standins.py），唔會掂真正嘅網站
+用法：
+  python3 bench_pipeline.py [--sizes 10,100,1000,5000] [--new 10] [--mode pipeline|sequential|stream]
+                            [--latency-ms 20] [--bandwidth-kbps 0] [--segments 4] [--segment-kb 320] [--variants 64]
+                            [--publish batch|contents] [--runner scripts|all]
+                            [--output result.json] [--baseline baseline.json]
+每個 archive 大小：stand-in 列出 N 集，其中最新 --new 集未上傳，其餘已喺 ia_mapping；
+last_checked 設喺最舊一集之前，即係成個 archive 都要掃一次
+報告：每個步驟嘅總用時、每個 stage 嘅延遲百分位（由 stand-in 伺服器一方量度）、每集搬幾多 bytes
+ffmpeg 預設用一個直接複製 bytes 嘅 shim（stand-in 嘅 segments 唔係真音頻）；--ffmpeg 可以改用真 ffmpeg
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import bench_standins
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+PUBLISHED_SOURCES = ['run_update.py', 'publish_github.py']
+STAGES = ['discover', 'qualify', 'resolve', 'download', 'upload', 'episode', 'publish']
+PERCENTILES = [50, 90, 99]
+
+FFMPEG_SHIM = '''#!/usr/bin/env python3
+# benchmark 用：將 -i 嘅輸入原封不動複製到每個輸出（支援 pipe:0 / pipe:1）；
+# 多過一個輸出時，後面嘅輸出按 -b:a 同第一個輸出嘅比例截短，模擬細檔 variant
+import shutil, sys
+args = sys.argv[1:]
+i = args.index('-i')
+src = args[i + 1]
+fin = sys.stdin.buffer if src in ('pipe:0', '-') else open(src, 'rb')
+outputs, bitrate = [], None
+for prev, arg in zip(args[i + 1:], args[i + 2:]):
+    if prev == '-b:a':
+        bitrate = int(arg.rstrip('k'))
+    elif not arg.startswith('-') and not prev.startswith('-'):
+        outputs.append((arg, bitrate))
+        bitrate = None
+if len(outputs) == 1:
+    dst = outputs[0][0]
+    fout = sys.stdout.buffer if dst in ('pipe:1', '-') else open(dst, 'wb')
+    shutil.copyfileobj(fin, fout, 1 << 20)
+else:
+    data = fin.read()
+    base = outputs[0][1]
+    for dst, rate in outputs:
+        with open(dst, 'wb') as fout:
+            fout.write(data[:len(data) * rate // base] if rate and base else data)
+'''
+
+
+def percentile(values, p):
+    """nearest-rank 百分位"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+
+
+def summarise(values):
+    if not values:
+        return {'count': 0}
+    out = {'count': len(values)}
+    for p in PERCENTILES:
+        out[f'p{p}'] = round(percentile(values, p) * 1000, 1)
+    out['max'] = round(max(values) * 1000, 1)
+    return out
+
+
+def stage_latencies(records):
+    """由 stand-in 請求記錄計每個 stage 嘅延遲（秒）"""
+    per_request = {'discover': [], 'qualify': [], 'publish': []}
+    spans = {}
+    for server, route, ep_id, start, end, _, _ in records:
+        if route in ('programme', 'month'):
+            per_request['discover'].append(end - start)
+        elif route.startswith('gh_'):
+            per_request['publish'].append(end - start)
+        elif route == 'episode':
+            per_request['qualify'].append(end - start)
+        if not ep_id:
+            continue
+        stage = {'episode': 'qualify', 'get_episode': 'resolve', 'playlist': 'resolve',
+                 'segment': 'download'}.get(route, 'upload' if server == 'ia' else None)
+        if stage is None:
+            continue
+        ep = spans.setdefault(ep_id, {})
+        s, e = ep.get(stage, (start, end))
+        ep[stage] = (min(s, start), max(e, end))
+
+    result = dict(per_request)
+    for stage in ('resolve', 'download', 'upload'):
+        result[stage] = [ep[stage][1] - ep[stage][0] for ep in spans.values() if stage in ep]
+    # 一集由抓集數頁面到上傳完成
+    result['episode'] = [ep['upload'][1] - ep['qualify'][0] for ep in spans.values()
+                         if 'qualify' in ep and 'upload' in ep]
+    return {stage: summarise(result[stage]) for stage in STAGES}
+
+
+def byte_totals(records):
+    totals = {}
+    for server, _, _, _, _, bytes_in, bytes_out in records:
+        t = totals.setdefault(server, {'in': 0, 'out': 0})
+        t['in'] += bytes_in
+        t['out'] += bytes_out
+    return totals
+
+
+def seed_workdir(workdir, episodes, new):
+    """已上傳嘅集數寫入 ia_mapping；last_checked 設喺最舊一集前一日"""
+    mapping = {}
+    for ep in episodes[new:]:
+        item_id = f'rthk-jiang-dong-jiang-xi-{ep["id"]}'
+        mapping[ep['id']] = {
+            'item_id': item_id,
+            'url': f'https://archive.org/download/{item_id}/{ep["id"]}_0.mp3',
+            'size': 50000000,
+            'title': ep['title'],
+            'date': ep['date'],
+        }
+    oldest = datetime.strptime(episodes[-1]['date'], '%d/%m/%Y') - timedelta(days=1)
+    with open(os.path.join(workdir, 'ia_mapping.json'), 'w', encoding='utf-8') as f:
+        json.dump(mapping, f, ensure_ascii=False, indent=2)
+    with open(os.path.join(workdir, 'last_checked.json'), 'w', encoding='utf-8') as f:
+        json.dump({'last_checked_date': oldest.strftime('%d/%m/%Y')}, f)
+    for name in PUBLISHED_SOURCES:
+        shutil.copy(os.path.join(REPO_DIR, name), workdir)
+
+
+def run_step(name, argv, env, workdir, log):
+    t0 = time.monotonic()
+    rc = subprocess.run([sys.executable] + argv, cwd=workdir, env=env,
+                        stdout=log, stderr=subprocess.STDOUT).returncode
+    elapsed = time.monotonic() - t0
+    if rc != 0:
+        print(f'  ⚠️  {name} exit={rc}（見 {log.name}）')
+    return {'seconds': round(elapsed, 3), 'returncode': rc}
+
+
+def bench_size(size, args):
+    episodes = bench_standins.make_episodes(size)
+    new = min(args.new, size)
+    metrics = bench_standins.Metrics()
+    servers = bench_standins.start_all(episodes, metrics, latency=args.latency_ms / 1000,
+                                       bandwidth=args.bandwidth_kbps * 1024,
+                                       segments=args.segments, segment_size=args.segment_kb * 1024,
+                                       variants=[int(v) for v in args.variants.split(',')])
+    workdir = tempfile.mkdtemp(prefix=f'rthk-bench-{size}-')
+    try:
+        seed_workdir(workdir, episodes, new)
+        ffmpeg = args.ffmpeg
+        if not ffmpeg:
+            ffmpeg = os.path.join(workdir, 'ffmpeg-shim')
+            with open(ffmpeg, 'w') as f:
+                f.write(FFMPEG_SHIM)
+            os.chmod(ffmpeg, 0o755)
+
+        env = dict(os.environ)
+        env.update({
+            'RTHK_PODCAST_DIR': workdir,
+            'RTHK_STATS_FILE': os.path.join(workdir, 'stats.json'),
+            'RTHK_PROM_FILE': os.path.join(workdir, 'rthk_update.prom'),
+            'RTHK_BASE_URL': servers['rthk'].url,
+            'RTHK_AOD_PREFIX': f'{servers["rthk"].url}/aod',
+            'IA_S3_ENDPOINT': servers['ia'].url,
+            'IA_METADATA_ENDPOINT': f'{servers["ia"].url}/metadata',
+            'IA_ACCESS_KEY': 'bench',
+            'IA_SECRET_KEY': 'bench',
+            'GITHUB_API_URL': servers['github'].url,
+            'GITHUB_TOKEN': 'bench',
+            'FFMPEG_BIN': ffmpeg,
+            'RTHK_PIPELINE': '0' if args.mode == 'sequential' else '1',
+            'RTHK_STREAM': '1' if args.mode == 'stream' else '0',
+            'GITHUB_PUBLISH_MODE': args.publish,
+            'TRANSCODE_VARIANTS': args.transcode_variants,
+        })
+
+        steps = {}
+        with open(os.path.join(workdir, 'bench.log'), 'w') as log:
+            # 準備：先生成一次 feed 同推一次檔案（唔計時），等 benchmark 量到日常增量更新
+            run_step('rss', [os.path.join(REPO_DIR, 'generate_rss.py'), '--incremental'], env, workdir, log)
+            run_step('publish', [os.path.join(REPO_DIR, 'publish_github.py')], env, workdir, log)
+            metrics.reset()
+
+            t0 = time.monotonic()
+            if args.runner == 'all':
+                steps['all'] = run_step('all', [os.path.join(REPO_DIR, 'podcast.py'), 'all'], env, workdir, log)
+            else:
+                steps['update'] = run_step('update', [os.path.join(REPO_DIR, 'run_update.py')], env, workdir, log)
+                steps['rss'] = run_step('rss', [os.path.join(REPO_DIR, 'generate_rss.py'), '--incremental'],
+                                        env, workdir, log)
+                steps['publish'] = run_step('publish', [os.path.join(REPO_DIR, 'publish_github.py')],
+                                            env, workdir, log)
+            wall = time.monotonic() - t0
+
+        try:
+            with open(os.path.join(workdir, 'stats.json'), 'r', encoding='utf-8') as f:
+                stats = json.load(f)
+        except (OSError, ValueError):
+            stats = {}
+        records = metrics.snapshot()
+        bytes_by_server = byte_totals(records)
+        total_bytes = sum(t['in'] + t['out'] for t in bytes_by_server.values())
+        uploaded = stats.get('uploaded', 0)
+        result = {
+            'size': size,
+            'new': new,
+            'mode': args.mode,
+            'wall_seconds': round(wall, 3),
+            'steps': steps,
+            'uploaded': uploaded,
+            'failed': stats.get('failed', 0),
+            'requests': len(records),
+            'requests_by_server': {name: sum(1 for r in records if r[0] == name) for name in servers},
+            'bytes': bytes_by_server,
+            'bytes_per_episode': round(total_bytes / size),
+            'bytes_per_new_episode': round(total_bytes / uploaded) if uploaded else None,
+            'stages_ms': stage_latencies(records),
+        }
+
+        # 冇新集數嘅重跑（最常見嘅每晚情況）：應該只有快速檢查，唔寫任何狀態檔
+        watched = ['ia_mapping.json', 'last_checked.json', 'discovery_index.json', 'feed.xml', 'stats.json']
+        before = {n: os.path.getmtime(os.path.join(workdir, n)) for n in watched
+                  if os.path.exists(os.path.join(workdir, n))}
+        metrics.reset()
+        with open(os.path.join(workdir, 'bench.log'), 'a') as log:
+            rerun = run_step('rerun', [os.path.join(REPO_DIR, 'podcast.py'), 'all'], env, workdir, log)
+        rerun['requests'] = len(metrics.snapshot())
+        rerun['writes'] = sorted(n for n, t in before.items()
+                                 if os.path.getmtime(os.path.join(workdir, n)) != t)
+        result['noop_rerun'] = rerun
+        if args.keep:
+            result['workdir'] = workdir
+        return result
+    finally:
+        for server in servers.values():
+            server.stop()
+        if not args.keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+
+def fmt_ms(s):
+    if not s.get('count'):
+        return '-'
+    return f'{s["p50"]:.0f}/{s["p90"]:.0f}/{s["p99"]:.0f}'
+
+
+def print_report(results, baseline=None):
+    base = {(r['size'], r['mode']): r for r in (baseline or [])}
+    print()
+    print(f'{"集數":>6} {"新":>4} {"用時s":>8} {"update":>8} {"rss":>6} {"publish":>8} '
+          f'{"上傳/失敗":>9} {"請求":>7} {"bytes/集":>10} {"bytes/新集":>11}  vs baseline')
+    for r in results:
+        b = base.get((r['size'], r['mode']))
+        delta = f'{(r["wall_seconds"] / b["wall_seconds"] - 1) * 100:+.1f}%' if b and b['wall_seconds'] else ''
+        per_new = f'{r["bytes_per_new_episode"]:,}' if r['bytes_per_new_episode'] else '-'
+        # podcast.py all 只有一個步驟，分唔開 update / rss / publish
+        step = {k: f'{v["seconds"]:.2f}' for k, v in r['steps'].items()}
+        print(f'{r["size"]:>6} {r["new"]:>4} {r["wall_seconds"]:>8.2f} {step.get("update", "-"):>8} '
+              f'{step.get("rss", "-"):>6} {step.get("publish", "-"):>8} '
+              f'{r["uploaded"]:>4}/{r["failed"]:<4} {r["requests"]:>7} {r["bytes_per_episode"]:>10,} '
+              f'{per_new:>11}  {delta}')
+    print()
+    print('冇新集數重跑：' + '；'.join(
+        f'{r["size"]} 集 {r["noop_rerun"]["seconds"]:.2f}s / {r["noop_rerun"]["requests"]} 個請求'
+        f'{" / 改咗 " + ",".join(r["noop_rerun"]["writes"]) if r["noop_rerun"]["writes"] else ""}'
+        for r in results))
+    print()
+    print('stage 延遲 p50/p90/p99 (ms)')
+    print(f'{"集數":>6} ' + ' '.join(f'{s:>16}' for s in STAGES))
+    for r in results:
+        print(f'{r["size"]:>6} ' + ' '.join(f'{fmt_ms(r["stages_ms"][s]):>16}' for s in STAGES))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', default='10,100,1000,5000', help='archive 集數（逗號分隔）')
+    parser.add_argument('--new', type=int, default=10, help='每個 archive 入面未上傳嘅集數')
+    parser.add_argument('--mode', choices=['pipeline', 'sequential', 'stream'], default='pipeline')
+    parser.add_argument('--latency-ms', type=float, default=20, help='stand-in 每個請求嘅延遲')
+    parser.add_argument('--bandwidth-kbps', type=int, default=0, help='stand-in 每條連線頻寬 KB/s（0 = 唔限）')
+    parser.add_argument('--segments', type=int, default=4, help='每集 HLS segment 數')
+    parser.add_argument('--variants', default='64',
+                        help='HLS master playlist 嘅 variant kbps（逗號分隔；--segment-kb 係最低嗰個）')
+    parser.add_argument('--segment-kb', type=int, default=320, help='每個 segment 大小（每集最少要 1MB）')
+    parser.add_argument('--publish', choices=['batch', 'contents'], default='batch',
+                        help='publish_github 模式（GITHUB_PUBLISH_MODE）')
+    parser.add_argument('--transcode-variants', default='',
+                        help='TRANSCODE_VARIANTS（例如 speech：同一次轉檔額外出細檔 + feed-lite.xml）')
+    parser.add_argument('--runner', choices=['scripts', 'all'], default='scripts',
+                        help='scripts = 三個腳本逐個行；all = podcast.py all 一個 process 行晒')
+    parser.add_argument('--ffmpeg', help='用真 ffmpeg（預設用複製 bytes 嘅 shim）')
+    parser.add_argument('--output', help='結果寫入 JSON')
+    parser.add_argument('--baseline', help='同之前 --output 嘅結果比較')
+    parser.add_argument('--keep', action='store_true', help='保留工作目錄（睇 bench.log）')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+
+    results = []
+    for size in [int(s) for s in args.sizes.split(',') if s.strip()]:
+        print(f'▶ {size} 集（{args.mode}）...', flush=True)
+        results.append(bench_size(size, args))
+    print_report(results, baseline)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'created_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+                'settings': {k: v for k, v in vars(args).items() if k not in ('output', 'baseline')},
+                'results': results,
+            }, f, ensure_ascii=False, indent=2)
+        print(f'\n結果已寫入 {args.output}')
+    return 1 if any(r['failed'] or r['uploaded'] < r['new'] for r in results) else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+本地 stand-in HTTP 伺服器（benchmark 用），模仿：
+  RTHK    節目頁（月份選單）、catchUpByMonth、集數頁、getEpisode、HLS master/media playlist 同 segments
+  IA      S3 單次 PUT（包括 chunked，核對 Content-MD5）、multipart（initiate / part / complete）、metadata API
+  GitHub  Contents API（GET / PUT）同 Git Data API（ref / commit / tree / blob）
+每個伺服器都可以設定每個請求嘅延遲同頻寬上限，並記錄每個請求嘅
+(伺服器, 路由, 集數 ID, 開始, 結束, 收到 bytes, 送出 bytes)，俾 bench_pipeline.py 計每個 stage 嘅延遲
+"""
+import base64
+import hashlib
+import json
+import re
+import threading
+import time
+import uuid
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+CHANNEL = 'radio1'
+PROGRAMMES = ['Free_as_the_wind', 'free_as_the_wind_sunday']
+HOSTS = ['蘇奭', '邱逸', '馬鼎盛', '馮天樂', '岑逸飛']
+THROTTLE_CHUNK = 16 * 1024
+TS_SYNC_BYTE = b'\x47'
+
+
+def git_blob_sha(data):
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def make_episodes(count, end=None):
+    """
+    由 end（預設琴日）向前每日一集：星期日屬第二個 programme，星期六冇節目
+    返回 [{'id', 'date', 'title', 'programme', 'ym'}]，由新到舊
+    """
+    day = end or date.today() - timedelta(days=1)
+    episodes = []
+    ep_id = 2000000 + count * 2
+    while len(episodes) < count:
+        if day.weekday() != 5:
+            episodes.append({
+                'id': str(ep_id),
+                'date': day.strftime('%d/%m/%Y'),
+                'title': f'測試集數 {ep_id}',
+                'programme': PROGRAMMES[1] if day.weekday() == 6 else PROGRAMMES[0],
+                'ym': day.strftime('%Y%m'),
+            })
+            ep_id -= 1
+        day -= timedelta(days=1)
+    return episodes
+
+
+class Metrics:
+    def __init__(self):
+        self.records = []
+        self._lock = threading.Lock()
+
+    def add(self, server, route, ep_id, start, end, bytes_in, bytes_out):
+        with self._lock:
+            self.records.append((server, route, ep_id, start, end, bytes_in, bytes_out))
+
+    def reset(self):
+        with self._lock:
+            self.records = []
+
+    def snapshot(self):
+        with self._lock:
+            return list(self.records)
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    server_version = 'StandIn/1.0'
+
+    def log_message(self, *args):
+        pass
+
+    # ── 限速讀寫 ──
+    def _throttle(self, nbytes):
+        bandwidth = self.server.bandwidth
+        if bandwidth:
+            time.sleep(nbytes / bandwidth)
+
+    def read_body(self):
+        if self.headers.get('Transfer-Encoding', '').lower() == 'chunked':
+            chunks = []
+            while True:
+                size = int(self.rfile.readline().split(b';')[0].strip(), 16)
+                if size == 0:
+                    self.rfile.readline()
+                    break
+                chunks.append(self.rfile.read(size))
+                self.rfile.readline()
+                self._throttle(size)
+            data = b''.join(chunks)
+        else:
+            remaining = int(self.headers.get('Content-Length') or 0)
+            chunks = []
+            while remaining:
+                chunk = self.rfile.read(min(THROTTLE_CHUNK, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                chunks.append(chunk)
+                self._throttle(len(chunk))
+            data = b''.join(chunks)
+        self._bytes_in += len(data)
+        return data
+
+    def respond(self, status, body=b'', content_type='application/octet-stream', headers=None, length=None):
+        """length：HEAD 回應要報嘅 Content-Length（stand-in 冇儲存真正內容時用）"""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body) if length is None else length))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        if self.command == 'HEAD':
+            return
+        for i in range(0, len(body), THROTTLE_CHUNK):
+            chunk = body[i:i + THROTTLE_CHUNK]
+            self.wfile.write(chunk)
+            self._throttle(len(chunk))
+        self._bytes_out += len(body)
+
+    def _handle(self):
+        start = time.monotonic()
+        self._bytes_in = self._bytes_out = 0
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        url = urlsplit(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+        try:
+            route, ep_id = self.route(url.path, query)
+        except Exception as e:
+            self.respond(500, str(e), 'text/plain')
+            route, ep_id = 'error', None
+        self.server.metrics.add(self.server.name, route, ep_id, start, time.monotonic(),
+                                self._bytes_in, self._bytes_out)
+
+    do_GET = do_HEAD = do_PUT = do_POST = do_PATCH = do_DELETE = _handle
+
+    def route(self, path, query):
+        raise NotImplementedError
+
+
+class RTHKHandler(StandInHandler):
+    def route(self, path, query):
+        data = self.server.data
+        m = re.fullmatch(rf'/radio/{CHANNEL}/programme/([^/]+)', path)
+        if m:
+            months = sorted({ep['ym'] for ep in data['episodes'] if ep['programme'] == m.group(1)}, reverse=True)
+            options = ''.join(f'<option value="{ym}">{ym[:4]}年{ym[4:]}月</option>' for ym in months)
+            self.respond(200, f'<html><body><select class="selMonWrap">{options}</select></body></html>',
+                         'text/html; charset=utf-8')
+            return 'programme', None
+        if path == '/radio/catchUpByMonth':
+            content = [{'id': ep['id'], 'date': ep['date'], 'title': ep['title']}
+                       for ep in data['by_month'].get((query.get('p'), query.get('m')), [])]
+            self.respond(200, json.dumps({'status': '1', 'content': content}, ensure_ascii=False),
+                         'application/json; charset=utf-8')
+            return 'month', None
+        m = re.fullmatch(rf'/radio/{CHANNEL}/programme/[^/]+/episode/(\d+)', path)
+        if m:
+            ep_id = m.group(1)
+            host = HOSTS[int(ep_id) % len(HOSTS)]
+            page = ('<html><body><div class="popEpiTit"><h2>測試</h2>'
+                    f'<div class="epidesc">主持：{host}<br>嘉賓：測試嘉賓</div>\n</div>\n</div>'
+                    '<p>主持人：' + '、'.join(HOSTS) + '</p></body></html>')
+            self.respond(200, page, 'text/html; charset=utf-8')
+            return 'episode', ep_id
+        if path == '/radio/getEpisode':
+            ep_id = query.get('e', '')
+            base = self.server.aod_prefix
+            self.respond(200, json.dumps({
+                'status': '1',
+                'content': {'url': f'{base}/{ep_id}/master.m3u8'},
+            }), 'application/json')
+            return 'get_episode', ep_id
+        m = re.fullmatch(r'/aod/(\d+)/(master|media(?:_\d+)?)\.m3u8', path)
+        if m:
+            ep_id, kind = m.groups()
+            if kind == 'master':
+                body = '#EXTM3U\n' + ''.join(
+                    f'#EXT-X-STREAM-INF:BANDWIDTH={kbps * 1000},CODECS="mp4a.40.2"\nmedia_{kbps}.m3u8\n'
+                    for kbps in self.server.segment_bodies)
+            else:
+                kbps = int(kind.partition('_')[2] or min(self.server.segment_bodies))
+                lines = ['#EXTM3U', '#EXT-X-VERSION:3', '#EXT-X-TARGETDURATION:10', '#EXT-X-MEDIA-SEQUENCE:0']
+                for i in range(self.server.segments):
+                    lines += ['#EXTINF:10.0,', f'seg{i}_{kbps}.ts']
+                lines.append('#EXT-X-ENDLIST')
+                body = '\n'.join(lines) + '\n'
+            self.respond(200, body, 'application/vnd.apple.mpegurl')
+            return 'playlist', ep_id
+        m = re.fullmatch(r'/aod/(\d+)/seg\d+_(\d+)\.ts', path)
+        if m and int(m.group(2)) in self.server.segment_bodies:
+            self.respond(200, self.server.segment_bodies[int(m.group(2))], 'video/mp2t')
+            return 'segment', m.group(1)
+        self.respond(404, 'not found', 'text/plain')
+        return 'not_found', None
+
+
+class IAHandler(StandInHandler):
+    """objects：path → {'size', 'md5'}（唔儲存內容）；multipart 未完成前暫存 part 內容"""
+
+    def route(self, path, query):
+        m = re.fullmatch(r'/metadata/(rthk-jiang-dong-jiang-xi-(\d+))/files', path)
+        if m:
+            prefix = f'/{m.group(1)}/'
+            files = [{'name': p[len(prefix):], 'size': str(o['size']), 'md5': o['md5'], 'source': 'original'}
+                     for p, o in list(self.server.objects.items()) if p.startswith(prefix)]
+            self.respond(200, json.dumps({'result': files}), 'application/json')
+            return 'ia_metadata', m.group(2)
+        m = re.fullmatch(r'/rthk-jiang-dong-jiang-xi-(\d+)/[^/]+', path)
+        ep_id = m.group(1) if m else None
+        uploads = self.server.uploads
+        if self.command == 'POST' and 'uploads' in query:
+            self.read_body()
+            upload_id = uuid.uuid4().hex
+            uploads[upload_id] = {}
+            self.respond(200, f'<InitiateMultipartUploadResult><UploadId>{upload_id}</UploadId>'
+                              '</InitiateMultipartUploadResult>', 'application/xml')
+            return 'ia_initiate', ep_id
+        if self.command == 'POST' and 'uploadId' in query:
+            self.read_body()
+            parts = uploads.pop(query['uploadId'], None)
+            if parts is None:
+                self.respond(404, '<Error><Code>NoSuchUpload</Code></Error>', 'application/xml')
+            else:
+                ordered = [parts[n] for n in sorted(parts)]
+                whole = hashlib.md5(b''.join(ordered)).hexdigest()
+                joined = b''.join(hashlib.md5(p).digest() for p in ordered)
+                etag = f'{hashlib.md5(joined).hexdigest()}-{len(ordered)}'
+                self.server.objects[path] = {'size': sum(len(p) for p in ordered), 'md5': whole}
+                self.respond(200, f'<CompleteMultipartUploadResult><ETag>"{etag}"</ETag>'
+                                  '</CompleteMultipartUploadResult>', 'application/xml')
+            return 'ia_complete', ep_id
+        if self.command == 'DELETE':
+            # abort multipart（?uploadId=）或者刪 object
+            found = (uploads.pop(query['uploadId'], None) if 'uploadId' in query
+                     else self.server.objects.pop(path, None))
+            self.respond(204 if found is not None else 404, b'')
+            return 'ia_abort' if 'uploadId' in query else 'ia_delete', ep_id
+        if self.command == 'PUT':
+            data = self.read_body()
+            md5 = hashlib.md5(data)
+            route = 'ia_part' if 'uploadId' in query else 'ia_put'
+            expected = self.headers.get('Content-MD5')
+            if expected and expected != base64.b64encode(md5.digest()).decode('ascii'):
+                self.respond(400, '<Error><Code>BadDigest</Code></Error>', 'application/xml')
+                return route, ep_id
+            if 'uploadId' in query:
+                parts = uploads.get(query['uploadId'])
+                if parts is None:
+                    self.respond(404, '<Error><Code>NoSuchUpload</Code></Error>', 'application/xml')
+                    return route, ep_id
+                parts[int(query['partNumber'])] = data
+            else:
+                self.server.objects[path] = {'size': len(data), 'md5': md5.hexdigest()}
+            self.respond(200, b'', headers={'ETag': f'"{md5.hexdigest()}"'})
+            return route, ep_id
+        # archive.org/download/{item}/{file} 同 S3 路徑指向同一個 object
+        if path.startswith('/download/'):
+            path = path[len('/download'):]
+        if path in self.server.objects:
+            size = self.server.objects[path]['size']
+            if self.command == 'HEAD':
+                self.respond(200, b'', 'audio/mpeg', length=size)
+            else:
+                self.respond(200, b'\0' * size, 'audio/mpeg')
+        else:
+            self.respond(404, b'')
+        return 'ia_get', ep_id
+
+
+class FakeRepo:
+    """一個 branch 嘅最簡 git 模型：tree = {path: (mode, blob sha)}，commit = (tree sha, parents)"""
+
+    def __init__(self):
+        self.trees = {}
+        self.commits = {}
+        self.head = self.commit(self.store_tree({}), [])
+        self.lock = threading.Lock()
+
+    def store_tree(self, entries):
+        sha = hashlib.sha1(json.dumps(sorted(entries.items())).encode()).hexdigest()
+        self.trees[sha] = dict(entries)
+        return sha
+
+    def commit(self, tree_sha, parents):
+        sha = hashlib.sha1(f'{tree_sha}{parents}{uuid.uuid4()}'.encode()).hexdigest()
+        self.commits[sha] = {'tree': tree_sha, 'parents': parents}
+        return sha
+
+    def head_tree(self):
+        return self.trees[self.commits[self.head]['tree']]
+
+
+class GitHubHandler(StandInHandler):
+    def json_response(self, status, data):
+        self.respond(status, json.dumps(data), 'application/json')
+
+    def route(self, path, query):
+        repo = self.server.repo
+        m = re.fullmatch(r'/repos/[^/]+/[^/]+/(contents|git)/(.+)', path)
+        if not m:
+            self.json_response(404, {'message': 'Not Found'})
+            return 'gh_not_found', None
+        api, rest = m.groups()
+        body = json.loads(self.read_body() or b'{}') if self.command in ('POST', 'PUT', 'PATCH') else {}
+        with repo.lock:
+            if api == 'contents':
+                return self.contents(repo, rest, body)
+            return self.git_data(repo, rest, body)
+
+    def contents(self, repo, name, body):
+        files = repo.head_tree()
+        if self.command == 'PUT':
+            if name in files and body.get('sha') != files[name][1]:
+                self.json_response(409, {'message': 'sha mismatch'})
+                return 'gh_put', None
+            entries = dict(files)
+            entries[name] = ('100644', git_blob_sha(base64.b64decode(body.get('content', ''))))
+            repo.head = repo.commit(repo.store_tree(entries), [repo.head])
+            self.json_response(200, {'content': {'name': name, 'sha': entries[name][1]}})
+            return 'gh_put', None
+        if name not in files:
+            self.json_response(404, {'message': 'Not Found'})
+        else:
+            self.json_response(200, {'name': name, 'sha': files[name][1]})
+        return 'gh_get', None
+
+    def git_data(self, repo, rest, body):
+        if rest.startswith('ref/heads/') and self.command == 'GET':
+            self.json_response(200, {'object': {'sha': repo.head, 'type': 'commit'}})
+            return 'gh_ref', None
+        if rest.startswith('refs/heads/') and self.command == 'PATCH':
+            commit = repo.commits.get(body.get('sha'))
+            if commit is None or (repo.head not in commit['parents'] and not body.get('force')):
+                self.json_response(422, {'message': 'Update is not a fast forward'})
+            else:
+                repo.head = body['sha']
+                self.json_response(200, {'object': {'sha': repo.head}})
+            return 'gh_ref', None
+        m = re.fullmatch(r'commits/(\w+)', rest)
+        if m and self.command == 'GET':
+            commit = repo.commits.get(m.group(1))
+            if commit is None:
+                self.json_response(404, {'message': 'Not Found'})
+            else:
+                self.json_response(200, {'sha': m.group(1), 'tree': {'sha': commit['tree']},
+                                         'parents': [{'sha': p} for p in commit['parents']]})
+            return 'gh_commit', None
+        if rest == 'commits' and self.command == 'POST':
+            sha = repo.commit(body['tree'], body.get('parents', []))
+            self.json_response(201, {'sha': sha})
+            return 'gh_commit', None
+        m = re.fullmatch(r'trees/(\w+)', rest)
+        if m and self.command == 'GET':
+            entries = repo.trees.get(m.group(1))
+            if entries is None:
+                self.json_response(404, {'message': 'Not Found'})
+            else:
+                self.json_response(200, {'sha': m.group(1), 'truncated': False, 'tree': [
+                    {'path': p, 'mode': mode, 'type': 'blob', 'sha': sha} for p, (mode, sha) in entries.items()]})
+            return 'gh_tree', None
+        if rest == 'trees' and self.command == 'POST':
+            entries = dict(repo.trees.get(body.get('base_tree'), {}))
+            for e in body.get('tree', []):
+                if 'content' not in e and e.get('sha') is None:
+                    # sha: null = 喺 tree 刪走呢個檔
+                    entries.pop(e['path'], None)
+                    continue
+                sha = git_blob_sha(e['content'].encode('utf-8')) if 'content' in e else e['sha']
+                entries[e['path']] = (e.get('mode', '100644'), sha)
+            self.json_response(201, {'sha': repo.store_tree(entries)})
+            return 'gh_tree', None
+        if rest == 'blobs' and self.command == 'POST':
+            data = base64.b64decode(body['content']) if body.get('encoding') == 'base64' \
+                else body['content'].encode('utf-8')
+            self.json_response(201, {'sha': git_blob_sha(data)})
+            return 'gh_blob', None
+        self.json_response(404, {'message': 'Not Found'})
+        return 'gh_not_found', None
+
+
+class StandIn:
+    """喺背景 thread 跑一個 stand-in 伺服器；latency 係秒，bandwidth 係 bytes/秒（0 = 唔限）"""
+
+    def __init__(self, name, handler, metrics, latency=0.0, bandwidth=0, **attrs):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.httpd.daemon_threads = True
+        self.httpd.name = name
+        self.httpd.metrics = metrics
+        self.httpd.latency = latency
+        self.httpd.bandwidth = bandwidth
+        for k, v in attrs.items():
+            setattr(self.httpd, k, v)
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.httpd.server_address[1]}'
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+def start_all(episodes, metrics, latency=0.0, bandwidth=0, segments=4, segment_size=320 * 1024, variants=(64,)):
+    """
+    啟動 RTHK / IA / GitHub 三個 stand-in，返回 {'rthk', 'ia', 'github'}
+    variants：master playlist 嘅 variant（kbps）；segment_size 係最低嗰個，其他按 bitrate 比例放大
+    """
+    lowest = min(variants)
+    segment_bodies = {kbps: TS_SYNC_BYTE * (segment_size * kbps // lowest) for kbps in sorted(variants)}
+    by_month = {}
+    for ep in episodes:
+        by_month.setdefault((ep['programme'], ep['ym']), []).append(ep)
+    rthk = StandIn('rthk', RTHKHandler, metrics, latency, bandwidth,
+                   data={'episodes': episodes, 'by_month': by_month},
+                   segments=segments, segment_bodies=segment_bodies)
+    rthk.httpd.aod_prefix = f'{rthk.url}/aod'
+    ia = StandIn('ia', IAHandler, metrics, latency, bandwidth, objects={}, uploads={})
+    github = StandIn('github', GitHubHandler, metrics, latency, bandwidth, repo=FakeRepo())
+    return {'rthk': rthk.start(), 'ia': ia.start(), 'github': github.start()}
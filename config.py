@@ -0,0 +1,25 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用設定：所有腳本都由呢度攞資料夾同檔案路徑
+  - import 時先載入程式所在資料夾嘅 .env（有裝 python-dotenv 先會），其他模組要喺佢之後 import
+  - RTHK_PODCAST_DIR 冇設定就用程式所在資料夾（正式環境即係 /home/ubuntu/rthk_podcast）
+"""
+import os
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+try:
+    from dotenv import load_dotenv
+    load_dotenv(os.path.join(SCRIPT_DIR, '.env'))
+except Exception:
+    pass
+
+BASE_DIR = os.environ.get('RTHK_PODCAST_DIR', SCRIPT_DIR)
+MP3_DIR = os.path.join(BASE_DIR, 'mp3')
+CACHE_DIR = os.path.join(BASE_DIR, '.cache')
+IA_MAPPING_FILE = os.path.join(BASE_DIR, 'ia_mapping.json')
+LAST_CHECKED_FILE = os.path.join(BASE_DIR, 'last_checked.json')
+DISCOVERY_INDEX_FILE = os.path.join(BASE_DIR, 'discovery_index.json')
+FEED_FILE = os.path.join(BASE_DIR, 'feed.xml')
+STATS_FILE = os.environ.get('RTHK_STATS_FILE', '/tmp/rthk_update_stats.json')
@@ -0,0 +1,2 @@
+# test_update.py 係真正行 run_update 嘅手動測試腳本（會改 last_checked.json），唔俾 pytest 收集
+collect_ignore = ['test_update.py']
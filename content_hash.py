@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+音頻內容雜湊：一邊產生／傳送一邊計 MD5 + SHA-256（同埋 bytes 數）
+  - Hasher：逐 chunk update，digests() 返回 {'md5', 'sha256', 'size'}
+  - hash_file()：已寫好嘅檔案（轉檔完即刻計，檔案仲喺 page cache）
+  - multipart_etag()：S3 multipart 完成後 ETag 應有嘅值
+MD5 用嚟同 IA 嘅 ETag／metadata 比對，SHA-256 記入 ia_mapping 做長期校驗
+"""
+import hashlib
+
+CHUNK_SIZE = 1024 * 1024
+
+
+class Hasher:
+    def __init__(self):
+        self._md5 = hashlib.md5()
+        self._sha256 = hashlib.sha256()
+        self.size = 0
+
+    def update(self, data):
+        self._md5.update(data)
+        self._sha256.update(data)
+        self.size += len(data)
+
+    def digests(self):
+        return {'md5': self._md5.hexdigest(), 'sha256': self._sha256.hexdigest(), 'size': self.size}
+
+
+def hash_file(path, chunk_size=CHUNK_SIZE):
+    hasher = Hasher()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            hasher.update(chunk)
+    return hasher.digests()
+
+
+def multipart_etag(part_md5s):
+    """part_md5s：按 part 次序嘅 hex MD5；返回 '<md5(各 part digest 串接)>-<part 數>'"""
+    joined = b''.join(bytes.fromhex(h) for h in part_md5s)
+    return f'{hashlib.md5(joined).hexdigest()}-{len(part_md5s)}'
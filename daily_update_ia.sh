@@ -13,6 +13,8 @@
 
 LOG_FILE="/home/ubuntu/rthk_podcast/daily_update.log"
 SCRIPT_DIR="/home/ubuntu/rthk_podcast"
+STATS_FILE="/tmp/rthk_update_stats.json"
+export RTHK_STATS_FILE="$STATS_FILE"
 
 # 從 .env 讀取所有 credentials
 if [ -f "$SCRIPT_DIR/.env" ]; then
@@ -59,12 +61,14 @@ git config user.email "bunfung.any@gmail.com" 2>/dev/null
 git config user.name "bunfung" 2>/dev/null
 git pull origin main >> "$LOG_FILE" 2>&1 || echo "$(date '+%Y-%m-%d %H:%M:%S') [警告] git pull 失敗" >> "$LOG_FILE"
 
-# 執行主流程 Python 腳本
+# 執行主流程：更新 + 生成 RSS 喺同一個 process 行（ia_mapping 只讀一次），發佈由下面 git push 做
 echo "$(date '+%Y-%m-%d %H:%M:%S') [主流程] 開始執行..." >> "$LOG_FILE"
-python3 "$SCRIPT_DIR/run_update.py" >> "$LOG_FILE" 2>&1
+# --noop-exit：快速檢查冇新集數時 exit 3（podcast.EXIT_NOOP），冇檔案改過
+python3 "$SCRIPT_DIR/podcast.py" all --no-publish --noop-exit >> "$LOG_FILE" 2>&1
 PYTHON_EXIT=$?
+EXIT_NOOP=3
 
-if [ $PYTHON_EXIT -ne 0 ]; then
+if [ $PYTHON_EXIT -ne 0 ] && [ $PYTHON_EXIT -ne $EXIT_NOOP ]; then
     echo "$(date '+%Y-%m-%d %H:%M:%S') [錯誤] 主流程失敗 (exit=$PYTHON_EXIT)" >> "$LOG_FILE"
     send_telegram "🚨 <b>RTHK Podcast 更新失敗</b>
 📅 $(date '+%Y-%m-%d %H:%M')
@@ -74,68 +78,25 @@ if [ $PYTHON_EXIT -ne 0 ]; then
     exit 1
 fi
 
-# 步驟: 生成 RSS feed
-echo "$(date '+%Y-%m-%d %H:%M:%S') [RSS] 生成 RSS feed..." >> "$LOG_FILE"
-python3 "$SCRIPT_DIR/generate_rss.py" >> "$LOG_FILE" 2>&1
-
-# 步驟: Push 到 GitHub
-echo "$(date '+%Y-%m-%d %H:%M:%S') [Git] Push 到 GitHub..." >> "$LOG_FILE"
-git add ia_mapping.json last_checked.json feed.xml >> "$LOG_FILE" 2>&1
-git commit -m "Daily update: $(date '+%Y-%m-%d')" >> "$LOG_FILE" 2>&1
-git push origin main >> "$LOG_FILE" 2>&1 || echo "$(date '+%Y-%m-%d %H:%M:%S') [警告] git push 失敗" >> "$LOG_FILE"
-
-# 讀取今次更新統計（由 run_update.py 寫入）
-STATS_FILE="/tmp/rthk_update_stats.json"
-if [ -f "$STATS_FILE" ]; then
-    NEW_EPS=$(python3 -c "import json; d=json.load(open('$STATS_FILE')); print(d.get('new_episodes',0))" 2>/dev/null || echo "0")
-    DOWNLOADED=$(python3 -c "import json; d=json.load(open('$STATS_FILE')); print(d.get('downloaded',0))" 2>/dev/null || echo "0")
-    UPLOADED=$(python3 -c "import json; d=json.load(open('$STATS_FILE')); print(d.get('uploaded',0))" 2>/dev/null || echo "0")
-    FAILED=$(python3 -c "import json; d=json.load(open('$STATS_FILE')); print(d.get('failed',0))" 2>/dev/null || echo "0")
-    UPLOADED_TITLES=$(python3 -c "import json; d=json.load(open('$STATS_FILE')); print('\n'.join(d.get('uploaded_titles',[])))" 2>/dev/null || echo "")
+# 步驟: Push 到 GitHub（快速檢查冇新集數時冇檔案改過，唔使 commit / push）
+if [ $PYTHON_EXIT -eq $EXIT_NOOP ]; then
+    echo "$(date '+%Y-%m-%d %H:%M:%S') [Git] 冇新集數，跳過 commit / push" >> "$LOG_FILE"
 else
-    NEW_EPS=0; DOWNLOADED=0; UPLOADED=0; FAILED=0; UPLOADED_TITLES=""
+    echo "$(date '+%Y-%m-%d %H:%M:%S') [Git] Push 到 GitHub..." >> "$LOG_FILE"
+    git add ia_mapping.json last_checked.json discovery_index.json 'feed*.xml*' >> "$LOG_FILE" 2>&1
+    git commit -m "Daily update: $(date '+%Y-%m-%d')" >> "$LOG_FILE" 2>&1
+    git push origin main >> "$LOG_FILE" 2>&1 || echo "$(date '+%Y-%m-%d %H:%M:%S') [警告] git push 失敗" >> "$LOG_FILE"
 fi
 
-TOTAL_IA=$(python3 -c "import json; d=json.load(open('ia_mapping.json')); print(len(d))" 2>/dev/null || echo "?")
-DATE_STR=$(date '+%Y-%m-%d %H:%M')
-
-# 組合 Telegram 通知
-MESSAGE="🎙️ <b>RTHK 講東講西 Podcast 每日更新報告</b>
-📅 ${DATE_STR}
-
-📋 新集數：<b>${NEW_EPS}</b> 集
-⬇️ 已下載：<b>${DOWNLOADED}</b> 個 MP3
-⬆️ 成功上傳：<b>${UPLOADED}</b> 集
-☁️ IA 總集數：<b>${TOTAL_IA}</b> 集"
-
-if [ -n "$UPLOADED_TITLES" ]; then
-    MESSAGE="${MESSAGE}
-
-📝 <b>今日上傳集數：</b>"
-    while IFS= read -r line; do
-        [ -n "$line" ] && MESSAGE="${MESSAGE}
-  • ${line}"
-    done <<< "$UPLOADED_TITLES"
+# 生成通知文字（report.py 一次過讀 podcast.py 寫出嘅統計同 ia_mapping.json；冇新集數時冇寫統計，唔好讀上次嘅）
+REPORT_ARGS=()
+if [ $PYTHON_EXIT -eq $EXIT_NOOP ]; then
+    REPORT_ARGS=(--noop)
 fi
-
-[ $FAILED -gt 0 ] && MESSAGE="${MESSAGE}
-❌ 上傳失敗：<b>${FAILED}</b> 集"
-
-if [ $NEW_EPS -eq 0 ] && [ $UPLOADED -eq 0 ]; then
-    MESSAGE="${MESSAGE}
-
-💤 今日暫無新集數"
-else
-    STATUS="✅"
-    [ $FAILED -gt 0 ] && STATUS="⚠️"
-    MESSAGE="${MESSAGE}
-
-${STATUS} 今日更新完成！"
-fi
-
-MESSAGE="${MESSAGE}
-
-🔗 RSS: https://bunfung.github.io/my-rthk-podcast/feed.xml
+MESSAGE=$(python3 "$SCRIPT_DIR/report.py" --stats "$STATS_FILE" --mapping "$SCRIPT_DIR/ia_mapping.json" "${REPORT_ARGS[@]}" 2>> "$LOG_FILE") \
+    || MESSAGE="🎙️ <b>RTHK 講東講西 Podcast 每日更新報告</b>
+📅 $(date '+%Y-%m-%d %H:%M')
+⚠️ 生成報告失敗，請查看 log
 
 — Manus 自動通知系統"
 
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+集數發現索引（discovery_index.json）
+  ep_id → {'date', 'programme', 'title', 'first_seen'[, 'state', 'state_at', 'attempts', 'error', 'hosts', 'guests',
+           'variants_pending', 'variant_attempts']}
+  - 每次掃 catchUpByMonth 都增量更新
+  - 同一集喺兩個 programme 都出現時，以最先發現嘅 programme 為準（跨 run 都有效）
+  - state 係每集嘅處理進度（見 STATES）：已有結論嘅集數唔會再抓頁面，失敗嘅集數下次自動重試
+    （舊記錄冇 state，由 last_checked 決定，當已有結論）
+"""
+import json
+import threading
+from datetime import datetime
+
+from episode_store import write_json_atomic
+
+# discovered → (skipped-notice | not-qualified | resolved → downloaded → uploaded)，任何一步出錯 → failed（attempts + 1）
+STATES = ('discovered', 'skipped-notice', 'not-qualified', 'resolved', 'downloaded', 'uploaded', 'failed')
+# 已有結論，唔使再處理
+FINAL_STATES = frozenset({'skipped-notice', 'not-qualified', 'uploaded'})
+
+
+def month_range(start, end):
+    """返回 start..end（date）之間每個月嘅 'YYYYMM'，由新到舊"""
+    months = []
+    y, m = end.year, end.month
+    while (y, m) >= (start.year, start.month):
+        months.append(f'{y:04d}{m:02d}')
+        y, m = (y, m - 1) if m > 1 else (y - 1, 12)
+    return months
+
+
+class DiscoveryIndex:
+    def __init__(self, path, checkpoint_every=0):
+        """checkpoint_every：每 N 次 set_state 就寫一次檔（0 = 只喺 save() 時寫）"""
+        self.path = path
+        self.entries = {}
+        self.checkpoint_every = checkpoint_every
+        self._dirty = False
+        self._changes = 0
+        self._lock = threading.Lock()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.entries = json.load(f)
+        except (OSError, ValueError):
+            self.entries = {}
+        self._dirty = False
+        return self.entries
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, ep_id):
+        return ep_id in self.entries
+
+    def get(self, ep_id, default=None):
+        return self.entries.get(ep_id, default)
+
+    def add(self, ep_id, ep_date_str, programme, title):
+        """記錄一集；返回 (entry, is_new)。已存在嘅集數保留最先發現嘅 programme"""
+        with self._lock:
+            entry = self.entries.get(ep_id)
+            if entry is not None:
+                if entry.get('date') != ep_date_str or entry.get('title') != title:
+                    entry['date'] = ep_date_str
+                    entry['title'] = title
+                    self._dirty = True
+                return entry, False
+            entry = {
+                'date': ep_date_str,
+                'programme': programme,
+                'title': title,
+                'first_seen': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            }
+            self.entries[ep_id] = entry
+            self._dirty = True
+            return entry, True
+
+    def set_state(self, ep_id, state, **fields):
+        """
+        更新一集嘅處理狀態，fields（例如 hosts / guests / error）一併寫入
+        failed 會累加 attempts；其他狀態會清走上次嘅 error
+        """
+        if state not in STATES:
+            raise ValueError(f'未知狀態: {state}')
+        with self._lock:
+            entry = self.entries.get(ep_id)
+            if entry is None:
+                return None
+            entry['state'] = state
+            entry['state_at'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            if state == 'failed':
+                entry['attempts'] = entry.get('attempts', 0) + 1
+            else:
+                entry.pop('error', None)
+            entry.update(fields)
+            self._dirty = True
+            self._changes += 1
+            if self.checkpoint_every and self._changes % self.checkpoint_every == 0:
+                self._write()
+            return entry
+
+    @staticmethod
+    def needs_work(entry, max_attempts):
+        """未有結論（處理到一半或者失敗未超過 max_attempts 次）"""
+        state = entry.get('state')
+        if state is None or state in FINAL_STATES:
+            return False
+        return state != 'failed' or entry.get('attempts', 0) < max_attempts
+
+    def pending(self, max_attempts):
+        """需要再處理嘅集數 [(ep_id, entry)]，按日期由舊到新"""
+        with self._lock:
+            items = [(ep_id, dict(entry)) for ep_id, entry in self.entries.items()
+                     if self.needs_work(entry, max_attempts)]
+        return sorted(items, key=lambda item: datetime.strptime(item[1]['date'], '%d/%m/%Y'))
+
+    def variants_pending(self, max_attempts):
+        """已上傳但有 variant 未上到、試咗少過 max_attempts 次嘅集數 [(ep_id, entry)]"""
+        with self._lock:
+            return [(ep_id, dict(entry)) for ep_id, entry in self.entries.items()
+                    if entry.get('state') == 'uploaded' and entry.get('variants_pending')
+                    and entry.get('variant_attempts', 0) < max_attempts]
+
+    def _write(self):
+        write_json_atomic(self.path, self.entries)
+        self._dirty = False
+
+    def save(self):
+        with self._lock:
+            if not self._dirty:
+                return False
+            self._write()
+            return True
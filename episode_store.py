@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+集數記錄儲存：ia_mapping.json snapshot + append-only journal
+  - put() 只 append 一行 JSON 到 journal 再 fsync，每集 O(1) 而且 crash 都唔會整爛 snapshot
+  - load() 讀 snapshot 再重播 journal（最後一行寫到一半會被忽略）；預設唯讀，
+    會寫記錄嘅程序用 load(repair=True)，喺 journal 檔案鎖入面截走爛咗嘅尾巴
+  - 寫 journal（append / 截斷 / compact 清空）都攞 flock，唯讀嘅讀者唔會截走寫緊嘅記錄
+  - compact() 喺 journal 鎖入面重讀 snapshot + journal（包括其他程序寫嘅記錄），原子咁重寫 ia_mapping.json
+    （同舊格式一樣，indent=2），然後清空 journal
+generate_rss.py / GitHub publish 照舊讀 ia_mapping.json
+"""
+import fcntl
+import json
+import os
+import threading
+from contextlib import contextmanager
+
+COMPACT_EVERY = int(os.environ.get('EPISODE_STORE_COMPACT_EVERY', '50'))
+
+
+def write_json_atomic(path, data):
+    """寫暫存檔 → fsync → rename，中途 crash 都唔會截斷原檔"""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f, ensure_ascii=False, indent=2)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        dir_fd = os.open(os.path.dirname(os.path.abspath(path)), os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+
+@contextmanager
+def _flocked(f):
+    """喺 f 攞 exclusive flock（同一個 journal 嘅其他寫入程序會等）"""
+    fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    try:
+        yield f
+    finally:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+class EpisodeStore:
+    def __init__(self, snapshot_path, journal_path=None, compact_every=None):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path or os.path.splitext(snapshot_path)[0] + '.journal'
+        self.compact_every = COMPACT_EVERY if compact_every is None else compact_every
+        self.episodes = {}
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def load(self, repair=False):
+        """
+        讀 snapshot + 重播 journal，返回 {ep_id: info}
+        journal 最後一行唔完整（crash 或者另一個程序寫緊）就略過；
+        repair=True（寫記錄嘅程序用）先會喺檔案鎖入面截走爛咗嘅尾巴，之後 append 先唔會接喺垃圾後面
+        """
+        self.episodes = self._read_snapshot()
+        self._pending = 0
+        try:
+            with open(self.journal_path, 'r+b' if repair else 'rb') as f:
+                if not repair:
+                    self._replay(f, self.episodes)
+                    return self.episodes
+                with _flocked(f):
+                    good = self._replay(f, self.episodes)
+                    if good != os.fstat(f.fileno()).st_size:
+                        f.truncate(good)
+        except OSError:
+            pass
+        return self.episodes
+
+    def _read_snapshot(self):
+        try:
+            with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _replay(self, f, episodes):
+        """將 journal 重播入 episodes，返回完整記錄嘅 bytes 數"""
+        good = 0
+        for raw in f:
+            try:
+                entry = json.loads(raw)
+            except ValueError:
+                # 上次寫到一半就 crash（或者仲寫緊），之後嘅內容都唔可信
+                break
+            if entry.get('op') == 'put':
+                episodes[entry['id']] = entry['info']
+            elif entry.get('op') == 'delete':
+                episodes.pop(entry['id'], None)
+            self._pending += 1
+            good += len(raw)
+        return good
+
+    def _append(self, entry):
+        with open(self.journal_path, 'a', encoding='utf-8') as f, _flocked(f):
+            f.write(json.dumps(entry, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+        self._pending += 1
+
+    def put(self, ep_id, info):
+        with self._lock:
+            self._append({'op': 'put', 'id': ep_id, 'info': info})
+            self.episodes[ep_id] = info
+            if self.compact_every and self._pending >= self.compact_every:
+                self._compact()
+
+    def delete(self, ep_id):
+        with self._lock:
+            if ep_id in self.episodes:
+                self._append({'op': 'delete', 'id': ep_id})
+                del self.episodes[ep_id]
+
+    def _compact(self):
+        # 由讀 snapshot 到清空 journal 都攞住 journal 鎖：其他程序喺我哋 load 之後 append 嘅記錄
+        # 要先重播入嚟寫入 snapshot，唔係清空 journal 就會冇咗
+        with open(self.journal_path, 'a+b') as f, _flocked(f):
+            episodes = self._read_snapshot()
+            f.seek(0)
+            self._replay(f, episodes)
+            write_json_atomic(self.snapshot_path, episodes)
+            f.truncate(0)
+            f.flush()
+            os.fsync(f.fileno())
+        self.episodes = episodes
+        self._pending = 0
+
+    def compact(self, force=False):
+        """將 journal 併入 ia_mapping.json；冇新記錄時唔寫檔"""
+        with self._lock:
+            if self._pending or force:
+                self._compact()
+                return True
+            return False
+
+    def __contains__(self, ep_id):
+        return ep_id in self.episodes
+
+    def __len__(self):
+        return len(self.episodes)
+
+    def get(self, ep_id, default=None):
+        return self.episodes.get(ep_id, default)
+
+    def items(self):
+        return self.episodes.items()
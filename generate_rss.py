@@ -3,15 +3,40 @@
 """
 從 ia_mapping.json 生成 RSS feed XML
 供 Downcast 等 Podcast 客戶端訂閱
+
+除咗完整嘅 feed.xml，仲會輸出：
+  - feed-latest.xml：最新 RSS_LATEST_N 集（客戶端日日 poll 嘅細 feed）
+  - feed-page-N.xml：RFC 5005 archive 分頁，由最舊一集開始每 RSS_PAGE_SIZE 集一頁；
+    頁與頁之間只有 prev-archive 連結，寫滿嘅頁唔會再因為新集數而改變，內容冇變就唔重寫
+  - feed-lite.xml：用細檔 variant（RSS_LITE_VARIANT，預設 speech，見 TRANSCODE_VARIANTS）做 enclosure 嘅輕量 feed，
+    只包有呢個 variant 嘅集數；一集都冇就唔出
+  - 每個輸出都有預先壓縮嘅 .gz（同 .br，要裝咗 brotli）
 """
+import bisect
+import glob
+import gzip
+import hashlib
 import json
 import os
 import re
+import sys
 from datetime import datetime
 
-BASE_DIR = '/home/ubuntu/rthk_podcast'
-IA_MAPPING_FILE = f'{BASE_DIR}/ia_mapping.json'
-FEED_FILE = f'{BASE_DIR}/feed.xml'
+import config
+from episode_store import EpisodeStore
+
+BASE_DIR = config.BASE_DIR
+IA_MAPPING_FILE = config.IA_MAPPING_FILE
+FEED_FILE = config.FEED_FILE
+ITEM_CACHE_FILE = f'{config.CACHE_DIR}/rss_items.json'
+ITEM_CACHE_VERSION = 1
+FEED_LATEST_FILE = f'{BASE_DIR}/feed-latest.xml'
+FEED_PAGE_PATTERN = 'feed-page-{}.xml'
+PAGE_CACHE_FILE = f'{config.CACHE_DIR}/rss_pages.json'
+RSS_LATEST_N = int(os.environ.get('RSS_LATEST_N', '30'))
+RSS_PAGE_SIZE = int(os.environ.get('RSS_PAGE_SIZE', '100'))
+FEED_LITE_FILE = f'{BASE_DIR}/feed-lite.xml'
+RSS_LITE_VARIANT = os.environ.get('RSS_LITE_VARIANT', 'speech')
 
 # Podcast 基本資訊
 PODCAST_TITLE = "RTHK 講東講西"
@@ -22,6 +47,11 @@ PODCAST_AUTHOR = "RTHK Radio 1"
 PODCAST_EMAIL = "bunfung.any@gmail.com"
 PODCAST_LANGUAGE = "zh-hk"
 FEED_URL = "https://bunfung.github.io/my-rthk-podcast/feed.xml"
+FEED_BASE_URL = FEED_URL.rsplit('/', 1)[0]
+FEED_LATEST_URL = f"{FEED_BASE_URL}/feed-latest.xml"
+FEED_LITE_URL = f"{FEED_BASE_URL}/feed-lite.xml"
+# 記錄未有 duration（未跑 mp3_duration.py 補）時用嘅預設長度（秒）
+DEFAULT_DURATION = 5400
 
 
 def parse_date_to_rfc2822(date_str):
@@ -47,52 +77,24 @@ def escape_xml(text):
     return text
 
 
-def generate_rss():
-    """生成 RSS feed"""
-    # 讀取 ia_mapping
-    if not os.path.exists(IA_MAPPING_FILE):
-        print(f"錯誤：找不到 {IA_MAPPING_FILE}")
-        return False
-    
-    with open(IA_MAPPING_FILE, 'r', encoding='utf-8') as f:
-        ia_mapping = json.load(f)
-    
-    print(f"讀取到 {len(ia_mapping)} 集")
-    
-    # 按日期排序（最新在前）
-    episodes = []
-    for ep_id, info in ia_mapping.items():
-        episodes.append({
-            'id': ep_id,
-            'title': info.get('title', f'Episode {ep_id}'),
-            'date': info.get('date', ''),
-            'url': info.get('url', ''),
-            'size': info.get('size', 0),
-            'item_id': info.get('item_id', f'rthk-jiang-dong-jiang-xi-{ep_id}'),
-        })
-    
-    # 按日期排序（最新在前）
-    def sort_key(ep):
-        try:
-            return datetime.strptime(ep['date'], "%d/%m/%Y")
-        except:
-            return datetime.min
-    
-    episodes.sort(key=sort_key, reverse=True)
-    
-    # 生成 RSS XML
-    now_rfc2822 = datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0800")
-    
-    xml_lines = [
+def channel_header_lines(last_build_date, self_url=FEED_URL, links=(), archive=False, title=PODCAST_TITLE):
+    """
+    channel 開頭（到第一個 <item> 之前）
+    links：額外 (rel, href)，例如 RFC 5005 嘅 prev-archive / current；archive=True 加 <fh:archive/>
+    """
+    fh_ns = ' xmlns:fh="http://purl.org/syndication/history/1.0"' if links or archive else ''
+    return [
         '<?xml version="1.0" encoding="UTF-8"?>',
-        '<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd" xmlns:content="http://purl.org/rss/1.0/modules/content/" xmlns:atom="http://www.w3.org/2005/Atom">',
+        f'<rss version="2.0" xmlns:itunes="http://www.itunes.com/dtds/podcast-1.0.dtd" xmlns:content="http://purl.org/rss/1.0/modules/content/" xmlns:atom="http://www.w3.org/2005/Atom"{fh_ns}>',
         '  <channel>',
-        f'    <title>{escape_xml(PODCAST_TITLE)}</title>',
+        f'    <title>{escape_xml(title)}</title>',
         f'    <description>{escape_xml(PODCAST_DESCRIPTION)}</description>',
         f'    <link>{PODCAST_LINK}</link>',
         f'    <language>{PODCAST_LANGUAGE}</language>',
-        f'    <lastBuildDate>{now_rfc2822}</lastBuildDate>',
-        f'    <atom:link href="{FEED_URL}" rel="self" type="application/rss+xml"/>',
+        f'    <lastBuildDate>{last_build_date}</lastBuildDate>',
+        f'    <atom:link href="{self_url}" rel="self" type="application/rss+xml"/>',
+        *[f'    <atom:link href="{href}" rel="{rel}" type="application/rss+xml"/>' for rel, href in links],
+        *(['    <fh:archive/>'] if archive else []),
         f'    <itunes:author>{escape_xml(PODCAST_AUTHOR)}</itunes:author>',
         f'    <itunes:summary>{escape_xml(PODCAST_DESCRIPTION)}</itunes:summary>',
         f'    <itunes:owner>',
@@ -103,49 +105,425 @@ def generate_rss():
         f'    <itunes:category text="Society &amp; Culture"/>',
         f'    <itunes:explicit>false</itunes:explicit>',
     ]
+
+
+CHANNEL_FOOTER_LINES = [
+    '  </channel>',
+    '</rss>',
+]
+
+
+def episode_from_info(ep_id, info):
+    return {
+        'id': ep_id,
+        'title': info.get('title', f'Episode {ep_id}'),
+        'date': info.get('date', ''),
+        'url': info.get('url', ''),
+        'size': info.get('size', 0),
+        'item_id': info.get('item_id', f'rthk-jiang-dong-jiang-xi-{ep_id}'),
+        'mime': info.get('mime', 'audio/mpeg'),
+        'duration': info.get('duration') or DEFAULT_DURATION,
+    }
+
+
+def lite_info(info):
+    """用 RSS_LITE_VARIANT 嘅檔案取代 enclosure 嘅 info；呢集冇呢個 variant 返回 None"""
+    variant = (info.get('variants') or {}).get(RSS_LITE_VARIANT)
+    if not variant or not variant.get('url'):
+        return None
+    lite = {k: v for k, v in info.items() if k not in ('variants', 'mime')}
+    lite.update(variant)
+    return lite
+
+
+def render_item_lines(ep):
+    """單集 <item> XML"""
+    title = ep['title']
+    date = ep['date']
+    url = ep['url']
+    size = ep['size']
+    item_id = ep['item_id']
+    mime = ep.get('mime', 'audio/mpeg')
+    duration = ep.get('duration') or DEFAULT_DURATION
+    
+    pub_date = parse_date_to_rfc2822(date)
+    ia_page_url = f"https://archive.org/details/{item_id}"
+    
+    return [
+        '    <item>',
+        f'      <title>{escape_xml(title)} ({escape_xml(date)})</title>',
+        f'      <description>{escape_xml(f"RTHK 講東講西 - {title}，播出日期：{date}")}</description>',
+        f'      <link>{ia_page_url}</link>',
+        f'      <guid isPermaLink="false">{item_id}</guid>',
+        f'      <pubDate>{pub_date}</pubDate>',
+        f'      <enclosure url="{url}" length="{size}" type="{mime}"/>',
+        f'      <itunes:title>{escape_xml(title)}</itunes:title>',
+        f'      <itunes:author>{escape_xml(PODCAST_AUTHOR)}</itunes:author>',
+        f'      <itunes:summary>{escape_xml(f"RTHK 講東講西 - {title}，播出日期：{date}")}</itunes:summary>',
+        f'      <itunes:image href="{PODCAST_IMAGE}"/>',
+        f'      <itunes:duration>{int(duration)}</itunes:duration>',
+        f'      <itunes:explicit>false</itunes:explicit>',
+        '    </item>',
+    ]
+
+
+def load_ia_mapping():
+    """ia_mapping.json + 未併入嘅 journal（run_update 中途停咗都唔會漏集）"""
+    if not os.path.exists(IA_MAPPING_FILE):
+        print(f"錯誤：找不到 {IA_MAPPING_FILE}")
+        return None
+    
+    return EpisodeStore(IA_MAPPING_FILE).load()
+
+
+def generate_rss(ia_mapping=None):
+    """生成 RSS feed；ia_mapping（{ep_id: info}）冇提供就自己讀"""
+    # 讀取 ia_mapping
+    if ia_mapping is None:
+        ia_mapping = load_ia_mapping()
+    if ia_mapping is None:
+        return False
+    
+    print(f"讀取到 {len(ia_mapping)} 集")
+    
+    # 每集只 render 一次：同一份 (日期 key, ep_id, hash, xml) 俾 feed.xml 同分頁 feed 共用
+    # 按 (日期, ep_id) 排序（同增量模式一樣），輸出時倒轉（最新在前）
+    entries = sorted(
+        (date_sort_key(info.get('date', '')), ep_id, content_hash(info),
+         '\n'.join(render_item_lines(episode_from_info(ep_id, info))))
+        for ep_id, info in ia_mapping.items()
+    )
+    
+    # 生成 RSS XML
+    now_rfc2822 = datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0800")
     
-    for ep in episodes:
-        title = ep['title']
-        date = ep['date']
-        url = ep['url']
-        size = ep['size']
-        ep_id = ep['id']
-        item_id = ep['item_id']
-        
-        pub_date = parse_date_to_rfc2822(date)
-        ia_page_url = f"https://archive.org/details/{item_id}"
-        
-        xml_lines.extend([
-            '    <item>',
-            f'      <title>{escape_xml(title)} ({escape_xml(date)})</title>',
-            f'      <description>{escape_xml(f"RTHK 講東講西 - {title}，播出日期：{date}")}</description>',
-            f'      <link>{ia_page_url}</link>',
-            f'      <guid isPermaLink="false">{item_id}</guid>',
-            f'      <pubDate>{pub_date}</pubDate>',
-            f'      <enclosure url="{url}" length="{size}" type="audio/mpeg"/>',
-            f'      <itunes:title>{escape_xml(title)}</itunes:title>',
-            f'      <itunes:author>{escape_xml(PODCAST_AUTHOR)}</itunes:author>',
-            f'      <itunes:summary>{escape_xml(f"RTHK 講東講西 - {title}，播出日期：{date}")}</itunes:summary>',
-            f'      <itunes:image href="{PODCAST_IMAGE}"/>',
-            f'      <itunes:duration>5400</itunes:duration>',
-            f'      <itunes:explicit>false</itunes:explicit>',
-            '    </item>',
-        ])
-    
-    xml_lines.extend([
-        '  </channel>',
-        '</rss>',
-    ])
+    xml_lines = channel_header_lines(now_rfc2822)
+    xml_lines.extend(xml for *_, xml in reversed(entries))
+    xml_lines.extend(CHANNEL_FOOTER_LINES)
     
     xml_content = '\n'.join(xml_lines)
     
-    with open(FEED_FILE, 'w', encoding='utf-8') as f:
-        f.write(xml_content)
+    write_output(FEED_FILE, xml_content)
     
     print(f"✅ RSS feed 已生成: {FEED_FILE}")
-    print(f"   共 {len(episodes)} 集")
+    print(f"   共 {len(entries)} 集")
+    
+    write_paged_feeds(entries)
+    write_lite_feed(ia_mapping)
+    return True
+
+
+# ── 增量模式 ──────────────────────────────────────────
+def content_hash(info):
+    return hashlib.md5(json.dumps(info, sort_keys=True, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def source_digest(ia_mapping):
+    """成份 ia_mapping 加埋影響輸出嘅設定嘅 digest（一次過 dumps，唔使逐集 hash）"""
+    settings = [RSS_LATEST_N, RSS_PAGE_SIZE, RSS_LITE_VARIANT, channel_header_lines('')]
+    return hashlib.md5(json.dumps([settings, ia_mapping], sort_keys=True, ensure_ascii=False)
+                       .encode('utf-8')).hexdigest()
+
+
+def date_sort_key(date_str):
+    """DD/MM/YYYY → 'YYYYMMDD'（唔使 strptime；格式唔啱排最尾）"""
+    parts = str(date_str).split('/')
+    if len(parts) == 3 and all(p.isdigit() for p in parts):
+        return f'{parts[2]:0>4}{parts[1]:0>2}{parts[0]:0>2}'
+    return ''
+
+
+def load_item_cache():
+    try:
+        with open(ITEM_CACHE_FILE, 'r', encoding='utf-8') as f:
+            cache = json.load(f)
+        if cache.get('version') == ITEM_CACHE_VERSION:
+            return cache
+    except Exception:
+        pass
+    return {'version': ITEM_CACHE_VERSION, 'items': {}, 'order': [], 'digest': None}
+
+
+def save_item_cache(cache):
+    os.makedirs(os.path.dirname(ITEM_CACHE_FILE), exist_ok=True)
+    tmp = f'{ITEM_CACHE_FILE}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, ITEM_CACHE_FILE)
+
+
+def generate_rss_incremental(ia_mapping=None):
+    """
+    增量生成 RSS feed：
+      - 每集 <item> fragment 按 ep_id + 內容 hash cache 起
+      - 只有新增／改動嘅集數會重新 render，並用 bisect 插入排序位置
+      - 除 lastBuildDate 之外內容完全一樣就唔寫檔
+      - 成份 ia_mapping 同上次一樣、feed.xml 冇被其他嘢改過而且所有輸出（連 .gz / .br）都齊：乜都唔使做
+    ia_mapping（{ep_id: info}）冇提供就自己讀
+    """
+    if ia_mapping is None:
+        ia_mapping = load_ia_mapping()
+    if ia_mapping is None:
+        return False
+    
+    cache = load_item_cache()
+    source = source_digest(ia_mapping)
+    if source == cache.get('source') and _feed_mtime() == cache.get('feed_mtime') and _outputs_fresh():
+        print(f"✅ RSS feed 冇變（{len(cache['order'])} 集），唔使重寫: {FEED_FILE}")
+        return True
+    
+    items = cache['items']
+    # order：(日期 key, ep_id) 升序，輸出時倒轉（最新在前）
+    order = [tuple(k) for k in cache['order']]
+    
+    rendered = 0
+    stale = set(items) - set(ia_mapping)
+    for ep_id, info in ia_mapping.items():
+        h = content_hash(info)
+        cached = items.get(ep_id)
+        if cached and cached['hash'] == h:
+            continue
+        if cached:
+            stale.add(ep_id)
+        key = date_sort_key(info.get('date', ''))
+        items[ep_id] = {
+            'hash': h,
+            'key': key,
+            'xml': '\n'.join(render_item_lines(episode_from_info(ep_id, info))),
+            'new': True,
+        }
+        rendered += 1
+    
+    if stale:
+        order = [k for k in order if k[1] not in stale]
+        for ep_id in stale:
+            if ep_id not in ia_mapping:
+                del items[ep_id]
+    for ep_id, item in items.items():
+        if item.pop('new', None):
+            bisect.insort(order, (item['key'], ep_id))
+    
+    # 成個 feed（除 lastBuildDate）嘅 digest：header 內容 + 每集 hash 及次序
+    digest = hashlib.md5()
+    digest.update('\n'.join(channel_header_lines('')).encode('utf-8'))
+    for _, ep_id in order:
+        digest.update(f'{ep_id}:{items[ep_id]["hash"]};'.encode('utf-8'))
+    digest = digest.hexdigest()
+    
+    cache['order'] = [list(k) for k in order]
+    entries = [(key, ep_id, items[ep_id]['hash'], items[ep_id]['xml']) for key, ep_id in order]
+    if digest == cache.get('digest') and os.path.exists(FEED_FILE):
+        if not _compressed_fresh(FEED_FILE):
+            write_compressed(FEED_FILE)
+        print(f"✅ RSS feed 冇變（{len(order)} 集），唔使重寫: {FEED_FILE}")
+        write_paged_feeds(entries)
+        write_lite_feed(ia_mapping)
+        cache.update(source=source, feed_mtime=_feed_mtime())
+        save_item_cache(cache)
+        return True
+    
+    # 串流寫出到暫存檔，完成後先 rename
+    now_rfc2822 = datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0800")
+    tmp = f'{FEED_FILE}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(channel_header_lines(now_rfc2822)))
+        for _, ep_id in reversed(order):
+            f.write('\n')
+            f.write(items[ep_id]['xml'])
+        f.write('\n')
+        f.write('\n'.join(CHANNEL_FOOTER_LINES))
+    os.replace(tmp, FEED_FILE)
+    write_compressed(FEED_FILE)
+    
+    print(f"✅ RSS feed 已增量生成: {FEED_FILE}")
+    print(f"   共 {len(order)} 集，重新 render {rendered} 集")
+    write_paged_feeds(entries)
+    write_lite_feed(ia_mapping)
+    # 分頁同輕量版都寫好先記 source，中途出錯下次會完整再行
+    cache.update(digest=digest, source=source, feed_mtime=_feed_mtime())
+    save_item_cache(cache)
+    return True
+
+
+def _feed_mtime():
+    """feed.xml 嘅 mtime（ns）；完整模式重寫過就對唔上，增量模式唔會行捷徑"""
+    try:
+        return os.stat(FEED_FILE).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _compressed_fresh(path):
+    """path 嘅 .gz（同 .br，有裝 brotli 先要）齊晒而且唔舊過 path"""
+    try:
+        mtime = os.stat(path).st_mtime_ns
+        exts = ['.gz', '.br'] if _brotli() else ['.gz']
+        return all(os.stat(f'{path}{ext}').st_mtime_ns >= mtime for ext in exts)
+    except OSError:
+        return False
+
+
+def _outputs_fresh():
+    """feed.xml 同上次寫過嘅分頁／latest／輕量版 feed（記喺 PAGE_CACHE_FILE）連壓縮檔都齊"""
+    paths = [FEED_FILE] + [f'{BASE_DIR}/{name}' for name in load_page_cache()]
+    return all(_compressed_fresh(path) for path in paths)
+
+
+# ── 最新 N 集 feed + RFC 5005 分頁 ────────────────────
+def _brotli():
+    """brotli 係 optional：冇裝就只出 .gz"""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        return None
+
+
+def write_compressed(path):
+    """為 path 寫 .gz（mtime=0，內容一樣壓縮結果都一樣）同 .br"""
+    with open(path, 'rb') as f:
+        data = f.read()
+    variants = [('.gz', lambda d: gzip.compress(d, 9, mtime=0))]
+    brotli = _brotli()
+    if brotli:
+        variants.append(('.br', lambda d: brotli.compress(d, quality=11)))
+    for ext, compress in variants:
+        tmp = f'{path}{ext}.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(compress(data))
+        os.replace(tmp, f'{path}{ext}')
+
+
+def write_output(path, text):
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.replace(tmp, path)
+    write_compressed(path)
+
+
+def _remove_output(path):
+    for p in (path, f'{path}.gz', f'{path}.br'):
+        if os.path.exists(p):
+            os.remove(p)
+
+
+def _key_to_rfc2822(key):
+    try:
+        return datetime.strptime(key, "%Y%m%d").strftime("%a, %d %b %Y 22:30:00 +0800")
+    except ValueError:
+        return datetime.now().strftime("%a, %d %b %Y 22:30:00 +0800")
+
+
+def page_url(n):
+    return f'{FEED_BASE_URL}/{FEED_PAGE_PATTERN.format(n)}'
+
+
+def load_page_cache():
+    try:
+        with open(PAGE_CACHE_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except Exception:
+        return {}
+
+
+def save_page_cache(cache):
+    os.makedirs(os.path.dirname(PAGE_CACHE_FILE), exist_ok=True)
+    tmp = f'{PAGE_CACHE_FILE}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(cache, f, ensure_ascii=False)
+    os.replace(tmp, PAGE_CACHE_FILE)
+
+
+def _write_feed_if_changed(path, header, chunk, cache, new_cache):
+    """
+    chunk：[(日期 key, ep_id, hash, item xml 或者 callable)] 由舊到新；按 header + 集數 hash 計 digest，
+    記入 new_cache，同 cache 一樣而且檔案仲喺度就唔寫。有寫返回 True
+    """
+    name = os.path.basename(path)
+    digest = hashlib.md5()
+    # lastBuildDate 唔計入 digest（latest feed 每次都唔同）
+    digest.update('\n'.join(l for l in header if '<lastBuildDate>' not in l).encode('utf-8'))
+    for _, ep_id, h, _ in chunk:
+        digest.update(f'{ep_id}:{h};'.encode('utf-8'))
+    new_cache[name] = digest = digest.hexdigest()
+    if cache.get(name) == digest and os.path.exists(path):
+        if _compressed_fresh(path):
+            return False
+        # 內容冇變但 .gz / .br 唔見咗或者舊過原檔：淨係重新壓縮
+        write_compressed(path)
+        return True
+    items = [xml() if callable(xml) else xml for *_, xml in reversed(chunk)]
+    write_output(path, '\n'.join(['\n'.join(header)] + items + ['\n'.join(CHANNEL_FOOTER_LINES)]))
     return True
 
 
+def write_paged_feeds(entries):
+    """
+    entries：[(日期 key, ep_id, hash, item xml)] 由舊到新
+    寫 feed-latest.xml 同 feed-page-N.xml（N = 1 係最舊）；每個輸出按 header + 集數 hash 計 digest，
+    同上次一樣而且檔案仲喺度就唔寫
+    """
+    page_size = max(1, RSS_PAGE_SIZE)
+    pages = len(entries) // page_size
+    # 未夠一頁嘅集數一定要喺 latest feed 入面，否則客戶端由 latest 沿 prev-archive 行會漏集
+    latest = entries[max(0, min(len(entries) - RSS_LATEST_N, pages * page_size)):]
+    outputs = {}
+    for n in range(1, pages + 1):
+        chunk = entries[(n - 1) * page_size:n * page_size]
+        links = [('current', FEED_LATEST_URL)] + ([('prev-archive', page_url(n - 1))] if n > 1 else [])
+        header = channel_header_lines(_key_to_rfc2822(chunk[-1][0]), page_url(n), links, archive=True)
+        outputs[f'{BASE_DIR}/{FEED_PAGE_PATTERN.format(n)}'] = (header, chunk)
+    latest_links = [('prev-archive', page_url(pages))] if pages else []
+    now_rfc2822 = datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0800")
+    outputs[FEED_LATEST_FILE] = (channel_header_lines(now_rfc2822, FEED_LATEST_URL, latest_links), latest)
+
+    cache = load_page_cache()
+    # feed-lite.xml 嘅 digest 由 write_lite_feed 管
+    lite_name = os.path.basename(FEED_LITE_FILE)
+    new_cache = {lite_name: cache[lite_name]} if lite_name in cache else {}
+    written = 0
+    for path, (header, chunk) in outputs.items():
+        written += _write_feed_if_changed(path, header, chunk, cache, new_cache)
+
+    # 集數減少咗，多出嚟嘅舊分頁要刪
+    for path in glob.glob(f'{BASE_DIR}/{FEED_PAGE_PATTERN.format("*")}'):
+        if path not in outputs:
+            _remove_output(path)
+            written += 1
+    if written or new_cache != cache:
+        save_page_cache(new_cache)
+    print(f"✅ 最新 {len(latest)} 集 feed + {pages} 頁 archive，重寫 {written} 個檔: {FEED_LATEST_FILE}")
+
+
+def write_lite_feed(ia_mapping):
+    """
+    feed-lite.xml：所有有 RSS_LITE_VARIANT 細檔嘅集數，enclosure 指去細檔；
+    digest 同上次一樣就唔 render 唔寫（digest 同分頁一齊記喺 PAGE_CACHE_FILE）
+    """
+    entries = []
+    for ep_id, info in ia_mapping.items():
+        lite = lite_info(info)
+        if lite is None:
+            continue
+        render = lambda ep_id=ep_id, lite=lite: '\n'.join(render_item_lines(episode_from_info(ep_id, lite)))
+        entries.append((date_sort_key(info.get('date', '')), ep_id, content_hash(lite), render))
+    if not entries:
+        return
+    entries.sort(key=lambda e: e[:2])
+    now_rfc2822 = datetime.now().strftime("%a, %d %b %Y %H:%M:%S +0800")
+    header = channel_header_lines(now_rfc2822, FEED_LITE_URL, title=f'{PODCAST_TITLE}（輕量版）')
+    cache = load_page_cache()
+    if _write_feed_if_changed(FEED_LITE_FILE, header, entries, dict(cache), cache):
+        save_page_cache(cache)
+        print(f"✅ 輕量版 feed 已生成（{len(entries)} 集，{RSS_LITE_VARIANT}）: {FEED_LITE_FILE}")
+    else:
+        print(f"✅ 輕量版 feed 冇變（{len(entries)} 集），唔使重寫: {FEED_LITE_FILE}")
+
+
 if __name__ == '__main__':
-    generate_rss()
+    if '--incremental' in sys.argv[1:] or os.environ.get('RSS_INCREMENTAL', '').lower() in ('1', 'true', 'yes'):
+        ok = generate_rss_incremental()
+    else:
+        ok = generate_rss()
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+原生 HLS 下載器（取代 yt-dlp subprocess）
+  - 解析 master.m3u8 → variant playlist → TS segments
+  - 按 HLS_VARIANT_POLICY 揀 variant：預設揀夠轉檔 profile bitrate 嘅最低一個（多出嘅 bitrate 轉檔後都係掉咗）
+  - 經 http_client 連線池並行下載 segments，按 playlist 次序寫出
+  - 中斷後由最後完成嘅 segment 繼續（進度記錄喺 <輸出檔>.progress）
+"""
+import json
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urljoin, urlsplit
+
+import http_client
+
+# ── 設定 ──────────────────────────────────────────────
+HLS_WORKERS = int(os.environ.get('HLS_WORKERS', '8'))
+HLS_TIMEOUT = int(os.environ.get('HLS_TIMEOUT', '30'))
+# match：BANDWIDTH 夠目標 bitrate 嘅最低 variant（冇目標 bitrate，例如 copy profile，就揀最高）
+# best：頻寬最高（同 yt-dlp 預設一樣）；lowest：頻寬最低
+HLS_VARIANT_POLICY = os.environ.get('HLS_VARIANT_POLICY', 'match').lower()
+VARIANT_POLICIES = ('match', 'best', 'lowest')
+# 淨係得聲嘅 variant 優先（CODECS 有影像 codec 嘅當係影片）
+VIDEO_CODEC_PREFIXES = ('avc', 'hvc', 'hev', 'vp0', 'vp8', 'vp9', 'av01')
+TS_SYNC_BYTE = 0x47
+
+logger = logging.getLogger(__name__)
+
+
+class HLSError(Exception):
+    pass
+
+
+# ── Playlist 解析 ─────────────────────────────────────
+def parse_attributes(s):
+    """解析 `BANDWIDTH=128000,CODECS="mp4a.40.2"` 呢類屬性列表"""
+    attrs = {}
+    for m in re.finditer(r'([A-Z0-9-]+)=("[^"]*"|[^,]*)', s):
+        attrs[m.group(1)] = m.group(2).strip('"')
+    return attrs
+
+
+def parse_master(text, base_url):
+    """返回 variant 列表 [{'url', 'bandwidth', 'codecs'}]"""
+    variants = []
+    attrs = None
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-STREAM-INF:'):
+            attrs = parse_attributes(line.split(':', 1)[1])
+        elif line and not line.startswith('#') and attrs is not None:
+            variants.append({
+                'url': urljoin(base_url, line),
+                'bandwidth': int(attrs.get('BANDWIDTH', 0) or 0),
+                'codecs': attrs.get('CODECS', ''),
+            })
+            attrs = None
+    return variants
+
+
+def parse_media(text, base_url):
+    """返回 {'media_sequence', 'segments': [{'seq', 'url', 'duration'}], 'ended'}"""
+    media_sequence = 0
+    segments = []
+    duration = None
+    ended = False
+    for line in text.splitlines():
+        line = line.strip()
+        if line.startswith('#EXT-X-MEDIA-SEQUENCE:'):
+            media_sequence = int(line.split(':', 1)[1])
+        elif line.startswith('#EXT-X-KEY:'):
+            method = parse_attributes(line.split(':', 1)[1]).get('METHOD', 'NONE')
+            if method != 'NONE':
+                raise HLSError(f'唔支援加密 segment (METHOD={method})')
+        elif line.startswith('#EXTINF:'):
+            duration = float(line.split(':', 1)[1].split(',', 1)[0] or 0)
+        elif line.startswith('#EXT-X-ENDLIST'):
+            ended = True
+        elif line and not line.startswith('#'):
+            segments.append({
+                'seq': media_sequence + len(segments),
+                'url': urljoin(base_url, line),
+                'duration': duration or 0.0,
+            })
+            duration = None
+    return {'media_sequence': media_sequence, 'segments': segments, 'ended': ended}
+
+
+def fetch_playlist(url, headers=None):
+    resp = http_client.get(url, headers=headers, timeout=HLS_TIMEOUT)
+    if resp.status_code != 200:
+        raise HLSError(f'playlist HTTP {resp.status_code}: {url}')
+    if not resp.text.lstrip().startswith('#EXTM3U'):
+        raise HLSError(f'唔係 m3u8 playlist: {url}')
+    return resp.text
+
+
+def is_audio_only(variant):
+    codecs = [c.strip().lower() for c in variant['codecs'].split(',') if c.strip()]
+    return not any(c.startswith(VIDEO_CODEC_PREFIXES) for c in codecs)
+
+
+def choose_variant(variants, target_bitrate=None, policy=None):
+    """
+    按 policy（預設 HLS_VARIANT_POLICY）揀 variant
+    target_bitrate：轉檔輸出 bitrate（bps）；match 揀 BANDWIDTH >= target 嘅最低一個，全部都唔夠就揀最高
+    """
+    policy = policy or HLS_VARIANT_POLICY
+    if policy not in VARIANT_POLICIES:
+        raise ValueError(f'未知 HLS_VARIANT_POLICY: {policy}（可選: {", ".join(VARIANT_POLICIES)}）')
+    candidates = [v for v in variants if is_audio_only(v)] or variants
+    ordered = sorted(candidates, key=lambda v: v['bandwidth'])
+    if policy == 'lowest':
+        return ordered[0]
+    if policy == 'match' and target_bitrate:
+        for v in ordered:
+            if v['bandwidth'] >= target_bitrate:
+                return v
+    return ordered[-1]
+
+
+def resolve(audio_url, headers=None, target_bitrate=None):
+    """
+    由 master.m3u8（或直接 media playlist）解析出 segment 列表
+    有多個 variant 時按 choose_variant 揀，media['saved_bytes'] 係比起揀最高 variant 估計少下載嘅 bytes
+    """
+    text = fetch_playlist(audio_url, headers)
+    variant = best = None
+    if '#EXT-X-STREAM-INF' in text:
+        variants = parse_master(text, audio_url)
+        if not variants:
+            raise HLSError(f'master playlist 冇 variant: {audio_url}')
+        variant = choose_variant(variants, target_bitrate)
+        best = choose_variant(variants, policy='best')
+        text = fetch_playlist(variant['url'], headers)
+        media_url = variant['url']
+    else:
+        media_url = audio_url
+    media = parse_media(text, media_url)
+    if not media['segments']:
+        raise HLSError(f'playlist 冇 segment: {media_url}')
+    if not media['ended']:
+        raise HLSError(f'playlist 未完結（直播？）: {media_url}')
+    media['variant'] = variant
+    media['url'] = media_url
+    media['saved_bytes'] = 0
+    if variant is not None and len(variants) > 1:
+        seconds = sum(seg['duration'] for seg in media['segments'])
+        media['saved_bytes'] = int((best['bandwidth'] - variant['bandwidth']) / 8 * seconds)
+        logger.info(f'  HLS variant: {variant["bandwidth"] // 1000}k {variant["codecs"]}'
+                    f'（最高 {best["bandwidth"] // 1000}k，{len(variants)} 個可揀），'
+                    f'估計慳 {media["saved_bytes"] / 1024 / 1024:.1f}MB')
+    return media
+
+
+# ── Segment 下載 ──────────────────────────────────────
+def fetch_segment(seg, headers=None):
+    resp = http_client.get(seg['url'], headers=headers, timeout=HLS_TIMEOUT)
+    if resp.status_code != 200:
+        raise HLSError(f'segment {seg["seq"]} HTTP {resp.status_code}')
+    data = resp.content
+    expected = resp.headers.get('Content-Length')
+    if expected and int(expected) != len(data):
+        raise HLSError(f'segment {seg["seq"]} 唔完整 ({len(data)}/{expected} bytes)')
+    if not data:
+        raise HLSError(f'segment {seg["seq"]} 係空嘅')
+    if urlsplit(seg['url']).path.endswith('.ts') and data[0] != TS_SYNC_BYTE:
+        raise HLSError(f'segment {seg["seq"]} 唔係 MPEG-TS')
+    return data
+
+
+def iter_segments(segments, headers=None, start=0, workers=None):
+    """
+    並行下載 segments[start:]，按次序 yield (index, bytes)
+    最多預先下載 workers*2 個 segment，避免記憶體無限增長
+    """
+    workers = workers or HLS_WORKERS
+    window = workers * 2
+    fetch = http_client.propagate(fetch_segment)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='hls') as pool:
+        pending = {}
+        next_submit = start
+        for index in range(start, len(segments)):
+            while next_submit < len(segments) and next_submit < index + window:
+                pending[next_submit] = pool.submit(fetch, segments[next_submit], headers)
+                next_submit += 1
+            yield index, pending.pop(index).result()
+
+
+def _load_progress(path, media_url, total):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            progress = json.load(f)
+    except Exception:
+        return None
+    # URL 可能帶 token，只比較 path 部分同 segment 數目
+    if progress.get('playlist') != urlsplit(media_url).path or progress.get('total') != total:
+        return None
+    return progress
+
+
+def download(audio_url, out_path, headers=None, workers=None, target_bitrate=None):
+    """
+    下載整集 HLS 到 out_path（TS 串接），支援斷點續傳；target_bitrate 見 choose_variant
+    返回寫出嘅 bytes 數；失敗 raise HLSError / requests.RequestException
+    """
+    media = resolve(audio_url, headers, target_bitrate)
+    segments = media['segments']
+    progress_path = f'{out_path}.progress'
+
+    start, written = 0, 0
+    progress = _load_progress(progress_path, media['url'], len(segments))
+    if progress and os.path.exists(out_path) and os.path.getsize(out_path) >= progress['bytes']:
+        start, written = progress['done'], progress['bytes']
+        logger.info(f'  HLS 續傳：由第 {start + 1}/{len(segments)} 個 segment 開始')
+
+    mode = 'r+b' if start else 'wb'
+    with open(out_path, mode) as f:
+        f.seek(written)
+        f.truncate()
+        for index, data in iter_segments(segments, headers, start, workers):
+            f.write(data)
+            f.flush()
+            written += len(data)
+            with open(progress_path, 'w', encoding='utf-8') as pf:
+                json.dump({'playlist': urlsplit(media['url']).path, 'total': len(segments),
+                           'done': index + 1, 'bytes': written}, pf)
+
+    os.remove(progress_path)
+    return written
@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RTHK 集數頁面主持／嘉賓抽取器
+  - 用 str.find 定位 popEpiTit 區塊同 epidesc，唔使 DOTALL regex（冇 backtracking）
+  - 用 Aho–Corasick 自動機一次過掃「主持人／主持／嘉賓」標籤，epidesc 有主持就唔再掃落去
+  - 主持人名單同樣用 Aho–Corasick 比對
+結果同 run_update.check_host_qualification 舊版 regex 實作一致（見 bench_host_extractor.py）
+"""
+from collections import deque
+
+SECTION_MARKER = 'popEpiTit'
+EPIDESC_MARKER = 'epidesc'
+DIV_CLOSE = '</div>'
+SECTION_CLOSE_DEPTH = 3
+VALUE_STOP_CHARS = ('\n', '\r', '<')
+
+LABEL_PROGRAMME_HOST = '主持人'
+LABEL_EPISODE_HOST = '主持'
+LABEL_GUEST = '嘉賓'
+LABEL_PATTERNS = {
+    f'{label}{sep}': label
+    for label in (LABEL_PROGRAMME_HOST, LABEL_EPISODE_HOST, LABEL_GUEST)
+    for sep in ('：', ':')
+}
+
+
+class AhoCorasick:
+    """多 pattern 子字串比對（一次過掃 text）"""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [[]]
+        for pattern in patterns:
+            state = 0
+            for ch in pattern:
+                nxt = self.goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][ch] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append([])
+                state = nxt
+            self.out[state].append(pattern)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and ch not in self.goto[f]:
+                    f = self.fail[f]
+                self.fail[nxt] = self.goto[f].get(ch, 0)
+                self.out[nxt] = self.out[nxt] + self.out[self.fail[nxt]]
+
+    def finditer(self, text, start=0, end=None):
+        """yield (起始位置, pattern)"""
+        goto, fail, out = self.goto, self.fail, self.out
+        state = 0
+        for i in range(start, len(text) if end is None else end):
+            ch = text[i]
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for pattern in out[state]:
+                yield i - len(pattern) + 1, pattern
+
+    def matches(self, text):
+        return {pattern for _, pattern in self.finditer(text)}
+
+
+_LABELS = AhoCorasick(LABEL_PATTERNS)
+
+
+def find_section(html):
+    """返回 (start, end)：popEpiTit 到第一組連續三個 </div>（之間只有空白）；搵唔到返回 None"""
+    start = html.find(SECTION_MARKER)
+    if start < 0:
+        return None
+    pos = start + len(SECTION_MARKER)
+    depth = 0
+    prev_end = None
+    while True:
+        idx = html.find(DIV_CLOSE, pos)
+        if idx < 0:
+            return None
+        if prev_end is not None and html[prev_end:idx].strip() == '':
+            depth += 1
+        else:
+            depth = 1
+        prev_end = pos = idx + len(DIV_CLOSE)
+        if depth == SECTION_CLOSE_DEPTH:
+            return start, pos
+
+
+def _value_after(text, pos):
+    """標籤之後到換行或 '<' 為止嘅文字"""
+    end = len(text)
+    for ch in VALUE_STOP_CHARS:
+        idx = text.find(ch, pos, end)
+        if idx >= 0:
+            end = idx
+    return text[pos:end].strip()
+
+
+def extract_people(html):
+    """
+    返回 (ep_hosts, ep_guests, programme_hosts)
+    epidesc 有本集主持時唔會再掃 epidesc 之後，programme_hosts 可能唔齊（反正唔會用到）
+    """
+    ep_hosts, ep_guests, programme_hosts = [], [], []
+    bounds = find_section(html)
+    if not bounds:
+        return ep_hosts, ep_guests, programme_hosts
+    section = html[bounds[0]:bounds[1]]
+
+    desc_start = section.find(EPIDESC_MARKER)
+    desc_end = section.find(DIV_CLOSE, desc_start) + len(DIV_CLOSE) if desc_start >= 0 else -1
+    if desc_end < len(DIV_CLOSE):
+        desc_start = desc_end = -1
+
+    for pos, pattern in _LABELS.finditer(section):
+        # epidesc 已經搵到本集主持，節目主持人唔會用到，唔使再掃
+        if ep_hosts and pos >= desc_end:
+            break
+        label = LABEL_PATTERNS[pattern]
+        in_desc = desc_start <= pos and pos + len(pattern) <= desc_end
+        if label == LABEL_PROGRAMME_HOST:
+            target = programme_hosts
+        elif in_desc and label == LABEL_EPISODE_HOST and section[pos - 1] != '人':
+            target = ep_hosts
+        elif in_desc and label == LABEL_GUEST:
+            target = ep_guests
+        else:
+            continue
+        value = _value_after(section, pos + len(pattern))
+        if value:
+            target.append(value)
+    return ep_hosts, ep_guests, programme_hosts
+
+
+class HostMatcher:
+    """主持人名單比對（Aho–Corasick），結果按名單次序"""
+
+    def __init__(self, hosts):
+        self.hosts = list(hosts)
+        self._ac = AhoCorasick(self.hosts)
+
+    def match(self, people):
+        found = set()
+        for p in people:
+            found |= self._ac.matches(p)
+        return [h for h in self.hosts if h in found]
+
+
+def analyse(html, matcher):
+    """返回 {'qualify', 'matched', 'hosts', 'guests', 'programme_hosts'}"""
+    ep_hosts, ep_guests, programme_hosts = extract_people(html)
+    check_people = (ep_hosts + ep_guests) if ep_hosts else programme_hosts
+    matched = matcher.match(check_people)
+    return {
+        'qualify': len(matched) > 0,
+        'matched': matched,
+        'hosts': ep_hosts,
+        'guests': ep_guests,
+        'programme_hosts': programme_hosts,
+    }
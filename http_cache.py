@@ -0,0 +1,170 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+RTHK 頁面 / 月份列表嘅磁碟 HTTP cache
+  - key = URL + 排好序嘅 params
+  - 過咗 TTL 用 ETag / Last-Modified 做 conditional request（304 唔使再下載）
+  - immutable_after：entry 喺呢個時間之後抓過就當永久有效（例如已完結嘅月份）
+  - 總大小超過 HTTP_CACHE_MAX_BYTES 時按最近使用時間（LRU）刪除
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlencode
+
+import config
+import http_client
+
+# ── 設定 ──────────────────────────────────────────────
+HTTP_CACHE_DIR = os.environ.get('RTHK_HTTP_CACHE_DIR', os.path.join(config.CACHE_DIR, 'http'))
+HTTP_CACHE_MAX_BYTES = int(os.environ.get('HTTP_CACHE_MAX_BYTES', str(50 * 1024 * 1024)))
+HTTP_CACHE_ENABLED = os.environ.get('RTHK_HTTP_CACHE', '1').lower() not in ('0', 'false', 'no')
+
+_evict_lock = threading.Lock()
+
+
+class CachedResponse:
+    """同 requests.Response 用法相近：status_code / content / text / json() / headers"""
+
+    def __init__(self, status_code, content, encoding, headers, from_cache=False):
+        self.status_code = status_code
+        self.content = content
+        self.encoding = encoding
+        self.headers = headers
+        self.from_cache = from_cache
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding or 'utf-8', errors='replace')
+
+    def json(self):
+        return json.loads(self.text)
+
+
+def cache_key(url, params=None):
+    raw = url
+    if params:
+        raw += '?' + urlencode(sorted(params.items()))
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()
+
+
+def _paths(key):
+    return os.path.join(HTTP_CACHE_DIR, f'{key}.json'), os.path.join(HTTP_CACHE_DIR, f'{key}.body')
+
+
+def _load(key):
+    meta_path, body_path = _paths(key)
+    try:
+        with open(meta_path, 'r', encoding='utf-8') as f:
+            meta = json.load(f)
+        with open(body_path, 'rb') as f:
+            body = f.read()
+    except (OSError, ValueError):
+        return None, None
+    return meta, body
+
+
+def _write_atomic(path, data):
+    tmp = f'{path}.tmp.{os.getpid()}.{threading.get_ident()}'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _store(key, meta, body):
+    os.makedirs(HTTP_CACHE_DIR, exist_ok=True)
+    meta_path, body_path = _paths(key)
+    _write_atomic(body_path, body)
+    _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False).encode('utf-8'))
+
+
+def _touch(key):
+    # body 檔嘅 mtime 當 LRU 時間用
+    try:
+        os.utime(_paths(key)[1])
+    except OSError:
+        pass
+
+
+def evict(max_bytes=None):
+    """總大小超過上限時，由最耐冇用嘅 entry 開始刪除"""
+    max_bytes = HTTP_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    with _evict_lock:
+        try:
+            names = os.listdir(HTTP_CACHE_DIR)
+        except OSError:
+            return 0
+        entries = []
+        total = 0
+        for name in names:
+            if not name.endswith('.body'):
+                continue
+            key = name[:-5]
+            meta_path, body_path = _paths(key)
+            try:
+                st = os.stat(body_path)
+                size = st.st_size + os.path.getsize(meta_path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, key, size))
+            total += size
+        removed = 0
+        for _, key, size in sorted(entries):
+            if total <= max_bytes:
+                break
+            for path in _paths(key):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+
+def get(url, params=None, headers=None, ttl=0, immutable_after=None, timeout=30):
+    """
+    有 cache 嘅 GET，返回 CachedResponse
+    ttl：秒數內直接用 cache；immutable_after：epoch 秒，entry 喺此之後抓過就永久有效
+    """
+    if not HTTP_CACHE_ENABLED:
+        resp = http_client.get(url, params=params, headers=headers, timeout=timeout)
+        return CachedResponse(resp.status_code, resp.content, resp.encoding, dict(resp.headers))
+
+    key = cache_key(url, params)
+    meta, body = _load(key)
+    now = time.time()
+    if meta is not None:
+        fetched_at = meta.get('fetched_at', 0)
+        if (immutable_after is not None and fetched_at >= immutable_after) or now - fetched_at < ttl:
+            _touch(key)
+            return CachedResponse(200, body, meta.get('encoding'), meta.get('headers', {}), from_cache=True)
+
+    req_headers = dict(headers or {})
+    if meta is not None:
+        if meta.get('etag'):
+            req_headers['If-None-Match'] = meta['etag']
+        if meta.get('last_modified'):
+            req_headers['If-Modified-Since'] = meta['last_modified']
+
+    resp = http_client.get(url, params=params, headers=req_headers, timeout=timeout)
+    if resp.status_code == 304 and meta is not None:
+        meta['fetched_at'] = now
+        _store(key, meta, body)
+        return CachedResponse(200, body, meta.get('encoding'), meta.get('headers', {}), from_cache=True)
+
+    result = CachedResponse(resp.status_code, resp.content, resp.encoding, dict(resp.headers))
+    if resp.status_code == 200:
+        _store(key, {
+            'url': url,
+            'params': params or {},
+            'fetched_at': now,
+            'etag': resp.headers.get('ETag'),
+            'last_modified': resp.headers.get('Last-Modified'),
+            'encoding': resp.encoding,
+            'headers': {k: v for k, v in resp.headers.items() if k.lower() == 'content-type'},
+        }, resp.content)
+        evict()
+    return result
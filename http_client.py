@@ -0,0 +1,219 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共用 HTTP client（所有腳本都經呢度出街）
+  - 一個 requests.Session：每個 host 一個連線池，keep-alive 重用 TLS 連線
+  - 統一 retry/backoff 策略（HTTP_RETRIES / HTTP_BACKOFF 設定）
+  - 每個請求先經 rate_limit 嘅 host 限速器；429 / 503 由限速器處理（全部 worker 一齊減速、聽 Retry-After）
+  - 記錄每個 host 嘅請求次數、延遲、retry 同失敗次數
+  - track()：累計一段程式（例如一集嘅某個 stage）期間嘅請求；propagate() 將佢帶入 worker thread
+"""
+import contextlib
+import contextvars
+import os
+import threading
+import time
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+import rate_limit
+
+# ── 設定 ──────────────────────────────────────────────
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', '3'))
+HTTP_BACKOFF = float(os.environ.get('HTTP_BACKOFF', '1.0'))
+HTTP_POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', '8'))
+HTTP_POOL_SIZE = int(os.environ.get('HTTP_POOL_SIZE', '16'))
+# 429 / 503 唔喺度：由 request() 經限速器等 Retry-After 再試，唔係每個 worker 各自 sleep
+RETRY_STATUS = (500, 502, 504)
+# PUT/POST 嘅 body 多數係檔案 stream，唔可以自動重送；上傳自己處理 retry
+RETRY_METHODS = frozenset(['GET', 'HEAD', 'OPTIONS'])
+# 延遲分佈（秒），Prometheus histogram 用
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+_session = None
+_session_lock = threading.Lock()
+_latency = {}
+_latency_lock = threading.Lock()
+_tracker = contextvars.ContextVar('http_tracker', default=None)
+
+
+def retry_policy():
+    return Retry(
+        total=HTTP_RETRIES,
+        connect=HTTP_RETRIES,
+        read=HTTP_RETRIES,
+        status=HTTP_RETRIES,
+        backoff_factor=HTTP_BACKOFF,
+        status_forcelist=RETRY_STATUS,
+        allowed_methods=RETRY_METHODS,
+        # urllib3 預設會自己重試帶 Retry-After 嘅 429 / 503（每個 worker 各自 sleep），交俾限速器統一處理
+        respect_retry_after_header=False,
+        raise_on_status=False,
+    )
+
+
+def get_session():
+    """返回共用 Session（第一次使用時建立）"""
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                s = requests.Session()
+                adapter = HTTPAdapter(pool_connections=HTTP_POOL_HOSTS, pool_maxsize=HTTP_POOL_SIZE,
+                                      max_retries=retry_policy())
+                s.mount('https://', adapter)
+                s.mount('http://', adapter)
+                _session = s
+    return _session
+
+
+def _record_latency(host, seconds, retries=0, error=False):
+    with _latency_lock:
+        st = _latency.setdefault(host, {'count': 0, 'total': 0.0, 'max': 0.0, 'retries': 0, 'errors': 0,
+                                        'buckets': [0] * len(LATENCY_BUCKETS)})
+        st['count'] += 1
+        st['total'] += seconds
+        st['max'] = max(st['max'], seconds)
+        st['retries'] += retries
+        st['errors'] += error
+        for i, le in enumerate(LATENCY_BUCKETS):
+            if seconds <= le:
+                st['buckets'][i] += 1
+                break
+
+
+class Tracker:
+    """累計 track() 期間（可以跨 thread）嘅請求次數、用時、retry 同下載 bytes"""
+
+    def __init__(self):
+        self.requests = 0
+        self.seconds = 0.0
+        self.retries = 0
+        self.bytes_in = 0
+        self._lock = threading.Lock()
+
+    def add(self, seconds, retries, bytes_in):
+        with self._lock:
+            self.requests += 1
+            self.seconds += seconds
+            self.retries += retries
+            self.bytes_in += bytes_in
+
+
+@contextlib.contextmanager
+def track(tracker=None):
+    """with track() as t: ...  期間（同一 context）所有請求都會記入 t"""
+    tracker = tracker or Tracker()
+    token = _tracker.set(tracker)
+    try:
+        yield tracker
+    finally:
+        _tracker.reset(token)
+
+
+def propagate(fn):
+    """包住 fn，令佢喺其他 thread 行時都記入目前嘅 tracker（ThreadPoolExecutor / Thread 唔會自動帶 context）"""
+    tracker = _tracker.get()
+    if tracker is None:
+        return fn
+
+    def run(*args, **kwargs):
+        with track(tracker):
+            return fn(*args, **kwargs)
+    return run
+
+
+def _retry_count(resp):
+    retries = getattr(getattr(resp, 'raw', None), 'retries', None)
+    return len(retries.history) if retries is not None else 0
+
+
+def request(method, url, **kwargs):
+    host = urlsplit(url).netloc
+    limiter = rate_limit.for_host(host)
+    t0 = time.monotonic()
+    resp = None
+    throttled = 0
+    try:
+        while True:
+            if limiter is not None:
+                limiter.acquire()
+            try:
+                resp = get_session().request(method, url, **kwargs)
+            except requests.RequestException:
+                if limiter is not None:
+                    limiter.record(None)
+                raise
+            if limiter is None:
+                return resp
+            limiter.record(resp.status_code, resp.headers.get('Retry-After'))
+            # 可以重送嘅請求遇到 429 / 503：等限速器放行（Retry-After）再試；PUT 之類交返俾上傳自己處理
+            if (resp.status_code in rate_limit.THROTTLE_STATUS and method in RETRY_METHODS
+                    and throttled < HTTP_RETRIES):
+                throttled += 1
+                resp.close()
+                continue
+            return resp
+    finally:
+        elapsed = time.monotonic() - t0
+        retries = _retry_count(resp) + throttled
+        _record_latency(host, elapsed, retries, error=resp is None)
+        tracker = _tracker.get()
+        if tracker is not None:
+            bytes_in = len(resp.content) if resp is not None and not kwargs.get('stream') else 0
+            tracker.add(elapsed, retries, bytes_in)
+
+
+def get(url, **kwargs):
+    return request('GET', url, **kwargs)
+
+
+def head(url, **kwargs):
+    return request('HEAD', url, **kwargs)
+
+
+def put(url, **kwargs):
+    return request('PUT', url, **kwargs)
+
+
+def post(url, **kwargs):
+    return request('POST', url, **kwargs)
+
+
+def delete(url, **kwargs):
+    return request('DELETE', url, **kwargs)
+
+
+def latency_stats():
+    """返回 {host: {'count', 'total', 'avg', 'max', 'retries', 'errors', 'buckets'}}（秒）"""
+    with _latency_lock:
+        return {
+            host: {
+                'count': st['count'],
+                'total': round(st['total'], 3),
+                'avg': round(st['total'] / st['count'], 3) if st['count'] else 0.0,
+                'max': round(st['max'], 3),
+                'retries': st['retries'],
+                'errors': st['errors'],
+                'buckets': list(st['buckets']),
+            }
+            for host, st in _latency.items()
+        }
+
+
+def reset_latency_stats():
+    """清空延遲統計（常駐模式每輪更新前叫，令每輪統計獨立）"""
+    with _latency_lock:
+        _latency.clear()
+
+
+def format_latency_stats():
+    return '; '.join(
+        f'{host}: {st["count"]} 次, 平均 {st["avg"]:.2f}s, 最長 {st["max"]:.2f}s'
+        + (f', retry {st["retries"]} 次' if st['retries'] else '')
+        + (f', 失敗 {st["errors"]} 次' if st['errors'] else '')
+        for host, st in sorted(latency_stats().items())
+    )
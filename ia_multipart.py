@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Internet Archive S3 multipart 上傳（可續傳）
+  - initiate（POST ?uploads）→ 並行上傳各 part（PUT ?partNumber&uploadId）→ complete（POST ?uploadId）
+  - 每個 part 帶 Content-MD5，並核對回應 ETag == part 嘅 MD5
+  - upload-id 同已完成嘅 part 記錄喺 .cache/multipart/，按檔案內容（md5 + size）對應：中斷後再跑，
+    就算重新下載轉檔，只要內容一樣都會跳過已完成嘅 part；內容唔同就 abort 舊 upload-id 再由頭開始
+  - complete 之後核對整個檔案嘅 multipart ETag
+  - remote_file()：經 IA metadata API 查 item 入面某個檔案嘅 md5 / size（上傳前去重用）
+  - IA_S3_ENDPOINT / IA_METADATA_ENDPOINT 可以指去本地 stand-in 做測試
+"""
+import base64
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from xml.sax.saxutils import escape
+
+import requests
+
+import config
+import content_hash
+import http_client
+import rate_limit
+
+# ── 設定 ──────────────────────────────────────────────
+IA_S3_ENDPOINT = os.environ.get('IA_S3_ENDPOINT', 'https://s3.us.archive.org').rstrip('/')
+IA_METADATA_ENDPOINT = os.environ.get('IA_METADATA_ENDPOINT', 'https://archive.org/metadata').rstrip('/')
+MULTIPART_STATE_DIR = os.path.join(config.CACHE_DIR, 'multipart')
+MULTIPART_PART_SIZE = int(os.environ.get('IA_MULTIPART_PART_SIZE', str(8 * 1024 * 1024)))
+MULTIPART_WORKERS = int(os.environ.get('IA_MULTIPART_WORKERS', '4'))
+MULTIPART_PART_RETRIES = 3
+# IA S3 上傳失敗後等幾耐再試（秒，第 n 次 × 2^(n-1)）：IA slow down 通常維持幾十秒，等太短會一次過用晒 retry
+IA_RETRY_BACKOFF = float(os.environ.get('IA_RETRY_BACKOFF', '30'))
+
+logger = logging.getLogger(__name__)
+
+
+class MultipartError(Exception):
+    pass
+
+
+class UploadExpired(MultipartError):
+    """upload-id 已失效（例如被 abort），要由頭開始"""
+
+
+def object_url(item_id, filename):
+    return f'{IA_S3_ENDPOINT}/{item_id}/{filename}'
+
+
+def remote_file(item_id, filename):
+    """返回 IA item 入面 filename 嘅 metadata（'md5', 'size' 等），冇呢個檔或者查唔到返回 None"""
+    try:
+        resp = http_client.get(f'{IA_METADATA_ENDPOINT}/{item_id}/files', timeout=30)
+        if resp.status_code != 200:
+            return None
+        files = resp.json().get('result') or []
+    except (requests.RequestException, ValueError) as e:
+        logger.warning(f'  查詢 IA metadata 失敗（當冇檔案處理）: {e}')
+        return None
+    for f in files:
+        if f.get('name') == filename:
+            return f
+    return None
+
+
+def same_content(remote, digests):
+    """IA 上面嘅檔案同本地 digests（content_hash）係咪一樣"""
+    if not remote or not remote.get('md5'):
+        return False
+    try:
+        size_ok = int(remote.get('size', -1)) == digests['size']
+    except (TypeError, ValueError):
+        size_ok = False
+    return size_ok and remote['md5'] == digests['md5']
+
+
+def _state_path(item_id, filename):
+    return os.path.join(MULTIPART_STATE_DIR, f'{item_id}__{filename}.json')
+
+
+def _load_state(path):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _save_state(path, state):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f'{path}.tmp.{threading.get_ident()}'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(state, f)
+    os.replace(tmp, path)
+
+
+def _auth_headers(headers):
+    return {'Authorization': headers['Authorization']} if 'Authorization' in headers else {}
+
+
+def initiate(url, headers):
+    resp = http_client.post(f'{url}?uploads', headers=headers, timeout=120)
+    if resp.status_code not in (200, 201):
+        raise MultipartError(f'initiate HTTP {resp.status_code}: {resp.text[:200]}')
+    m = re.search(r'<UploadId>([^<]+)</UploadId>', resp.text)
+    if not m:
+        raise MultipartError(f'initiate 回應冇 UploadId: {resp.text[:200]}')
+    return m.group(1)
+
+
+def upload_part(url, upload_id, part_number, data, headers):
+    """上傳一個 part，核對 ETag 同本地 MD5 一致，返回 ETag（hex）"""
+    digest = hashlib.md5(data)
+    part_headers = dict(_auth_headers(headers))
+    part_headers['Content-MD5'] = base64.b64encode(digest.digest()).decode('ascii')
+    part_headers['Content-Length'] = str(len(data))
+    last_error = None
+    for attempt in range(1, MULTIPART_PART_RETRIES + 1):
+        try:
+            resp = http_client.put(url, params={'partNumber': part_number, 'uploadId': upload_id},
+                                   data=data, headers=part_headers, timeout=300)
+        except requests.RequestException as e:
+            last_error = str(e)
+        else:
+            if resp.status_code == 404:
+                raise UploadExpired(f'upload {upload_id} 已失效 (HTTP 404)')
+            if resp.status_code in (200, 201):
+                etag = resp.headers.get('ETag', '').strip('"')
+                if etag == digest.hexdigest():
+                    return etag
+                last_error = f'ETag 唔一致: {etag} != {digest.hexdigest()}'
+            else:
+                last_error = f'HTTP {resp.status_code}: {resp.text[:200]}'
+        logger.warning(f'  part {part_number} 上傳失敗（第 {attempt}/{MULTIPART_PART_RETRIES} 次）: {last_error}')
+        if attempt < MULTIPART_PART_RETRIES:
+            rate_limit.backoff(url, attempt, IA_RETRY_BACKOFF)
+    raise MultipartError(f'part {part_number} 上傳最終失敗: {last_error}')
+
+
+def abort(url, upload_id, headers):
+    """放棄 upload-id（刪走 S3 上面已上傳嘅 part）；失敗只記 log"""
+    try:
+        resp = http_client.delete(url, params={'uploadId': upload_id}, headers=_auth_headers(headers), timeout=60)
+    except requests.RequestException as e:
+        logger.warning(f'  abort multipart {upload_id} 失敗: {e}')
+        return False
+    # 404 = 已經唔存在（完成咗或者早已 abort）
+    if resp.status_code not in (200, 204, 404):
+        logger.warning(f'  abort multipart {upload_id} 失敗: HTTP {resp.status_code}')
+        return False
+    return True
+
+
+def delete_object(item_id, filename, headers):
+    """刪走 item 入面嘅檔案（例如串流上傳中途失敗留低嘅半截檔）；成功（或者本身冇）返回 True"""
+    url = object_url(item_id, filename)
+    delete_headers = dict(_auth_headers(headers))
+    # 連 IA 自動生成嘅衍生檔一齊刪
+    delete_headers['x-archive-cascade-delete'] = '1'
+    try:
+        resp = http_client.delete(url, headers=delete_headers, timeout=60)
+    except requests.RequestException as e:
+        logger.error(f'  刪除 {url} 失敗: {e}')
+        return False
+    if resp.status_code not in (200, 204, 404):
+        logger.error(f'  刪除 {url} 失敗: HTTP {resp.status_code}')
+        return False
+    return True
+
+
+def complete(url, upload_id, parts, headers):
+    body = '<CompleteMultipartUpload>' + ''.join(
+        f'<Part><PartNumber>{n}</PartNumber><ETag>"{escape(etag)}"</ETag></Part>'
+        for n, etag in sorted(parts.items())
+    ) + '</CompleteMultipartUpload>'
+    resp = http_client.post(url, params={'uploadId': upload_id}, data=body.encode('utf-8'),
+                            headers=_auth_headers(headers), timeout=600)
+    if resp.status_code == 404:
+        raise UploadExpired(f'upload {upload_id} 已失效 (HTTP 404)')
+    # S3 可能喺 200 回應入面返 <Error>
+    if resp.status_code not in (200, 201) or '<Error>' in resp.text:
+        raise MultipartError(f'complete HTTP {resp.status_code}: {resp.text[:200]}')
+    m = re.search(r'<ETag>"?([^"<]+)"?</ETag>', resp.text)
+    expected = content_hash.multipart_etag([etag for _, etag in sorted(parts.items())])
+    if m and m.group(1) != expected:
+        raise MultipartError(f'complete ETag 唔一致: {m.group(1)} != {expected}')
+    return resp
+
+
+def upload_file(path, item_id, filename, headers, part_size=None, workers=None, digests=None):
+    """
+    multipart 上傳本地檔案；headers 係 initiate 用嘅 metadata + Authorization
+    digests（content_hash 嘅 {'md5', 'size', ...}）冇提供就即場計，用嚟判斷可唔可以續傳
+    成功返回 True，失敗 raise MultipartError
+    """
+    part_size = part_size or MULTIPART_PART_SIZE
+    workers = workers or MULTIPART_WORKERS
+    url = object_url(item_id, filename)
+    file_size = os.path.getsize(path)
+    if not digests or digests.get('size') != file_size:
+        digests = content_hash.hash_file(path)
+    state_path = _state_path(item_id, filename)
+    part_count = max(1, -(-file_size // part_size))
+
+    state = _load_state(state_path)
+    if state and (state.get('md5'), state.get('file_size'), state.get('part_size')) != (
+            digests['md5'], file_size, part_size):
+        # 內容唔同（或者舊格式記錄）：已上傳嘅 part 用唔返，abort 咗佢免得喺 S3 上面留低
+        logger.info(f'  檔案內容同上次中斷嘅 multipart 唔同，放棄 upload {state.get("upload_id")}')
+        if state.get('upload_id'):
+            abort(url, state['upload_id'], headers)
+        os.remove(state_path)
+        state = None
+    if state:
+        logger.info(f'  multipart 續傳：已完成 {len(state["parts"])}/{part_count} 個 part')
+    else:
+        state = {
+            'upload_id': initiate(url, headers),
+            'md5': digests['md5'],
+            'file_size': file_size,
+            'part_size': part_size,
+            'parts': {},
+        }
+        _save_state(state_path, state)
+
+    lock = threading.Lock()
+
+    def send(part_number):
+        with open(path, 'rb') as f:
+            f.seek((part_number - 1) * part_size)
+            data = f.read(part_size)
+        etag = upload_part(url, state['upload_id'], part_number, data, headers)
+        with lock:
+            state['parts'][str(part_number)] = etag
+            _save_state(state_path, state)
+
+    todo = [n for n in range(1, part_count + 1) if str(n) not in state['parts']]
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='ia-part') as pool:
+            for f in [pool.submit(http_client.propagate(send), n) for n in todo]:
+                f.result()
+        complete(url, state['upload_id'], {int(n): etag for n, etag in state['parts'].items()}, headers)
+    except UploadExpired:
+        # upload-id 已失效，下次由頭開始
+        os.remove(state_path)
+        raise
+
+    os.remove(state_path)
+    return True
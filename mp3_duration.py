@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+MP3 長度：只讀檔頭（ID3v2 → 第一個 frame header → Xing/Info 或 VBRI），唔 decode 音頻
+  - 本地檔用 mmap，IA 上嘅檔用 HTTP Range 讀頭 HEAD_BYTES bytes（ID3 tag 太大先再讀多次）
+  - 有 Xing/Info／VBRI 就用 frame 數計；冇就當 CBR，用 (檔案大小 - 檔頭) / bitrate 計
+補返 ia_mapping.json 入面未有 'duration' 嘅集數：
+  python3 mp3_duration.py [--workers N] [--force]
+睇指定檔案／URL 嘅長度：
+  python3 mp3_duration.py a.mp3 https://archive.org/download/.../b.mp3
+"""
+import argparse
+import mmap
+import os
+import struct
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import config
+import http_client
+from episode_store import EpisodeStore
+
+IA_MAPPING_FILE = config.IA_MAPPING_FILE
+MP3_DIR = config.MP3_DIR
+DURATION_WORKERS = int(os.environ.get('DURATION_WORKERS', '16'))
+# 第一次 Range 讀幾多：夠包 ID3v2 tag（冇封面圖）+ 第一個 frame
+HEAD_BYTES = 16 * 1024
+# 由音頻開始位置搵 frame sync 最多搵幾遠（跳過 padding／垃圾）
+SYNC_SEARCH_BYTES = 8 * 1024
+
+# (MPEG 版本, layer) → kbps；MPEG-2 同 2.5 共用
+_BITRATES = {
+    (1, 1): (0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448),
+    (1, 2): (0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384),
+    (1, 3): (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320),
+    (2, 1): (0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256),
+    (2, 2): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+    (2, 3): (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160),
+}
+_SAMPLE_RATES = {1: (44100, 48000, 32000), 2: (22050, 24000, 16000), 25: (11025, 12000, 8000)}
+_VERSIONS = {0: 25, 2: 2, 3: 1}
+_LAYERS = {1: 3, 2: 2, 3: 1}
+
+
+class MP3HeaderError(Exception):
+    """搵唔到有效 MP3 frame header"""
+
+
+def id3v2_size(buf):
+    """ID3v2 tag 總長度（冇 tag 返回 0）"""
+    if len(buf) < 10 or buf[:3] != b'ID3':
+        return 0
+    size = (buf[6] & 0x7f) << 21 | (buf[7] & 0x7f) << 14 | (buf[8] & 0x7f) << 7 | (buf[9] & 0x7f)
+    return 10 + size + (10 if buf[5] & 0x10 else 0)
+
+
+def parse_frame_header(buf, pos):
+    """解析 pos 位置嘅 frame header，唔啱返回 None"""
+    if pos + 4 > len(buf) or buf[pos] != 0xff or buf[pos + 1] & 0xe0 != 0xe0:
+        return None
+    b1, b2, b3 = buf[pos + 1], buf[pos + 2], buf[pos + 3]
+    version = _VERSIONS.get((b1 >> 3) & 3)
+    layer = _LAYERS.get((b1 >> 1) & 3)
+    bitrate_idx, rate_idx = b2 >> 4, (b2 >> 2) & 3
+    if version is None or layer is None or bitrate_idx in (0, 15) or rate_idx == 3:
+        return None
+    bitrate = _BITRATES[(min(version, 2), layer)][bitrate_idx] * 1000
+    sample_rate = _SAMPLE_RATES[version][rate_idx]
+    padding = (b2 >> 1) & 1
+    if layer == 1:
+        samples, length = 384, (12 * bitrate // sample_rate + padding) * 4
+    else:
+        samples = 576 if layer == 3 and version != 1 else 1152
+        length = samples // 8 * bitrate // sample_rate + padding
+    return {'version': version, 'layer': layer, 'bitrate': bitrate, 'sample_rate': sample_rate,
+            'samples': samples, 'length': length, 'mono': b3 >> 6 == 3}
+
+
+def find_first_frame(buf, start):
+    """由 start 開始搵第一個 frame；下一個 frame header 都對得上先算（避開 tag 入面嘅假 sync）"""
+    end = min(len(buf) - 4, start + SYNC_SEARCH_BYTES)
+    pos = buf.find(b'\xff', start, end)
+    while pos != -1:
+        frame = parse_frame_header(buf, pos)
+        if frame:
+            nxt = pos + frame['length']
+            if nxt + 4 > len(buf) or parse_frame_header(buf, nxt):
+                return pos, frame
+        pos = buf.find(b'\xff', pos + 1, end)
+    raise MP3HeaderError(f'{start} 之後 {SYNC_SEARCH_BYTES} bytes 內搵唔到 MP3 frame')
+
+
+def vbr_frame_count(buf, pos, frame):
+    """Xing/Info 或 VBRI header 記錄嘅 frame 數（冇就 None）"""
+    if frame['version'] == 1:
+        side_info = 17 if frame['mono'] else 32
+    else:
+        side_info = 9 if frame['mono'] else 17
+    xing = pos + 4 + side_info
+    if buf[xing:xing + 4] in (b'Xing', b'Info') and len(buf) >= xing + 12:
+        flags, = struct.unpack('>I', buf[xing + 4:xing + 8])
+        if flags & 1:
+            return struct.unpack('>I', buf[xing + 8:xing + 12])[0], 'xing'
+    vbri = pos + 4 + 32
+    if buf[vbri:vbri + 4] == b'VBRI' and len(buf) >= vbri + 18:
+        return struct.unpack('>I', buf[vbri + 14:vbri + 18])[0], 'vbri'
+    return None, None
+
+
+def duration_from_reader(read, total_size):
+    """
+    read(start, length) → bytes；total_size：成個檔案大小
+    返回 {'duration'（秒）, 'method'（xing / vbri / cbr）, 'bitrate', 'sample_rate'}
+    """
+    buf = read(0, HEAD_BYTES)
+    audio_start = id3v2_size(buf)
+    if audio_start + 4 > len(buf):
+        # ID3 tag（多數係封面圖）大過第一次讀嘅範圍：由音頻開始位置再讀
+        buf = read(audio_start, HEAD_BYTES)
+        base = audio_start
+    else:
+        base = 0
+    pos, frame = find_first_frame(buf, audio_start - base)
+    frames, method = vbr_frame_count(buf, pos, frame)
+    if frames:
+        duration = frames * frame['samples'] / frame['sample_rate']
+    else:
+        method = 'cbr'
+        duration = (total_size - base - pos) * 8 / frame['bitrate']
+    return {'duration': round(duration, 2), 'method': method, 'bitrate': frame['bitrate'],
+            'sample_rate': frame['sample_rate']}
+
+
+def duration_from_file(path):
+    with open(path, 'rb') as f:
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            return duration_from_reader(lambda start, length: mm[start:start + length], len(mm))
+
+
+def duration_from_url(url, timeout=30):
+    """用 Range 讀檔頭；server 唔支援 Range（200）就只讀需要嘅 bytes 然後斷線"""
+    total = None
+
+    def read(start, length):
+        nonlocal total
+        headers = {'Range': f'bytes={start}-{start + length - 1}'}
+        with http_client.get(url, headers=headers, stream=True, timeout=timeout) as resp:
+            if resp.status_code == 206:
+                total = int(resp.headers['Content-Range'].rsplit('/', 1)[1])
+                return resp.raw.read(length)
+            if resp.status_code == 200:
+                total = int(resp.headers.get('Content-Length', 0))
+                return resp.raw.read(start + length)[start:]
+            raise MP3HeaderError(f'HTTP {resp.status_code}')
+
+    head = read(0, HEAD_BYTES)
+    return duration_from_reader(lambda start, length: head if start == 0 else read(start, length), total)
+
+
+def episode_duration(ep_id, info, local_dir=MP3_DIR):
+    """本地仲有檔就 mmap，冇就 Range 讀 IA 上嘅檔"""
+    url = info.get('url', '')
+    local = os.path.join(local_dir, os.path.basename(url)) if url else None
+    if local and os.path.exists(local):
+        return duration_from_file(local)
+    return duration_from_url(url)
+
+
+def backfill(ia_mapping, workers=DURATION_WORKERS, force=False, local_dir=MP3_DIR):
+    """並行補 duration，返回 {'updated', 'failed', 'methods'}"""
+    todo = [(ep_id, info) for ep_id, info in ia_mapping.items()
+            if info.get('mime', 'audio/mpeg') == 'audio/mpeg' and (force or not info.get('duration'))]
+    summary = {'updated': 0, 'failed': 0, 'methods': {}}
+
+    def work(item):
+        ep_id, info = item
+        try:
+            return ep_id, info, episode_duration(ep_id, info, local_dir), None
+        except (MP3HeaderError, requests.RequestException, OSError, ValueError) as e:
+            return ep_id, info, None, e
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for ep_id, info, result, err in pool.map(work, todo):
+            if err:
+                print(f'  ❌ {ep_id}: {err}')
+                summary['failed'] += 1
+                continue
+            ia_mapping.put(ep_id, dict(info, duration=int(round(result['duration']))))
+            summary['updated'] += 1
+            summary['methods'][result['method']] = summary['methods'].get(result['method'], 0) + 1
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description='讀 MP3 檔頭計長度（唔 decode），補入 ia_mapping.json')
+    parser.add_argument('paths', nargs='*', help='只顯示呢啲檔案／URL 嘅長度，唔改 ia_mapping')
+    parser.add_argument('--mapping', default=IA_MAPPING_FILE)
+    parser.add_argument('--workers', type=int, default=DURATION_WORKERS)
+    parser.add_argument('--force', action='store_true', help='已有 duration 都重新計')
+    args = parser.parse_args()
+
+    if args.paths:
+        failed = 0
+        for path in args.paths:
+            try:
+                r = duration_from_url(path) if '://' in path else duration_from_file(path)
+                print(f'{path}\t{r["duration"]:.2f}s\t{r["method"]}\t{r["bitrate"] // 1000}k')
+            except (MP3HeaderError, requests.RequestException, OSError, ValueError) as e:
+                print(f'{path}\t❌ {e}')
+                failed += 1
+        return 1 if failed else 0
+
+    t0 = time.monotonic()
+    ia_mapping = EpisodeStore(args.mapping)
+    ia_mapping.load(repair=True)
+    summary = backfill(ia_mapping, args.workers, args.force)
+    ia_mapping.compact()
+    methods = ', '.join(f'{k}={v}' for k, v in sorted(summary['methods'].items()))
+    print(f'✅ 補咗 {summary["updated"]} 集長度（{methods or "-"}），失敗 {summary["failed"]} 集，'
+          f'用時 {time.monotonic() - t0:.1f}s')
+    print(f'HTTP 延遲: {http_client.format_latency_stats()}')
+    return 1 if summary['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
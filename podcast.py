@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+統一入口：一個 process 入面行晒每晚嘅流程，ia_mapping（snapshot + journal）只讀一次、各步共用
+  python3 podcast.py update                 # 同 run_update.py
+  python3 podcast.py rss [--full]           # 增量生成 RSS（--full = 成個重新 render）
+  python3 podcast.py publish                # 推 feed 去 GitHub（同 publish_github.py）
+  python3 podcast.py repair [ID ...] [--scan]
+  python3 podcast.py backfill 01/01/2024 31/12/2024   # 補處理指定日期範圍（中斷後重跑會由上次進度繼續）
+  python3 podcast.py all [--no-publish] [--notify] [--noop-exit]
+      update → rss → publish（→ Telegram 通知）；--no-publish 留返俾 daily_update_ia.sh 用 git push
+      快速檢查 RTHK 冇新集數就直接完成：唔讀 ia_mapping、唔生成 RSS、唔發佈
+      （--noop-exit：呢個情況用 exit code EXIT_NOOP 結束，等 shell 腳本唔使再讀統計檔判斷）
+各 subcommand 用到先 import 對應模組（淨係 rss 唔使載入 bs4 / ffmpeg 相關嘢）
+"""
+import argparse
+import sys
+import time
+
+# config 會載入 .env，要喺其他本地模組之前 import
+import config
+
+# podcast.py all --noop-exit 冇新集數時嘅 exit code
+EXIT_NOOP = 3
+
+
+def load_store():
+    from episode_store import EpisodeStore
+    store = EpisodeStore(config.IA_MAPPING_FILE)
+    store.load(repair=True)
+    return store
+
+
+def cmd_update(args, store=None):
+    import run_update
+    # 同 run_update.py 一樣：個別集數失敗唔當成整體失敗（last_checked 照推，失敗集數記喺 discovery index，
+    # 下次由 index 重試，最多 EPISODE_MAX_ATTEMPTS 次）
+    return run_update.main(store)
+
+
+def cmd_rss(args, store=None):
+    import generate_rss
+    episodes = store.episodes if store is not None else None
+    if args.full:
+        ok = generate_rss.generate_rss(episodes)
+    else:
+        ok = generate_rss.generate_rss_incremental(episodes)
+    return 0 if ok else 1
+
+
+def cmd_publish(args, store=None):
+    import publish_github
+    return publish_github.main()
+
+
+def cmd_repair(args, store=None):
+    import repair_episodes
+    return repair_episodes.run(args.ep_ids, args.scan, store)
+
+
+def cmd_backfill(args, store=None):
+    import run_update
+    start, end = run_update.parse_date(args.start), run_update.parse_date(args.end)
+    if not start or not end or start > end:
+        print(f'日期範圍唔啱: {args.start} → {args.end}（格式 DD/MM/YYYY）')
+        return 2
+    stats = run_update.backfill(start, end, store)
+    return 1 if stats['failed'] else 0
+
+
+def notify(stats, total=None):
+    import report
+    if total is None:
+        mapping = report.load_json(config.IA_MAPPING_FILE, None)
+        total = len(mapping) if mapping is not None else '?'
+    report.send_telegram(report.build_message(stats, total))
+
+
+def cmd_all(args):
+    import run_update
+    started = time.monotonic()
+    stats = run_update.quick_check(started) if run_update.QUICK_CHECK else None
+    if stats is not None:
+        if args.notify:
+            notify(stats)
+        print(f'冇新集數，用時 {time.monotonic() - started:.1f}s')
+        return EXIT_NOOP if args.noop_exit else 0
+
+    store = load_store()
+    stats = run_update.main(store, quick=False)
+    # 冇新集數都照生成：RSS 增量模式內容冇變就唔寫檔，publish 亦會跳過冇變嘅檔
+    if cmd_rss(args, store) != 0:
+        print('❌ 生成 RSS 失敗')
+        return 1
+    if not args.no_publish:
+        # 冇設定 GITHUB_TOKEN 只會提示跳過
+        cmd_publish(args)
+    if args.notify:
+        notify(stats, len(store))
+    print(f'全部完成，用時 {time.monotonic() - started:.1f}s')
+    return 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='RTHK 講東講西 podcast 工具')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    sub.add_parser('update', help='檢查新集數、下載、上傳到 IA')
+    p = sub.add_parser('rss', help='生成 RSS feed')
+    p.add_argument('--full', action='store_true', help='唔用 cache，成個 feed 重新 render')
+    sub.add_parser('publish', help='推 feed 檔去 GitHub')
+    p = sub.add_parser('repair', help='重新下載並上傳指定／損壞嘅集數')
+    p.add_argument('ep_ids', nargs='*', help='要修復嘅集數 ID')
+    p.add_argument('--scan', action='store_true', help='先掃描 IA 存檔，修復 missing / truncated 集數')
+    p = sub.add_parser('backfill', help='補處理一段日期範圍嘅集數（唔郁 last_checked）')
+    p.add_argument('start', help='開始日期 DD/MM/YYYY')
+    p.add_argument('end', help='結束日期 DD/MM/YYYY')
+    p = sub.add_parser('all', help='update → rss → publish，一個 process 行晒')
+    p.add_argument('--full', action='store_true', help='RSS 成個重新 render')
+    p.add_argument('--no-publish', action='store_true', help='唔經 GitHub API 發佈（由 shell 腳本 git push）')
+    p.add_argument('--notify', action='store_true', help='完成後發 Telegram 通知')
+    p.add_argument('--noop-exit', action='store_true',
+                   help=f'冇新集數時用 exit code {EXIT_NOOP} 結束（預設 0）')
+    args = parser.parse_args()
+
+    if args.command == 'all':
+        return cmd_all(args)
+    if args.command == 'update':
+        cmd_update(args)
+        return 0
+    return {'rss': cmd_rss, 'publish': cmd_publish, 'repair': cmd_repair,
+            'backfill': cmd_backfill}[args.command](args)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,26 +1,44 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
-"""Publish generated podcast files to GitHub via Contents API (no git binary required)."""
+"""Publish generated podcast files to GitHub via the REST API (no git binary required).
+
+Default (batch) mode hashes files locally as git blobs, compares them with the branch
+tree and pushes only the changed ones as a single commit through the Git Data API
+(tree -> commit -> ref). GITHUB_PUBLISH_MODE=contents keeps the old one-commit-per-file
+Contents API behaviour.
+
+Besides the data files and feeds, run_update.py and publish_github.py are published together
+with every local module they import. In batch mode, feed outputs that no longer exist locally
+(e.g. archive pages dropped by re-paging) are deleted from the branch in the same commit.
+"""
+import ast
 import base64
+import fnmatch
+import hashlib
 import json
 import os
 import sys
+from datetime import date
 from pathlib import Path
 
-import requests
-
-try:
-    from dotenv import load_dotenv
-    load_dotenv(Path(__file__).with_name('.env'))
-except Exception:
-    pass
+import config  # loads .env before the settings below are read
+import http_client
 
-BASE_DIR = Path(os.environ.get('RTHK_PODCAST_DIR', Path(__file__).resolve().parent))
+BASE_DIR = Path(config.BASE_DIR)
+SCRIPT_DIR = Path(config.SCRIPT_DIR)
 OWNER = os.environ.get('GITHUB_OWNER', 'bunfung')
 REPO = os.environ.get('GITHUB_REPO', 'my-rthk-podcast')
 BRANCH = os.environ.get('GITHUB_BRANCH', 'main')
 TOKEN = os.environ.get('GITHUB_TOKEN')
-FILES = ['ia_mapping.json', 'last_checked.json', 'feed.xml', 'run_update.py', 'publish_github.py']
+API_URL = os.environ.get('GITHUB_API_URL', 'https://api.github.com').rstrip('/')
+PUBLISH_MODE = os.environ.get('GITHUB_PUBLISH_MODE', 'batch')
+# ref update fails with 422 when the branch moved since we read it; rebuild on top and retry
+REF_UPDATE_ATTEMPTS = 3
+FILES = ['ia_mapping.json', 'last_checked.json', 'feed.xml']
+# published together with every local module they import, so the copy on GitHub can run
+SCRIPTS = ['run_update.py', 'publish_github.py']
+# generate_rss also writes feed-latest.xml, feed-lite.xml, RFC 5005 archive pages and .gz/.br copies of each feed
+FEED_GLOBS = ['feed.xml.gz', 'feed.xml.br', 'feed-latest.xml*', 'feed-lite.xml*', 'feed-page-*.xml*']
 
 
 def gh(method, url, **kwargs):
@@ -31,25 +49,70 @@ def gh(method, url, **kwargs):
     })
     if TOKEN:
         headers['Authorization'] = f'Bearer {TOKEN}'
-    r = requests.request(method, url, headers=headers, timeout=60, **kwargs)
+    r = http_client.request(method, url, headers=headers, timeout=60, **kwargs)
     if r.status_code >= 400:
         raise RuntimeError(f'{method} {url} -> {r.status_code}: {r.text[:500]}')
     return r.json() if r.text else {}
 
 
+def local_imports(script):
+    """Local modules (next to this file) that script imports, directly or through other local modules."""
+    found = []
+    pending = [script]
+    while pending:
+        tree = ast.parse((SCRIPT_DIR / pending.pop()).read_text(encoding='utf-8'))
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                modules = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom) and not node.level and node.module:
+                modules = [node.module]
+            else:
+                continue
+            for module in modules:
+                name = f'{module.split(".")[0]}.py'
+                if name not in found and name != script and (SCRIPT_DIR / name).exists():
+                    found.append(name)
+                    pending.append(name)
+    return sorted(found)
+
+
+def local_path(name):
+    """Python sources live next to this file; data and feeds under BASE_DIR."""
+    return SCRIPT_DIR / name if name.endswith('.py') else BASE_DIR / name
+
+
+def is_feed_output(name):
+    return any(fnmatch.fnmatch(name, pattern) for pattern in FEED_GLOBS)
+
+
+def publish_names():
+    """FILES, SCRIPTS and their local imports, plus whatever feed outputs currently exist."""
+    names = list(FILES)
+    for script in SCRIPTS:
+        names += [name for name in [script] + local_imports(script) if name not in names]
+    for pattern in FEED_GLOBS:
+        names += sorted(p.name for p in BASE_DIR.glob(pattern)
+                        if not p.name.endswith('.tmp') and p.name not in names)
+    return names
+
+
 def publish_file(name):
-    path = BASE_DIR / name
+    path = local_path(name)
     if not path.exists():
         print(f'skip missing {name}')
         return False
-    api = f'https://api.github.com/repos/{OWNER}/{REPO}/contents/{name}'
+    api = f'{API_URL}/repos/{OWNER}/{REPO}/contents/{name}'
     sha = None
     try:
         meta = gh('GET', api, params={'ref': BRANCH})
         sha = meta.get('sha')
     except Exception as e:
         print(f'warn: cannot get current sha for {name}: {e}')
-    content = base64.b64encode(path.read_bytes()).decode('ascii')
+    data = path.read_bytes()
+    if sha == git_blob_sha(data):
+        print(f'unchanged {name}')
+        return False
+    content = base64.b64encode(data).decode('ascii')
     payload = {
         'message': f'Daily update: {name}',
         'content': content,
@@ -62,13 +125,84 @@ def publish_file(name):
     return True
 
 
+def git_blob_sha(data):
+    """Same id `git hash-object` would give the file."""
+    return hashlib.sha1(b'blob %d\0' % len(data) + data).hexdigest()
+
+
+def repo_api(path):
+    return f'{API_URL}/repos/{OWNER}/{REPO}/{path}'
+
+
+def tree_entry(name, data, remote):
+    """Tree entry for a changed file; UTF-8 text goes inline, anything else as a blob first."""
+    entry = {'path': name, 'mode': remote.get('mode', '100644'), 'type': 'blob'}
+    try:
+        entry['content'] = data.decode('utf-8')
+    except UnicodeDecodeError:
+        blob = gh('POST', repo_api('git/blobs'),
+                  json={'content': base64.b64encode(data).decode('ascii'), 'encoding': 'base64'})
+        entry['sha'] = blob['sha']
+    return entry
+
+
+def publish_batch(names):
+    """Push every changed file in one commit; returns the list of files published."""
+    local = {}
+    for name in names:
+        path = local_path(name)
+        if not path.exists():
+            print(f'skip missing {name}')
+            continue
+        local[name] = path.read_bytes()
+
+    for attempt in range(1, REF_UPDATE_ATTEMPTS + 1):
+        head = gh('GET', repo_api(f'git/ref/heads/{BRANCH}'))['object']['sha']
+        base_tree = gh('GET', repo_api(f'git/commits/{head}'))['tree']['sha']
+        tree = gh('GET', repo_api(f'git/trees/{base_tree}'))
+        remote = {e['path']: e for e in tree.get('tree', []) if e.get('type') == 'blob'}
+
+        changed = [name for name, data in local.items()
+                   if remote.get(name, {}).get('sha') != git_blob_sha(data)]
+        # feed outputs generate_rss removed locally (e.g. archive pages after re-paging) go away remotely too
+        removed = sorted(name for name in remote if is_feed_output(name) and name not in local)
+        for name in local:
+            if name not in changed:
+                print(f'unchanged {name}')
+        if not changed and not removed:
+            return []
+
+        entries = [tree_entry(name, local[name], remote.get(name, {})) for name in changed]
+        entries += [{'path': name, 'mode': remote[name]['mode'], 'type': 'blob', 'sha': None} for name in removed]
+        changed += removed
+        new_tree = gh('POST', repo_api('git/trees'), json={'base_tree': base_tree, 'tree': entries})['sha']
+        commit = gh('POST', repo_api('git/commits'), json={
+            'message': f'Daily update: {date.today().isoformat()} ({", ".join(changed)})',
+            'tree': new_tree,
+            'parents': [head],
+        })['sha']
+        try:
+            gh('PATCH', repo_api(f'git/refs/heads/{BRANCH}'), json={'sha': commit, 'force': False})
+        except RuntimeError as e:
+            if '-> 422' not in str(e) or attempt == REF_UPDATE_ATTEMPTS:
+                raise
+            print(f'warn: {BRANCH} moved while publishing, retrying ({attempt}/{REF_UPDATE_ATTEMPTS})')
+            continue
+        for name in changed:
+            print(f'deleted {name}' if name in removed else f'published {name}')
+        print(f'commit {commit[:12]}')
+        return changed
+    return []
+
+
 def main():
     if not TOKEN:
         print('GITHUB_TOKEN not set; skip publish')
         return 2
-    changed = 0
-    for name in FILES:
-        changed += bool(publish_file(name))
+    if PUBLISH_MODE == 'contents':
+        changed = sum(bool(publish_file(name)) for name in publish_names())
+    else:
+        changed = len(publish_batch(publish_names()))
     print(f'done, published {changed} file(s)')
     return 0
 
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每個 host 一個自適應限速器，所有 worker thread 共用（http_client 每個請求之前都會 acquire）
+  - token bucket：每秒 rate 個請求，最多儲 RATE_LIMIT_BURST 個
+  - AIMD：每個正常回應 rate 加 RATE_LIMIT_STEP（最多 max_rate）；429 / 503 rate 減半（最少 RATE_LIMIT_MIN）
+  - Retry-After（秒數或 HTTP 日期）：成個 host 暫停到嗰個時間，所有 worker 一齊等；冇 Retry-After 就停 RATE_LIMIT_BACKOFF 秒
+  - circuit breaker：連續 RATE_LIMIT_BREAKER_FAILURES 次失敗（連線錯誤／5xx／429）就斷路 RATE_LIMIT_BREAKER_COOLDOWN 秒，
+    期間即刻 raise CircuitOpen（唔使等 timeout）；冷卻後半開：只放一個試探請求，其他照 raise，
+    試探成功就恢復，失敗就即刻重新斷路
+  - backoff()：上傳等自己 retry 嘅地方用，base 由 caller 俾（IA 上傳用 ia_multipart.IA_RETRY_BACKOFF）
+逐個 host 設定初始／最高速率：RATE_LIMIT_HOSTS='www.rthk.hk=4:10,s3.us.archive.org=2:8'
+"""
+import logging
+import os
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlsplit
+
+import requests
+
+# ── 設定 ──────────────────────────────────────────────
+RATE_LIMIT_ENABLED = os.environ.get('RATE_LIMIT', '1').lower() not in ('0', 'false', 'no')
+RATE_LIMIT_RATE = float(os.environ.get('RATE_LIMIT_RATE', '10'))
+RATE_LIMIT_MAX = float(os.environ.get('RATE_LIMIT_MAX', '50'))
+RATE_LIMIT_MIN = float(os.environ.get('RATE_LIMIT_MIN', '0.2'))
+RATE_LIMIT_STEP = float(os.environ.get('RATE_LIMIT_STEP', '1'))
+RATE_LIMIT_BURST = float(os.environ.get('RATE_LIMIT_BURST', '20'))
+RATE_LIMIT_BACKOFF = float(os.environ.get('RATE_LIMIT_BACKOFF', '2'))
+# Retry-After 最多聽幾耐（秒），避免 server 叫等一日
+RATE_LIMIT_MAX_WAIT = float(os.environ.get('RATE_LIMIT_MAX_WAIT', '300'))
+RATE_LIMIT_BREAKER_FAILURES = int(os.environ.get('RATE_LIMIT_BREAKER_FAILURES', '5'))
+RATE_LIMIT_BREAKER_COOLDOWN = float(os.environ.get('RATE_LIMIT_BREAKER_COOLDOWN', '60'))
+# 表示 server 太忙嘅 status：減速 + 聽 Retry-After
+THROTTLE_STATUS = (429, 503)
+
+logger = logging.getLogger(__name__)
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class CircuitOpen(requests.ConnectionError):
+    """host 斷路中（連續失敗太多次），冷卻完之前唔會發請求"""
+
+
+def parse_retry_after(value, now=None):
+    """Retry-After header → 要等幾多秒（讀唔明返回 None）"""
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - (now or datetime.now(timezone.utc))).total_seconds())
+
+
+def _parse_host_limits(raw):
+    """'host=rate[:max],...' → {host: (rate, max_rate)}"""
+    limits = {}
+    for item in filter(None, (x.strip() for x in raw.split(','))):
+        host, _, spec = item.partition('=')
+        rate, _, max_rate = spec.partition(':')
+        rate = float(rate)
+        limits[host.strip()] = (rate, float(max_rate) if max_rate else max(rate, RATE_LIMIT_MAX))
+    return limits
+
+
+# RTHK 頁面起步慢啲（以前每個 qualify worker 每 0.5 秒先一個請求），正常回應先慢慢加速
+RATE_LIMIT_HOSTS = {'www.rthk.hk': (4.0, 16.0), **_parse_host_limits(os.environ.get('RATE_LIMIT_HOSTS', ''))}
+
+
+class HostLimiter:
+    def __init__(self, host, rate=RATE_LIMIT_RATE, max_rate=RATE_LIMIT_MAX):
+        self.host = host
+        self.rate = rate
+        self.max_rate = max_rate
+        self.tokens = RATE_LIMIT_BURST
+        self.paused_until = 0.0
+        self.open_until = 0.0
+        # 斷過路、等緊試探請求結果；probe_until 之前已經有試探請求喺途
+        self.half_open = False
+        self.probe_until = 0.0
+        self.failures = 0
+        self.throttled = 0
+        self.opened = 0
+        self._refilled_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(RATE_LIMIT_BURST, self.tokens + (now - self._refilled_at) * self.rate)
+        self._refilled_at = now
+
+    def acquire(self):
+        """攞一個 token（有需要就等）；斷路中 raise CircuitOpen"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                if now < self.open_until:
+                    raise CircuitOpen(f'{self.host} 斷路中，{self.open_until - now:.0f} 秒後再試')
+                if self.half_open and now < self.probe_until:
+                    raise CircuitOpen(f'{self.host} 半開，等緊試探請求結果')
+                self._refill(now)
+                wait = self.paused_until - now
+                if wait <= 0:
+                    if self.tokens >= 1:
+                        self.tokens -= 1
+                        if self.half_open:
+                            # 呢個就係試探請求；佢冇 record（例如 caller 自己出錯）就冷卻完再放一個
+                            self.probe_until = now + RATE_LIMIT_BREAKER_COOLDOWN
+                        return
+                    wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """成個 host 暫停 seconds 秒（已經停得更耐就唔變）"""
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + min(seconds, RATE_LIMIT_MAX_WAIT))
+
+    def record(self, status=None, retry_after=None):
+        """記錄一個回應（status=None = 連線失敗），調節速率同 circuit breaker"""
+        throttled = status in THROTTLE_STATUS
+        failed = status is None or status >= 500 or throttled
+        with self._lock:
+            now = time.monotonic()
+            if throttled:
+                self.throttled += 1
+                self.rate = max(RATE_LIMIT_MIN, self.rate / 2)
+                wait = parse_retry_after(retry_after)
+                wait = RATE_LIMIT_BACKOFF if wait is None else min(wait, RATE_LIMIT_MAX_WAIT)
+                self.paused_until = max(self.paused_until, now + wait)
+                logger.warning(f'{self.host} 回應 {status}，速率降到 {self.rate:.2f}/s，暫停 {wait:.0f} 秒')
+            elif not failed:
+                self.rate = min(self.max_rate, self.rate + RATE_LIMIT_STEP)
+            if not failed:
+                self.failures = 0
+                if self.half_open:
+                    self.half_open = False
+                    self.probe_until = 0.0
+                    logger.info(f'{self.host} 試探請求成功，恢復正常')
+                return
+            self.failures += 1
+            if self.half_open:
+                self.open_until = now + RATE_LIMIT_BREAKER_COOLDOWN
+                self.probe_until = 0.0
+                self.opened += 1
+                logger.error(f'{self.host} 試探請求失敗，再斷路 {RATE_LIMIT_BREAKER_COOLDOWN:.0f} 秒')
+            elif self.failures >= RATE_LIMIT_BREAKER_FAILURES:
+                self.open_until = now + RATE_LIMIT_BREAKER_COOLDOWN
+                self.half_open = True
+                self.opened += 1
+                logger.error(f'{self.host} 連續失敗 {RATE_LIMIT_BREAKER_FAILURES} 次，'
+                             f'斷路 {RATE_LIMIT_BREAKER_COOLDOWN:.0f} 秒')
+
+    def stats(self):
+        with self._lock:
+            return {'rate': round(self.rate, 2), 'throttled': self.throttled, 'circuit_opened': self.opened}
+
+
+def for_host(host):
+    """返回 host 嘅限速器（第一次用時建立）；RATE_LIMIT=0 返回 None"""
+    if not RATE_LIMIT_ENABLED:
+        return None
+    limiter = _limiters.get(host)
+    if limiter is None:
+        with _limiters_lock:
+            limiter = _limiters.get(host)
+            if limiter is None:
+                limiter = HostLimiter(host, *RATE_LIMIT_HOSTS.get(host, (RATE_LIMIT_RATE, RATE_LIMIT_MAX)))
+                _limiters[host] = limiter
+    return limiter
+
+
+def backoff(url, attempt, base=RATE_LIMIT_BACKOFF):
+    """
+    上傳等自己處理 retry 嘅地方，失敗後叫：host 暫停 base × 2^(attempt-1) 秒（最多再加一半隨機 jitter），
+    下一個請求會喺 acquire 度等，其他 worker 對同一個 host 嘅請求都會一齊等
+    """
+    limiter = for_host(urlsplit(url).netloc)
+    seconds = base * 2 ** (attempt - 1) * random.uniform(1.0, 1.5)
+    if limiter is None:
+        time.sleep(seconds)
+    else:
+        limiter.pause(seconds)
+
+
+def stats():
+    """{host: {'rate', 'throttled', 'circuit_opened'}}"""
+    with _limiters_lock:
+        limiters = list(_limiters.values())
+    return {lim.host: lim.stats() for lim in limiters}
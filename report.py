@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+每日更新報告：讀 run_update.py 寫出嘅 stats 檔同 ia_mapping.json，一次過砌好 Telegram 通知文字
+用法：python3 report.py [--stats /tmp/rthk_update_stats.json] [--mapping ia_mapping.json] [--noop]
+  --noop：podcast.py all 快速檢查冇新集數（冇寫 stats 檔，檔入面係上次嘅統計），唔讀 stats 檔
+輸出通知文字到 stdout（daily_update_ia.sh 直接攞嚟發送）；send_telegram 俾 podcast.py / update_daemon.py 喺 process 內直接發
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+from datetime import datetime
+
+import config
+
+STATS_FILE = config.STATS_FILE
+IA_MAPPING_FILE = config.IA_MAPPING_FILE
+FEED_URL = 'https://bunfung.github.io/my-rthk-podcast/feed.xml'
+TELEGRAM_API = 'https://api.telegram.org'
+# 通知入面列出用時嘅 stage（按次序）
+REPORT_STAGES = [('qualify', '檢查'), ('resolve', '解析'), ('download', '下載'), ('transcode', '轉檔'),
+                 ('upload', '上傳'), ('stream', '串流')]
+
+logger = logging.getLogger(__name__)
+
+
+def load_json(path, default):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def format_seconds(seconds):
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f'{seconds} 秒'
+    return f'{seconds // 60} 分 {seconds % 60} 秒'
+
+
+def timing_line(stats):
+    """例：⏱️ 用時：<b>3 分 20 秒</b>（下載 95 秒、轉檔 60 秒、上傳 40 秒）"""
+    if 'duration_seconds' not in stats:
+        return None
+    summary = stats.get('stage_summary', {})
+    parts = [f'{label} {format_seconds(summary[name]["total"])}'
+             for name, label in REPORT_STAGES if summary.get(name, {}).get('total', 0) >= 1]
+    line = f'⏱️ 用時：<b>{format_seconds(stats["duration_seconds"])}</b>'
+    return f'{line}（{"、".join(parts)}）' if parts else line
+
+
+def build_message(stats, total_ia, now=None):
+    new_eps = stats.get('new_episodes', 0)
+    downloaded = stats.get('downloaded', 0)
+    uploaded = stats.get('uploaded', 0)
+    failed = stats.get('failed', 0)
+    titles = [t for t in stats.get('uploaded_titles', []) if t]
+
+    lines = [
+        '🎙️ <b>RTHK 講東講西 Podcast 每日更新報告</b>',
+        f'📅 {(now or datetime.now()).strftime("%Y-%m-%d %H:%M")}',
+        '',
+        f'📋 新集數：<b>{new_eps}</b> 集',
+        f'⬇️ 已下載：<b>{downloaded}</b> 個 MP3',
+        f'⬆️ 成功上傳：<b>{uploaded}</b> 集',
+        f'☁️ IA 總集數：<b>{total_ia}</b> 集',
+    ]
+    timing = timing_line(stats)
+    if timing:
+        lines.append(timing)
+    if titles:
+        lines += ['', '📝 <b>今日上傳集數：</b>']
+        lines += [f'  • {t}' for t in titles]
+    if failed > 0:
+        lines.append(f'❌ 上傳失敗：<b>{failed}</b> 集')
+    if new_eps == 0 and uploaded == 0:
+        lines += ['', '💤 今日暫無新集數']
+    else:
+        lines += ['', f'{"⚠️" if failed > 0 else "✅"} 今日更新完成！']
+    lines += ['', f'🔗 RSS: {FEED_URL}', '', '— Manus 自動通知系統']
+    return '\n'.join(lines)
+
+
+def send_telegram(text):
+    """發 Telegram 通知；冇設定 TELEGRAM_BOT_TOKEN / TELEGRAM_CHAT_ID 就唔發"""
+    token = os.environ.get('TELEGRAM_BOT_TOKEN')
+    chat_id = os.environ.get('TELEGRAM_CHAT_ID')
+    if not token or not chat_id:
+        return
+    # 淨係砌通知文字時唔使載入 requests
+    import http_client
+    try:
+        http_client.post(f'{TELEGRAM_API}/bot{token}/sendMessage',
+                         data={'chat_id': chat_id, 'parse_mode': 'HTML', 'text': text}, timeout=30)
+    except Exception as e:
+        logger.warning(f'Telegram 通知失敗: {e}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description='生成每日更新通知文字')
+    parser.add_argument('--stats', default=STATS_FILE)
+    parser.add_argument('--mapping', default=IA_MAPPING_FILE)
+    parser.add_argument('--noop', action='store_true', help='今次冇新集數，唔讀（上次留低嘅）stats 檔')
+    args = parser.parse_args()
+
+    stats = {} if args.noop else load_json(args.stats, {})
+    mapping = load_json(args.mapping, None)
+    print(build_message(stats, len(mapping) if mapping is not None else '?'))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,42 +7,70 @@ RTHK 《講東講西》Podcast 主更新腳本
   2. 從 RTHK 抓取比上次更新的集數
   3. 符合主持人條件 AND 唔在 ia_mapping.json → 下載 MP3
   4. 上傳到 Internet Archive
-  5. 加入 ia_mapping.json + 更新 last_checked.json
+  5. 加入 ia_mapping（journal，完成後併入 ia_mapping.json）+ 更新 last_checked.json
   6. 輸出統計到 /tmp/rthk_update_stats.json
+
+RTHK_PIPELINE=1 時改用 pipeline 模式：
+  discover → qualify → resolve → download → transcode → upload → record
+  各 stage 用有上限嘅 queue 串連，worker 數由 PIPELINE_*_WORKERS 設定；
+  ia_mapping / last_checked 嘅更新規則同順序模式完全一樣
+RTHK_STREAM=1 時下載 → 轉檔 → 上傳全程經 pipe 串流，唔寫暫存檔
+TRANSCODE_PROFILE 揀轉檔格式（mp3-128 / speech / copy，見 transcode.py）；
+TRANSCODE_VARIANTS（例如 speech）同一次轉檔額外出細檔，上傳到同一個 IA item，記錄喺 ia_mapping 嘅 'variants'
+（串流模式只出主檔）；
+上唔到嘅 variant 記喺 discovery index 嘅 variants_pending，下次 run 淨係補做嗰幾個 variant
 """
+import base64
 import os
 import re
 import json
 import time
 import logging
+import queue
 import subprocess
+import threading
 import sys
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from datetime import datetime, date, timedelta
 from urllib.parse import quote
 
-try:
-    from dotenv import load_dotenv
-    load_dotenv(os.path.join(os.path.dirname(os.path.abspath(__file__)), '.env'))
-except Exception:
-    pass
+# config 會載入 .env；其他本地模組喺佢之後先 import，等佢哋嘅設定讀到 .env 入面嘅值
+import config
+import hls
+import host_extractor
+import http_cache
+import http_client
+import content_hash
+import ia_multipart
+import rate_limit
+import telemetry
+import transcode
+from discovery_index import FINAL_STATES, DiscoveryIndex, month_range
+from episode_store import EpisodeStore
 
 # ── 設定 ──────────────────────────────────────────────
-BASE_DIR = os.environ.get('RTHK_PODCAST_DIR', os.path.dirname(os.path.abspath(__file__)))
-MP3_DIR = os.path.join(BASE_DIR, 'mp3')
-IA_MAPPING_FILE = os.path.join(BASE_DIR, 'ia_mapping.json')
-LAST_CHECKED_FILE = os.path.join(BASE_DIR, 'last_checked.json')
-STATS_FILE = os.environ.get('RTHK_STATS_FILE', '/tmp/rthk_update_stats.json')
+BASE_DIR = config.BASE_DIR
+MP3_DIR = config.MP3_DIR
+IA_MAPPING_FILE = config.IA_MAPPING_FILE
+LAST_CHECKED_FILE = config.LAST_CHECKED_FILE
+DISCOVERY_INDEX_FILE = config.DISCOVERY_INDEX_FILE
+STATS_FILE = config.STATS_FILE
+# node_exporter textfile collector 輸出；設做空字串就唔寫
+PROM_FILE = os.environ.get('RTHK_PROM_FILE', '/tmp/rthk_update.prom')
 
 CHANNEL = 'radio1'
 PROGRAMMES = ['Free_as_the_wind', 'free_as_the_wind_sunday']
-BASE_URL = 'https://www.rthk.hk'
+# RTHK_BASE_URL / RTHK_AOD_PREFIX 可以指去本地 stand-in（見 bench_pipeline.py）
+BASE_URL = os.environ.get('RTHK_BASE_URL', 'https://www.rthk.hk').rstrip('/')
+AOD_URL_PREFIX = os.environ.get('RTHK_AOD_PREFIX', 'https://rthkaod2022')
 HEADERS = {
     'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
     'Referer': f'https://www.rthk.hk/radio/{CHANNEL}/programme/{PROGRAMMES[0]}',
 }
 
 ALLOWED_HOSTS = ['蘇奭', '邱逸', '馬鼎盛', '馮天樂', '岑逸飛']
+HOST_MATCHER = host_extractor.HostMatcher(ALLOWED_HOSTS)
 SKIP_NOTICE_KEYWORDS = [
     '節目暫停',
     '暫停',
@@ -54,6 +82,47 @@ IA_ACCESS_KEY = os.environ.get('IA_ACCESS_KEY')
 IA_SECRET_KEY = os.environ.get('IA_SECRET_KEY')
 DRY_RUN = os.environ.get('DRY_RUN', '').lower() in ('1', 'true', 'yes')
 
+# Pipeline 模式：各 stage 並行，用有上限嘅 queue 串連（RTHK_PIPELINE=1 啟用）
+PIPELINE = os.environ.get('RTHK_PIPELINE', '').lower() in ('1', 'true', 'yes')
+PIPELINE_WORKERS = {
+    'qualify': int(os.environ.get('PIPELINE_QUALIFY_WORKERS', '4')),
+    'resolve': int(os.environ.get('PIPELINE_RESOLVE_WORKERS', '2')),
+    'download': int(os.environ.get('PIPELINE_DOWNLOAD_WORKERS', '2')),
+    # 轉檔 stage 預設同 CPU 核心數一樣（實際並行數仲受 TRANSCODE_WORKERS 限制）
+    'transcode': int(os.environ.get('PIPELINE_TRANSCODE_WORKERS', '0')) or os.cpu_count() or 1,
+    'upload': int(os.environ.get('PIPELINE_UPLOAD_WORKERS', '2')),
+}
+PIPELINE_QUEUE_SIZE = int(os.environ.get('PIPELINE_QUEUE_SIZE', '8'))
+
+# 月份列表並行抓取嘅 worker 數
+DISCOVERY_WORKERS = int(os.environ.get('DISCOVERY_WORKERS', '4'))
+
+# HTTP cache TTL（秒）：過期後用 ETag / Last-Modified 重新驗證
+CACHE_TTL = {
+    'programme': int(os.environ.get('CACHE_TTL_PROGRAMME', str(6 * 3600))),
+    'month': int(os.environ.get('CACHE_TTL_MONTH', '0')),
+    'episode': int(os.environ.get('CACHE_TTL_EPISODE', str(7 * 86400))),
+}
+# 月份完結幾多日之後，月份列表當永久不變
+MONTH_SETTLE_DAYS = int(os.environ.get('MONTH_SETTLE_DAYS', '2'))
+# 失敗集數最多自動重試幾多次（之後要用 repair_episodes.py 手動修）
+EPISODE_MAX_ATTEMPTS = int(os.environ.get('EPISODE_MAX_ATTEMPTS', '5'))
+# discovery index 每記錄幾多次狀態變化就寫一次檔（中途 crash / 中斷都唔會失去進度）
+INDEX_CHECKPOINT_EVERY = int(os.environ.get('INDEX_CHECKPOINT_EVERY', '10'))
+# 快速檢查：先只抓 last_checked 之後嘅月份列表，冇新嘢就唔做完整掃描、唔寫任何狀態檔（RTHK_QUICK_CHECK=0 停用）
+QUICK_CHECK = os.environ.get('RTHK_QUICK_CHECK', '1').lower() not in ('0', 'false', 'no')
+
+# 串流模式：下載 → 轉檔 → 上傳全程經 pipe，唔寫暫存檔（RTHK_STREAM=1 啟用）
+STREAM = os.environ.get('RTHK_STREAM', '').lower() in ('1', 'true', 'yes')
+STREAM_CHUNK_SIZE = 1024 * 1024
+
+# IA multipart 上傳：檔案大過門檻就分 part 並行上傳（IA_MULTIPART=0 停用）
+IA_MULTIPART = os.environ.get('IA_MULTIPART', '1').lower() not in ('0', 'false', 'no')
+IA_MULTIPART_THRESHOLD = int(os.environ.get('IA_MULTIPART_THRESHOLD', str(32 * 1024 * 1024)))
+
+# HLS 下載方式：native（內建並行下載，預設）或 yt-dlp
+HLS_BACKEND = os.environ.get('HLS_BACKEND', 'native').lower()
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(levelname)s - %(message)s',
@@ -99,7 +168,7 @@ def save_json(path, data):
 def get_available_months(programme):
     from bs4 import BeautifulSoup
     url = f'{BASE_URL}/radio/{CHANNEL}/programme/{programme}'
-    resp = requests.get(url, headers=HEADERS, timeout=30)
+    resp = http_cache.get(url, headers=HEADERS, ttl=CACHE_TTL['programme'], timeout=30)
     soup = BeautifulSoup(resp.text, 'html.parser')
     months = []
     select = soup.find('select', class_='selMonWrap')
@@ -111,55 +180,69 @@ def get_available_months(programme):
     return sorted(months, reverse=True)
 
 
-def get_episodes_by_month(ym, programme):
+def month_immutable_after(ym):
+    """月份完結後（加寬限期）抓到嘅列表唔會再變，返回該時間點 epoch 秒"""
+    year, month = int(ym[:4]), int(ym[4:])
+    next_month = date(year + month // 12, month % 12 + 1, 1)
+    settle = datetime.combine(next_month + timedelta(days=MONTH_SETTLE_DAYS), datetime.min.time())
+    return settle.timestamp()
+
+
+def get_episodes_by_month(ym, programme, cached=True):
+    """cached=False：直接 GET，唔讀寫 HTTP cache（快速檢查用）"""
     url = f'{BASE_URL}/radio/catchUpByMonth'
     params = {'c': CHANNEL, 'p': programme, 'm': ym}
-    resp = requests.get(url, params=params, headers=HEADERS, timeout=30)
+    if cached:
+        resp = http_cache.get(url, params=params, headers=HEADERS, ttl=CACHE_TTL['month'],
+                              immutable_after=month_immutable_after(ym), timeout=30)
+    else:
+        resp = http_client.get(url, params=params, headers=HEADERS, timeout=30)
+        resp.raise_for_status()
     data = resp.json()
     if data.get('status') == '1':
         return data.get('content', [])
     return []
 
 
-def check_host_qualification(ep_id, programme=None):
+def get_host_info(ep_id, programme=None):
     """
-    檢查集數是否符合主持人條件
-    返回 (qualify: bool, matched: list)
+    抓集數頁面，抽取主持／嘉賓並檢查主持人條件
+    返回 {'qualify', 'matched', 'hosts', 'guests', 'programme_hosts'}
+    頁面抓唔到（連線錯誤、斷路、非 200）raise StepFailed：呢集記做 failed 下次重試，唔可以當成唔符合條件
     """
     url = f'{BASE_URL}/radio/{CHANNEL}/programme/{programme or PROGRAMMES[0]}/episode/{ep_id}'
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=15)
-        text = resp.text
-
-        ep_hosts = []
-        ep_guests = []
-        programme_hosts = []
-
-        pop_match = re.search(r'popEpiTit.*?</div>\s*</div>\s*</div>', text, re.DOTALL)
-        if pop_match:
-            section = pop_match.group(0)
-            epidesc_match = re.search(r'epidesc.*?</div>', section, re.DOTALL)
-            if epidesc_match:
-                epidesc = epidesc_match.group(0)
-                ep_hosts = [clean_html(h) for h in re.findall(r'(?<![人])主持[：:]([^\n<\r]+)', epidesc) if clean_html(h)]
-                ep_guests = [clean_html(g) for g in re.findall(r'嘉賓[：:]([^\n<\r]+)', epidesc) if clean_html(g)]
-            programme_hosts = [clean_html(h) for h in re.findall(r'主持人[：:]([^\n<\r]+)', section) if clean_html(h)]
-
-        check_people = (ep_hosts + ep_guests) if ep_hosts else programme_hosts
-        matched = [h for h in ALLOWED_HOSTS if any(h in p for p in check_people)]
-        return len(matched) > 0, matched
+        resp = http_cache.get(url, headers=HEADERS, ttl=CACHE_TTL['episode'], timeout=15)
+    except requests.RequestException as e:
+        raise StepFailed(f'檢查主持人失敗 (ID: {ep_id}): {e}') from e
+    if resp.status_code != 200:
+        raise StepFailed(f'檢查主持人失敗 (ID: {ep_id}): 集數頁面 HTTP {resp.status_code}')
+    return host_extractor.analyse(resp.text, HOST_MATCHER)
 
-    except Exception as e:
-        logger.error(f'檢查主持人失敗 (ep_id={ep_id}): {e}')
-        return False, []
+
+def check_host_qualification(ep_id, programme=None):
+    """
+    檢查集數是否符合主持人條件
+    返回 (qualify: bool, matched: list)
+    """
+    info = get_host_info(ep_id, programme)
+    return info['qualify'], info['matched']
 
 
 def get_audio_url(ep_id, programme=None):
-    """獲取集數的音頻 URL"""
+    """
+    獲取集數的音頻 URL（頁面冇 URL 返回 None）
+    請求失敗（連線錯誤、斷路、非 200）raise StepFailed，同 get_host_info 一樣：逐集模式同 pipeline 模式都記做 failed
+    """
     url = f'{BASE_URL}/radio/getEpisode'
     params = {'c': CHANNEL, 'p': programme or PROGRAMMES[0], 'e': ep_id}
-    resp = requests.get(url, params=params, headers=HEADERS, timeout=30)
-    urls = re.findall(r'https://rthkaod2022[^"\']+master\.m3u8[^"\']*', resp.text)
+    try:
+        resp = http_client.get(url, params=params, headers=HEADERS, timeout=30)
+    except requests.RequestException as e:
+        raise StepFailed(f'無法獲取音頻 URL (ID: {ep_id}): {e}') from e
+    if resp.status_code != 200:
+        raise StepFailed(f'無法獲取音頻 URL (ID: {ep_id}): HTTP {resp.status_code}')
+    urls = re.findall(re.escape(AOD_URL_PREFIX) + r'[^"\']+master\.m3u8[^"\']*', resp.text)
     # 優先選冇 start= 的 URL（完整集數）
     for u in urls:
         if 'start=' not in u:
@@ -168,62 +251,94 @@ def get_audio_url(ep_id, programme=None):
 
 
 # ── 下載 MP3 ──────────────────────────────────────────
-def download_mp3(ep_id, audio_url, title):
-    """下載 MP3：yt-dlp 下載 TS → apt ffmpeg (/usr/bin/ffmpeg) 轉 mp3，返回路徑或 None"""
+def get_ffmpeg_bin():
+    return transcode.get_ffmpeg_bin()
+
+
+def ytdlp_format_args():
+    """HLS_VARIANT_POLICY 換成 yt-dlp 嘅 -f（tbr 單位係 kbps）"""
+    bitrate = transcode.get_profile().get('bitrate')
+    if hls.HLS_VARIANT_POLICY == 'lowest':
+        return ['-f', 'worst']
+    if hls.HLS_VARIANT_POLICY == 'match' and bitrate:
+        return ['-f', f'worst[tbr>={bitrate // 1000}]/best']
+    return []
+
+
+def fetch_ts(ep_id, audio_url):
+    """下載 TS 到 MP3_DIR，返回路徑或 None"""
     os.makedirs(MP3_DIR, exist_ok=True)
-    mp3_path = f'{MP3_DIR}/{ep_id}_0.mp3'
     ts_path = f'{MP3_DIR}/{ep_id}_raw.mp4'
-    try:
-        import imageio_ffmpeg
-        FFMPEG = os.environ.get('FFMPEG_BIN') or imageio_ffmpeg.get_ffmpeg_exe()
-    except Exception:
-        FFMPEG = os.environ.get('FFMPEG_BIN', 'ffmpeg')
 
-    # Step 1: yt-dlp 下載 TS（--fixup never 跳過 ffmpeg post-processing）
+    # 原生 HLS 並行下載 TS（中斷後由最後完成嘅 segment 續傳）
+    # HLS_BACKEND=yt-dlp 時沿用 yt-dlp（--fixup never 跳過 ffmpeg post-processing）
     try:
-        r = subprocess.run([sys.executable, '-m', 'yt_dlp', '--no-playlist', '--fixup', 'never',
-                            '-o', ts_path, audio_url],
+        if HLS_BACKEND == 'yt-dlp':
+            subprocess.run([sys.executable, '-m', 'yt_dlp', '--no-playlist', '--fixup', 'never',
+                            *ytdlp_format_args(), '-o', ts_path, audio_url],
                            timeout=600, capture_output=True)
+        else:
+            # 夠 profile bitrate 就得，多出嘅 bitrate 轉檔後都係掉咗
+            hls.download(audio_url, ts_path, headers=HEADERS,
+                         target_bitrate=transcode.get_profile().get('bitrate'))
         if not os.path.exists(ts_path) or os.path.getsize(ts_path) < 1024*1024:
-            logger.error(f'  ❌ yt-dlp 失敗')
+            logger.error(f'  ❌ HLS 下載失敗')
             return None
-        logger.info(f'  yt-dlp 下載完成: {os.path.getsize(ts_path)//1024//1024}MB')
+        logger.info(f'  HLS 下載完成: {os.path.getsize(ts_path)//1024//1024}MB')
+        return ts_path
     except Exception as e:
-        logger.error(f'  ❌ yt-dlp 錯誤: {e}')
+        logger.error(f'  ❌ HLS 下載錯誤: {e}')
         return None
 
-    # Step 2: apt ffmpeg 轉 mp3（-f mpegts 讀取 TS 格式）
+
+def _remove_quietly(path):
     try:
-        r2 = subprocess.run([FFMPEG, '-y', '-f', 'mpegts', '-i', ts_path,
-                             '-acodec', 'libmp3lame', '-b:a', '128k', mp3_path],
-                            timeout=600, capture_output=True)
-        if os.path.exists(ts_path):
-            os.remove(ts_path)
-        if r2.returncode == 0 and os.path.exists(mp3_path) and os.path.getsize(mp3_path) > 100000:
-            size_mb = os.path.getsize(mp3_path) / 1024 / 1024
-            logger.info(f'  ✅ 下載完成: {size_mb:.1f}MB')
-            return mp3_path
-        else:
-            logger.error(f'  ❌ ffmpeg 轉換失敗: {r2.returncode}')
-            return None
+        os.remove(path)
+    except OSError:
+        pass
+
+
+def transcode_ts(ep_id, ts_path, variants=None):
+    """
+    用 TRANSCODE_PROFILE 轉檔（經共用 ffmpeg worker pool），返回 (路徑, 轉檔結果) 或 (None, 結果)
+    variants：額外輸出嘅 profile 名（預設 TRANSCODE_VARIANTS），同主檔同一個 ffmpeg 出，結果喺 result['variants']
+    """
+    out_path = transcode.output_path(MP3_DIR, ep_id)
+    names = transcode.TRANSCODE_VARIANTS if variants is None else variants
+    variant_paths = {v: transcode.variant_path(MP3_DIR, ep_id, v) for v in names}
+    try:
+        result = transcode.transcode(ts_path, out_path, variants=variant_paths)
     except Exception as e:
         logger.error(f'  ❌ ffmpeg 錯誤: {e}')
-        if os.path.exists(ts_path):
-            os.remove(ts_path)
-        return None
+        result = None
+    if os.path.exists(ts_path):
+        os.remove(ts_path)
+    if result and result['returncode'] == 0 and os.path.exists(out_path) and os.path.getsize(out_path) > 100000:
+        size_mb = os.path.getsize(out_path) / 1024 / 1024
+        extra = ''.join(f'，{v} {info["size"] / 1024 / 1024:.1f}MB'
+                        for v, info in result.get('variants', {}).items())
+        logger.info(f'  ✅ 轉檔完成 [{result["profile"]}]: {size_mb:.1f}MB{extra}，'
+                    f'CPU {result["cpu_seconds"]:.1f}s (ID: {ep_id})')
+        return out_path, result
+    if result:
+        logger.error(f'  ❌ ffmpeg 轉換失敗: {result["returncode"]} {" / ".join(result.get("errors", []))[-300:]}')
+    for path in variant_paths.values():
+        _remove_quietly(path)
+    return None, result
 
 
-# ── 上傳到 IA ─────────────────────────────────────────
-def upload_to_ia(ep_id, mp3_path, title, ep_date):
-    """上傳 MP3 到 Internet Archive，返回 ia_info dict 或 None"""
-    if not IA_ACCESS_KEY or not IA_SECRET_KEY:
-        logger.error('  ❌ IA_ACCESS_KEY / IA_SECRET_KEY 未設定')
+def download_mp3(ep_id, audio_url, title):
+    """下載 MP3：原生 HLS 下載 TS → ffmpeg 轉檔（TRANSCODE_PROFILE，唔出 variants），返回路徑或 None"""
+    ts_path = fetch_ts(ep_id, audio_url)
+    if not ts_path:
         return None
+    out_path, _ = transcode_ts(ep_id, ts_path, variants=())
+    return out_path
 
-    item_id = f'rthk-jiang-dong-jiang-xi-{ep_id}'
-    filename = f'{ep_id}_0.mp3'
-    file_size = os.path.getsize(mp3_path)
 
+# ── 上傳到 IA ─────────────────────────────────────────
+def ia_upload_headers(title, ep_date, content_type='audio/mpeg'):
+    """IA S3 上傳 headers（metadata + 認證），唔包 Content-Length"""
     try:
         day, month, year = ep_date.split('/')
         iso_date = f'{year}-{month}-{day}'
@@ -244,74 +359,391 @@ def upload_to_ia(ep_id, mp3_path, title, ep_date):
         'x-archive-meta-language': 'zho',
         'x-archive-meta-date': iso_date,
         'x-archive-auto-make-bucket': '1',
-        'Content-Type': 'audio/mpeg',
-        'Content-Length': str(file_size),
+        'Content-Type': content_type,
     }
+    return headers
+
 
-    upload_url = f'https://s3.us.archive.org/{item_id}/{filename}'
+def ia_record(item_id, filename, title, ep_date, mime, digests):
+    """ia_mapping 記錄；digests 係 content_hash 嘅 {'md5', 'sha256', 'size'}（轉檔結果仲會有 'duration'）"""
+    ia_info = {
+        'item_id': item_id,
+        'url': f'https://archive.org/download/{item_id}/{filename}',
+        'size': digests['size'],
+        'title': title,
+        'date': ep_date
+    }
+    if mime != 'audio/mpeg':
+        ia_info['mime'] = mime
+    ia_info['md5'] = digests['md5']
+    ia_info['sha256'] = digests['sha256']
+    if digests.get('duration'):
+        ia_info['duration'] = int(round(digests['duration']))
+    return ia_info
+
+
+def upload_to_ia(ep_id, mp3_path, title, ep_date, digests=None):
+    """
+    上傳 MP3 到 Internet Archive，返回 ia_info dict 或 None
+    digests（轉檔時已計好嘅 md5/sha256/size）冇提供就即場計；
+    IA 已經有完全相同嘅檔案就唔再上傳（返回嘅 ia_info 帶 'skipped_upload': True）
+    """
+    if not IA_ACCESS_KEY or not IA_SECRET_KEY:
+        logger.error('  ❌ IA_ACCESS_KEY / IA_SECRET_KEY 未設定')
+        return None
+
+    item_id = f'rthk-jiang-dong-jiang-xi-{ep_id}'
+    filename = os.path.basename(mp3_path)
+    file_size = os.path.getsize(mp3_path)
+    mime = transcode.mime_for(mp3_path)
+    if not digests or digests.get('size') != file_size:
+        digests = content_hash.hash_file(mp3_path)
+
+    if ia_multipart.same_content(ia_multipart.remote_file(item_id, filename), digests):
+        logger.info(f'  ⏭️  IA 已有相同內容（md5 {digests["md5"]}），跳過上傳')
+        ia_info = ia_record(item_id, filename, title, ep_date, mime, digests)
+        ia_info['skipped_upload'] = True
+        return ia_info
+
+    headers = ia_upload_headers(title, ep_date, mime)
+    use_multipart = IA_MULTIPART and file_size >= IA_MULTIPART_THRESHOLD
+    if not use_multipart:
+        headers['Content-Length'] = str(file_size)
+        headers['Content-MD5'] = base64.b64encode(bytes.fromhex(digests['md5'])).decode('ascii')
+
+    upload_url = ia_multipart.object_url(item_id, filename)
     last_error = None
     for attempt in range(1, 4):
         try:
-            with open(mp3_path, 'rb') as f:
-                resp = requests.put(upload_url, data=f, headers=headers, timeout=600)
-
-            if resp.status_code in [200, 201]:
-                ia_url = f'https://archive.org/download/{item_id}/{filename}'
-                logger.info(f'  ✅ 上傳成功: {ia_url}')
-                return {
-                    'item_id': item_id,
-                    'url': ia_url,
-                    'size': file_size,
-                    'title': title,
-                    'date': ep_date
-                }
-
-            last_error = f'HTTP {resp.status_code}: {resp.text[:200]}'
-            logger.error(f'  ❌ 上傳失敗（第 {attempt}/3 次）{last_error}')
-        except requests.RequestException as e:
+            if use_multipart:
+                # 大檔用 multipart：parts 並行上傳，失敗後只重傳未完成嘅 part
+                ia_multipart.upload_file(mp3_path, item_id, filename, headers, digests=digests)
+                resp = None
+            else:
+                with open(mp3_path, 'rb') as f:
+                    resp = http_client.put(upload_url, data=f, headers=headers, timeout=600)
+
+            etag = resp.headers.get('ETag', '').strip('"') if resp is not None else ''
+            if resp is not None and resp.status_code in [200, 201] and etag and etag != digests['md5']:
+                last_error = f'ETag 唔一致: {etag} != {digests["md5"]}'
+                logger.error(f'  ❌ 上傳內容核對失敗（第 {attempt}/3 次）{last_error}')
+            elif resp is None or resp.status_code in [200, 201]:
+                ia_info = ia_record(item_id, filename, title, ep_date, mime, digests)
+                logger.info(f'  ✅ 上傳成功: {ia_info["url"]}')
+                return ia_info
+            else:
+                last_error = f'HTTP {resp.status_code}: {resp.text[:200]}'
+                logger.error(f'  ❌ 上傳失敗（第 {attempt}/3 次）{last_error}')
+        except (requests.RequestException, ia_multipart.MultipartError) as e:
             last_error = str(e)
             logger.error(f'  ❌ 上傳連線失敗（第 {attempt}/3 次）: {e}')
 
         if attempt < 3:
-            time.sleep(30 * attempt)
+            # 同一個 host 暫停一陣，下次 PUT 會喺限速器等
+            rate_limit.backoff(upload_url, attempt, ia_multipart.IA_RETRY_BACKOFF)
 
     logger.error(f'  ❌ 上傳最終失敗: {last_error}')
     return None
 
 
-# ── 主流程 ────────────────────────────────────────────
-def main():
-    # 讀取現有記錄
-    ia_mapping = load_json(IA_MAPPING_FILE, {})
+# ── 串流模式：HLS → ffmpeg → IA（唔落地）───────────────
+def _iter_pipe(stream, hasher, chunk_size=STREAM_CHUNK_SIZE):
+    """逐 chunk 讀 ffmpeg stdout 俾 PUT，順手計 md5/sha256"""
+    while True:
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            return
+        hasher.update(chunk)
+        yield chunk
+
+
+class _HLSFeeder:
+    """喺背景 thread 用原生 HLS 下載器將 segments 順序寫入 ffmpeg stdin（介面模仿 Popen）"""
+
+    def __init__(self, audio_url, target_bitrate=None):
+        self.audio_url = audio_url
+        self.target_bitrate = target_bitrate
+        self.returncode = None
+        self._thread = None
+        self._killed = False
+
+    def start(self, sink):
+        self._thread = threading.Thread(target=http_client.propagate(self._run), args=(sink,), daemon=True)
+        self._thread.start()
+
+    def _run(self, sink):
+        try:
+            media = hls.resolve(self.audio_url, HEADERS, self.target_bitrate)
+            for _, data in hls.iter_segments(media['segments'], HEADERS):
+                if self._killed:
+                    raise hls.HLSError('已中止')
+                sink.write(data)
+            self.returncode = 0
+        except Exception as e:
+            logger.error(f'  ❌ HLS 串流下載錯誤: {e}')
+            self.returncode = 1
+        finally:
+            try:
+                sink.close()
+            except OSError:
+                pass
+
+    def poll(self):
+        return None if self._thread.is_alive() else self.returncode
+
+    def wait(self, timeout=None):
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise subprocess.TimeoutExpired('hls', timeout)
+        return self.returncode
+
+    def kill(self):
+        self._killed = True
+
+
+def stream_to_ia(ep_id, audio_url, title, ep_date):
+    """
+    串流模式：HLS segments 寫入 ffmpeg stdin 轉檔（TRANSCODE_PROFILE）→ stdout 直接 chunked PUT 到 IA
+    全程唔寫暫存檔，返回 ia_info dict 或 None
+    下載／轉檔中途失敗時 PUT 可能已經將半截內容寫咗上 IA；三次都唔得就刪走，唔好留低一個爛檔
+    """
+    if not IA_ACCESS_KEY or not IA_SECRET_KEY:
+        logger.error('  ❌ IA_ACCESS_KEY / IA_SECRET_KEY 未設定')
+        return None
+
+    item_id = f'rthk-jiang-dong-jiang-xi-{ep_id}'
+    profile = transcode.get_profile()
+    filename = f'{ep_id}_0.{profile["ext"]}'
+    upload_url = ia_multipart.object_url(item_id, filename)
+    headers = ia_upload_headers(title, ep_date, profile['mime'])
+    FFMPEG = get_ffmpeg_bin()
+
+    last_error = None
+    partial = False
+    for attempt in range(1, 4):
+        hasher = content_hash.Hasher()
+        if HLS_BACKEND == 'yt-dlp':
+            fetch = subprocess.Popen([sys.executable, '-m', 'yt_dlp', '--no-playlist', '--fixup', 'never',
+                                      '--quiet', *ytdlp_format_args(), '-o', '-', audio_url],
+                                     stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            enc_stdin = fetch.stdout
+        else:
+            fetch = _HLSFeeder(audio_url, profile.get('bitrate'))
+            enc_stdin = subprocess.PIPE
+        enc = subprocess.Popen([FFMPEG] + transcode.PROGRESS_ARGS + ['-f', 'mpegts', '-i', 'pipe:0']
+                               + profile['args'] + profile['format'] + ['pipe:1'],
+                               stdin=enc_stdin, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        progress = transcode.ProgressReader(enc.stderr)
+        progress.start()
+        if HLS_BACKEND == 'yt-dlp':
+            # ffmpeg 已接手 pipe，父進程要關閉自己嗰份，yt-dlp 先會喺 ffmpeg 退出時收到 SIGPIPE
+            fetch.stdout.close()
+        else:
+            fetch.start(enc.stdin)
+        try:
+            resp = http_client.put(upload_url, data=_iter_pipe(enc.stdout, hasher),
+                                   headers=headers, timeout=600)
+            enc_rc = enc.wait(timeout=60)
+            fetch_rc = fetch.wait(timeout=60)
+            progress.join(timeout=5)
+            digests = hasher.digests()
+            digests['duration'] = progress.duration
+            etag = resp.headers.get('ETag', '').strip('"')
+            # IA 收咗個 body，但內容唔完整／唔啱
+            partial = partial or resp.status_code in [200, 201]
+            if enc_rc != 0 or fetch_rc != 0 or digests['size'] < 100000:
+                last_error = f'串流轉換失敗 (下載={fetch_rc}, ffmpeg={enc_rc}, {digests["size"]} bytes)'
+                logger.error(f'  ❌ {last_error}（第 {attempt}/3 次）')
+            elif resp.status_code in [200, 201] and etag and etag != digests['md5']:
+                last_error = f'ETag 唔一致: {etag} != {digests["md5"]}'
+                logger.error(f'  ❌ 上傳內容核對失敗（第 {attempt}/3 次）{last_error}')
+            elif resp.status_code in [200, 201]:
+                ia_info = ia_record(item_id, filename, title, ep_date, profile['mime'], digests)
+                logger.info(f'  ✅ 串流上傳成功: {ia_info["url"]} ({digests["size"] / 1024 / 1024:.1f}MB)')
+                return ia_info
+            else:
+                last_error = f'HTTP {resp.status_code}: {resp.text[:200]}'
+                logger.error(f'  ❌ 上傳失敗（第 {attempt}/3 次）{last_error}')
+        except (requests.RequestException, subprocess.TimeoutExpired) as e:
+            last_error = str(e)
+            logger.error(f'  ❌ 串流上傳失敗（第 {attempt}/3 次）: {e}')
+        finally:
+            for p in (enc, fetch):
+                if p.poll() is None:
+                    p.kill()
+                    p.wait()
+            enc.stdout.close()
+            enc.stderr.close()
+
+        if attempt < 3:
+            rate_limit.backoff(upload_url, attempt, ia_multipart.IA_RETRY_BACKOFF)
+
+    logger.error(f'  ❌ 串流上傳最終失敗: {last_error}')
+    if partial and ia_multipart.delete_object(item_id, filename, headers):
+        logger.info(f'  🗑️  已刪除 IA 上面唔完整嘅 {filename}')
+    return None
+
+
+# ── 集數處理步驟 ──────────────────────────────────────
+class StepFailed(Exception):
+    """單集處理失敗（會計入 failed，discovery index 記做 failed，下次重試）"""
+
+
+def months_to_scan(programme, last_checked_date, index):
+    """
+    需要掃嘅月份（由新到舊）
+    索引有記錄時直接由上次檢查月份推算到今個月，唔使再抓節目頁面；
+    索引係空（第一次跑）先用節目頁面嘅月份選單
+    """
+    last_ym = last_checked_date.strftime('%Y%m')
+    if len(index):
+        return month_range(last_checked_date, date.today())
+    months = get_available_months(programme)
+    logger.info(f'[{programme}] 可用月份: {months}')
+    return [ym for ym in months if ym >= last_ym]
+
+
+def fetch_month_listings(last_checked_date, index, months=None):
+    """兩個 programme 嘅月份列表並行抓取，返回 {(programme, ym): episodes}；months 冇提供就用 months_to_scan"""
+    with ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS) as pool:
+        if months is None:
+            month_futures = {p: pool.submit(months_to_scan, p, last_checked_date, index) for p in PROGRAMMES}
+        listing_futures = {}
+        for programme in PROGRAMMES:
+            for ym in (month_futures[programme].result() if months is None else months):
+                logger.info(f'[{programme}] 檢查 {ym}...')
+                listing_futures[(programme, ym)] = pool.submit(get_episodes_by_month, ym, programme)
+        return {key: f.result() for key, f in listing_futures.items()}
+
+
+def has_new_episodes(last_checked_date, index):
+    """
+    快速檢查：兩個 programme 由 last_checked 月份到今個月嘅 catchUpByMonth（平時每個 programme 一個請求）
+    有集數日期新過 last_checked，或者 id 未喺 discovery index，就返回 True
+    discovery index 有未完成／要重試嘅集數（或者 variant 要補上傳）就唔使抓，直接返回 True
+    """
+    if not len(index) or index.pending(EPISODE_MAX_ATTEMPTS):
+        # 第一次跑（未有索引可以比較），或者有集數要重試
+        return True
+    if not STREAM and index.variants_pending(EPISODE_MAX_ATTEMPTS):
+        return True
+    months = month_range(last_checked_date, date.today())
+    with ThreadPoolExecutor(max_workers=DISCOVERY_WORKERS) as pool:
+        futures = [pool.submit(get_episodes_by_month, ym, p, False) for p in PROGRAMMES for ym in months]
+        for f in futures:
+            for ep in f.result():
+                ep_id = str(ep.get('id', ''))
+                ep_date = parse_date(ep.get('date', ''))
+                if ep_id and ep_date and (ep_date > last_checked_date or ep_id not in index):
+                    return True
+    return False
+
+
+def quick_check(started=None):
+    """
+    冇新嘢嘅快速路徑：冇新集數就返回 no-op 統計（'noop': True），否則返回 None
+    唔讀 ia_mapping、唔用 bs4、唔寫任何檔（discovery index / last_checked / HTTP cache / STATS_FILE 都唔郁）；
+    PROM_FILE 只更新 mtime（node_exporter 嘅 node_textfile_mtime_seconds 睇得到最近一次檢查）
+    """
+    started = time.monotonic() if started is None else started
     last_checked = load_json(LAST_CHECKED_FILE, {'last_checked_date': '01/10/2025'})
     last_checked_date = parse_date(last_checked.get('last_checked_date', '01/10/2025'))
+    index = DiscoveryIndex(DISCOVERY_INDEX_FILE)
+    index.load()
+    if has_new_episodes(last_checked_date, index):
+        return None
+    logger.info(f'快速檢查：{last_checked_date.strftime("%d/%m/%Y")} 之後冇新集數，今次唔使更新')
+    stats = {'new_episodes': 0, 'downloaded': 0, 'uploaded': 0, 'failed': 0, 'uploaded_titles': [],
+             'episodes': [], 'noop': True, 'duration_seconds': round(time.monotonic() - started, 3)}
+    if PROM_FILE and os.path.exists(PROM_FILE):
+        try:
+            os.utime(PROM_FILE)
+        except OSError as e:
+            logger.warning(f'更新 Prometheus textfile 時間失敗: {e}')
+    return stats
+
+
+def write_stats(stats, started):
+    """輸出統計（逐集 stage 用時、HTTP 延遲；另寫一份 Prometheus textfile）"""
+    stats['duration_seconds'] = round(time.monotonic() - started, 3)
+    stats['stage_summary'] = telemetry.summarise_stages(stats['episodes'])
+    stats['http'] = http_client.latency_stats()
+    stats['rate_limit'] = rate_limit.stats()
+    save_json(STATS_FILE, stats)
+    if PROM_FILE:
+        try:
+            telemetry.write_prometheus(PROM_FILE, stats)
+        except OSError as e:
+            logger.warning(f'寫入 Prometheus textfile 失敗: {e}')
+    logger.info(f'HTTP 延遲: {http_client.format_latency_stats()}')
+    if stats['stage_summary']:
+        logger.info(f'Stage 用時: {telemetry.format_stage_summary(stats["stage_summary"])}')
+
+
+def job_from_entry(ep_id, entry):
+    """由 discovery index 記錄砌 pipeline job；之前已通過主持人檢查就帶埋 hosts / guests（唔使再抓集數頁面）"""
+    job = {
+        'programme': entry['programme'],
+        'ep_id': ep_id,
+        'ep_date': parse_date(entry['date']),
+        'ep_date_str': entry['date'],
+        'title': entry.get('title', '未知'),
+    }
+    if 'hosts' in entry:
+        job['hosts'] = entry['hosts']
+        job['guests'] = entry.get('guests', [])
+    return job
 
-    logger.info(f'上次檢查日期: {last_checked_date}')
-    logger.info(f'ia_mapping 現有: {len(ia_mapping)} 集')
 
-    # 統計
-    stats = {'new_episodes': 0, 'downloaded': 0, 'uploaded': 0, 'failed': 0, 'uploaded_titles': []}
-    latest_date_seen = last_checked_date
-    failed_dates = []
-
-    # 獲取可用月份（掃兩個 programme）
-    seen_ep_ids = set()  # 避免兩個 programme 重複處理同一集數
-    for programme in PROGRAMMES:
-      months = get_available_months(programme)
-      logger.info(f'[{programme}] 可用月份: {months}')
-      for ym in months:
-        year, month = int(ym[:4]), int(ym[4:])
-        ym_date = date(year, month, 1)
-        last_ym_date = date(last_checked_date.year, last_checked_date.month, 1)
-
-        # 早於上次檢查月份，停止
-        if ym_date < last_ym_date:
-            logger.info(f'[{programme}] 月份 {ym} 早於上次檢查月份，停止')
-            break
-
-        logger.info(f'[{programme}] 檢查 {ym}...')
-        episodes = get_episodes_by_month(ym, programme)
+def listing_job(ep_id, programme, entry, ia_mapping, stats, index):
+    """
+    月份列表入面一集（日期已經喺要處理嘅範圍）：要處理就返回 job，否則 None
+    已有結論（index state）嘅集數唔會再抓任何頁面
+    """
+    # 兩個 programme 重複出現嘅集數，由 discovery index 決定歸邊個 programme 處理
+    if entry['programme'] != programme:
+        logger.info(f'  已屬 {entry["programme"]}，跳過 (ID: {ep_id})')
+        return None
+
+    logger.info(f'新集數: {entry["date"]} - {entry["title"]} (ID: {ep_id})')
+    stats['new_episodes'] += 1
+
+    # 已在 ia_mapping，跳過
+    if ep_id in ia_mapping:
+        logger.info(f'  已在 ia_mapping，跳過')
+        if entry.get('state') != 'uploaded':
+            index.set_state(ep_id, 'uploaded')
+        return None
+
+    state = entry.get('state')
+    if state in FINAL_STATES:
+        logger.info(f'  之前已處理（{state}），跳過')
+        return None
+    if state == 'failed' and entry.get('attempts', 0) >= EPISODE_MAX_ATTEMPTS:
+        logger.warning(f'  已失敗 {entry["attempts"]} 次，唔再自動重試（可用 repair_episodes.py 手動修復）')
+        return None
+
+    # RTHK 有時會出「節目暫停／特備節目通知」item，符合主持人字眼但沒有音頻。
+    if is_skip_notice_episode(entry['title']):
+        logger.info(f'  節目暫停/特備節目通知，跳過')
+        index.set_state(ep_id, 'skipped-notice')
+        return None
+
+    if state is None:
+        index.set_state(ep_id, 'discovered')
+    return job_from_entry(ep_id, entry)
+
 
+def iter_new_episodes(last_checked_date, ia_mapping, stats, progress, index):
+    """
+    掃描兩個 programme 嘅月份，逐集 yield 需要處理嘅新集數 job dict，
+    之後再 yield discovery index 入面之前未完成／失敗（未超過 EPISODE_MAX_ATTEMPTS 次）嘅集數
+    progress['latest_date_seen'] 會喺掃描期間更新；見到嘅集數會加入 discovery index
+    """
+    listings = fetch_month_listings(last_checked_date, index)
+    seen = set()
+    # 按 PROGRAMMES 次序、月份由新到舊處理，同一集以最先發現嘅 programme 為準
+    for (programme, ym), episodes in listings.items():
         for ep in episodes:
             ep_id = str(ep.get('id', ''))
             ep_date_str = ep.get('date', '')
@@ -321,106 +753,528 @@ def main():
             if not ep_date or not ep_id:
                 continue
 
+            entry, _ = index.add(ep_id, ep_date_str, programme, title)
+
             # 只處理比上次更新的集數
             if ep_date <= last_checked_date:
                 continue
 
             # 更新今次見到的最新日期
-            if ep_date > latest_date_seen:
-                latest_date_seen = ep_date
-
-            # 避免兩個 programme 重複處理同一集數
-            if ep_id in seen_ep_ids:
-                logger.info(f'  已在本次掃描處理過，跳過 (ID: {ep_id})')
+            if ep_date > progress['latest_date_seen']:
+                progress['latest_date_seen'] = ep_date
+
+            job = listing_job(ep_id, programme, entry, ia_mapping, stats, index)
+            if job:
+                seen.add(ep_id)
+                yield job
+
+    for ep_id, entry in index.pending(EPISODE_MAX_ATTEMPTS):
+        if ep_id in seen:
+            continue
+        if ep_id in ia_mapping:
+            index.set_state(ep_id, 'uploaded')
+            continue
+        logger.info(f'重試: {entry["date"]} - {entry["title"]} (ID: {ep_id}, 狀態: {entry["state"]}, '
+                    f'已失敗 {entry.get("attempts", 0)} 次)')
+        stats['retried'] = stats.get('retried', 0) + 1
+        yield job_from_entry(ep_id, entry)
+
+
+def iter_backfill_episodes(start, end, ia_mapping, stats, index):
+    """補抓 start..end（date，包括兩日）之間嘅集數；已有結論嘅集數直接跳過，所以中斷後重跑會由上次進度繼續"""
+    listings = fetch_month_listings(start, index, months=month_range(start, end))
+    for (programme, ym), episodes in listings.items():
+        for ep in episodes:
+            ep_id = str(ep.get('id', ''))
+            ep_date = parse_date(ep.get('date', ''))
+            if not ep_date or not ep_id or not start <= ep_date <= end:
                 continue
-            seen_ep_ids.add(ep_id)
+            entry, _ = index.add(ep_id, ep.get('date', ''), programme, ep.get('title', '未知'))
+            job = listing_job(ep_id, programme, entry, ia_mapping, stats, index)
+            if job:
+                yield job
 
-            logger.info(f'新集數: {ep_date_str} - {title} (ID: {ep_id})')
-            stats['new_episodes'] += 1
 
-            # 已在 ia_mapping，跳過
-            if ep_id in ia_mapping:
-                logger.info(f'  已在 ia_mapping，跳過')
+def step_qualify(job):
+    """
+    檢查主持人條件，符合返回 job（附主持／嘉賓名單），否則 None；之前已通過（job 有 hosts）就唔再抓頁面
+    集數頁面抓唔到 raise StepFailed
+    """
+    if 'hosts' in job:
+        return job
+    info = get_host_info(job['ep_id'], job['programme'])
+    if not info['qualify']:
+        logger.info(f'  ❌ 唔符合主持人條件，跳過 (ID: {job["ep_id"]})')
+        return None
+    logger.info(f'  ✅ 符合條件 (ID: {job["ep_id"]}, 匹配: {info["matched"]})')
+    job['hosts'] = info['hosts'] or info['programme_hosts']
+    job['guests'] = info['guests']
+    return job
+
+
+def step_resolve(job):
+    """獲取音頻 URL，失敗 raise StepFailed"""
+    audio_url = get_audio_url(job['ep_id'], job['programme'])
+    if not audio_url:
+        raise StepFailed(f'無法獲取音頻 URL (ID: {job["ep_id"]})')
+    job['audio_url'] = audio_url
+    return job
+
+
+def step_fetch(job):
+    """下載 TS，失敗 raise StepFailed"""
+    logger.info(f'  下載 MP3... (ID: {job["ep_id"]})')
+    ts_path = fetch_ts(job['ep_id'], job['audio_url'])
+    if not ts_path:
+        raise StepFailed(f'下載失敗 (ID: {job["ep_id"]})')
+    job['ts_path'] = ts_path
+    return job
+
+
+def step_transcode(job):
+    """轉檔，失敗 raise StepFailed"""
+    out_path, result = transcode_ts(job['ep_id'], job['ts_path'])
+    job['transcode'] = result
+    if not out_path:
+        raise StepFailed(f'轉檔失敗 (ID: {job["ep_id"]})')
+    job['mp3_path'] = out_path
+    return job
+
+
+def step_download(job):
+    """下載並轉檔，失敗 raise StepFailed"""
+    return step_transcode(step_fetch(job))
+
+
+def step_upload(job):
+    """上傳到 IA，失敗 raise StepFailed"""
+    logger.info(f'  上傳到 IA... (ID: {job["ep_id"]})')
+    ia_info = upload_to_ia(job['ep_id'], job['mp3_path'], job['title'], job['ep_date_str'],
+                           digests=job.get('transcode'))
+    if not ia_info:
+        raise StepFailed(f'上傳失敗 (ID: {job["ep_id"]})')
+    job['bytes_uploaded'] = 0 if ia_info.pop('skipped_upload', False) else ia_info['size']
+    variants = upload_variants(job)
+    if variants:
+        ia_info['variants'] = variants
+    job['ia_info'] = ia_info
+    return job
+
+
+def upload_variants(job, names=None):
+    """
+    將轉檔時一齊出嘅 variants 上傳到同一個 IA item，返回 {profile: {'url', 'size', 'md5', 'sha256'[, 'mime']}}
+    names：應該有嘅 variant（預設 TRANSCODE_VARIANTS）；轉檔冇出到或者上傳失敗嘅記喺 job['variants_pending']，
+    唔當成呢集失敗（主檔已經上咗），discovery index 會記低，下次 run 淨係補做呢啲 variant
+    """
+    names = transcode.TRANSCODE_VARIANTS if names is None else names
+    results = (job.get('transcode') or {}).get('variants') or {}
+    records = {}
+    for name in names:
+        digests = results.get(name)
+        info = digests and upload_to_ia(job['ep_id'], digests['path'], job['title'], job['ep_date_str'],
+                                        digests=digests)
+        if not info:
+            logger.warning(f'  ⚠️ variant {name} 未上傳，下次再試 (ID: {job["ep_id"]})')
+            continue
+        if not info.pop('skipped_upload', False):
+            job['bytes_uploaded'] = job.get('bytes_uploaded', 0) + info['size']
+        records[name] = {k: info[k] for k in ('url', 'size', 'mime', 'md5', 'sha256') if k in info}
+    job['variants_pending'] = [name for name in names if name not in records]
+    return records
+
+
+def transcode_variants(ep_id, ts_path, names):
+    """淨係轉 names 呢幾個 variant（同一個 ffmpeg），返回 {profile: 轉檔結果}，轉唔到嘅唔會喺入面"""
+    paths = {name: transcode.variant_path(MP3_DIR, ep_id, name) for name in names}
+    first, *rest = names
+    try:
+        result = transcode.transcode(ts_path, paths[first], profile=first,
+                                     variants={name: paths[name] for name in rest})
+    except Exception as e:
+        logger.error(f'  ❌ ffmpeg 錯誤: {e}')
+        result = None
+    if os.path.exists(ts_path):
+        os.remove(ts_path)
+    if not result or result['returncode'] != 0:
+        if result:
+            logger.error(f'  ❌ ffmpeg 轉換失敗: {result["returncode"]} '
+                         f'{" / ".join(result.get("errors", []))[-300:]}')
+        for path in paths.values():
+            _remove_quietly(path)
+        return {}
+    outputs = dict(result.get('variants', {}))
+    if 'md5' in result:
+        outputs[first] = {k: result[k] for k in ('path', 'profile', 'duration', 'md5', 'sha256', 'size')}
+    return outputs
+
+
+def retry_pending_variants(ia_mapping, index, stats):
+    """
+    主檔已上傳但 variant 未上到嘅集數：重新下載、淨係轉嗰幾個 variant 再上傳到同一個 IA item，
+    併入 ia_mapping 嘅 'variants'；仲係唔得就 variant_attempts + 1，最多試 EPISODE_MAX_ATTEMPTS 次
+    """
+    for ep_id, entry in index.variants_pending(EPISODE_MAX_ATTEMPTS):
+        info = ia_mapping.get(ep_id)
+        names = [name for name in entry['variants_pending'] if name in transcode.PROFILES]
+        if not info or not names:
+            index.set_state(ep_id, 'uploaded', variants_pending=[])
+            continue
+        logger.info(f'補上傳 variant {",".join(names)} (ID: {ep_id})')
+        job = job_from_entry(ep_id, entry)
+        job['transcode'] = {'variants': {}}
+        try:
+            step_resolve(job)
+            step_fetch(job)
+            job['transcode']['variants'] = transcode_variants(ep_id, job['ts_path'], names)
+        except StepFailed as e:
+            logger.error(f'  ❌ {e}')
+        records = upload_variants(job, names)
+        for variant in job['transcode']['variants'].values():
+            _remove_quietly(variant['path'])
+        if records:
+            ia_mapping.put(ep_id, dict(info, variants={**info.get('variants', {}), **records}))
+        pending = job['variants_pending']
+        index.set_state(ep_id, 'uploaded', variants_pending=pending,
+                        variant_attempts=entry.get('variant_attempts', 0) + 1 if pending else 0)
+        stats['variants_uploaded'] = stats.get('variants_uploaded', 0) + len(records)
+
+
+def step_stream(job):
+    """串流下載+轉檔+上傳，失敗 raise StepFailed"""
+    logger.info(f'  串流上傳到 IA... (ID: {job["ep_id"]})')
+    ia_info = stream_to_ia(job['ep_id'], job['audio_url'], job['title'], job['ep_date_str'])
+    if not ia_info:
+        raise StepFailed(f'串流上傳失敗 (ID: {job["ep_id"]})')
+    job['ia_info'] = ia_info
+    job['bytes_uploaded'] = ia_info['size']
+    return job
+
+
+def step_record(job, ia_mapping, stats):
+    """加入 ia_mapping（append 到 journal，即時 fsync），刪除本地 MP3"""
+    ia_info = dict(job['ia_info'])
+    # 重新上傳（例如 repair）今次冇出嘅 variant，IA 上面舊嗰個仲喺度，記錄照留
+    previous = (ia_mapping.get(job['ep_id']) or {}).get('variants')
+    if previous:
+        ia_info['variants'] = {**previous, **ia_info.get('variants', {})}
+    # 順手記低主持／嘉賓，之後嘅工具唔使再抓集數頁面
+    if 'hosts' in job:
+        ia_info['hosts'] = job['hosts']
+        ia_info['guests'] = job['guests']
+    ia_mapping.put(job['ep_id'], ia_info)
+    stats['uploaded'] += 1
+    stats['uploaded_titles'].append(f'{job["title"]} ({job["ep_date_str"]})')
+    if job.get('transcode'):
+        stats['transcode_cpu_seconds'] = round(
+            stats.get('transcode_cpu_seconds', 0) + job['transcode']['cpu_seconds'], 2)
+    logger.info(f'  ✅ 已記錄到 ia_mapping.json (ID: {job["ep_id"]})')
+
+    # 下載後刪除本地 MP3 同 variants（節省空間，IA 已有備份；串流模式冇本地檔）
+    if job.get('mp3_path'):
+        try:
+            os.remove(job['mp3_path'])
+            logger.info(f'  🗑️  已刪除本地 MP3')
+        except:
+            pass
+    for variant in ((job.get('transcode') or {}).get('variants') or {}).values():
+        _remove_quietly(variant['path'])
+
+
+def finish_job(job, stats, result, error=None):
+    """記低呢集嘅量度（stats['episodes']）；pipeline 模式要喺 lock 入面叫"""
+    stats['episodes'].append(telemetry.episode_summary(job, result, error))
+
+
+def mark(index, job, state, **fields):
+    """喺 discovery index 記低呢集去到邊（index 係 None 就唔記）"""
+    if index is None:
+        return
+    if state == 'resolved' and 'hosts' in job:
+        # 重試時唔使再抓集數頁面檢查主持人
+        fields.update(hosts=job['hosts'], guests=job['guests'])
+    if state == 'uploaded' and 'variants_pending' in job:
+        # 上唔到嘅 variant 下次 retry_pending_variants 補做
+        fields.update(variants_pending=job['variants_pending'], variant_attempts=0)
+    index.set_state(job['ep_id'], state, **fields)
+
+
+# ── 逐集順序處理 ──────────────────────────────────────
+def run_sequential(jobs, ia_mapping, stats, index=None, qualify=True):
+    """
+    index：記錄每集處理狀態嘅 DiscoveryIndex（None = 唔記）
+    qualify=False：跳過主持人檢查（修復已上傳過嘅集數時用）
+    """
+    for job in jobs:
+        try:
+            # 檢查主持人條件
+            if qualify:
+                with telemetry.stage(job, 'qualify'):
+                    qualified = step_qualify(job)
+                if not qualified:
+                    mark(index, job, 'not-qualified')
+                    finish_job(job, stats, 'not_qualified')
+                    continue
+
+            with telemetry.stage(job, 'resolve'):
+                step_resolve(job)
+            mark(index, job, 'resolved')
+            if DRY_RUN:
+                logger.info(f'  DRY_RUN：符合條件但跳過下載/上傳')
+                stats['uploaded_titles'].append(f'[DRY_RUN] {job["title"]} ({job["ep_date_str"]})')
+                finish_job(job, stats, 'dry_run')
                 continue
+            if STREAM:
+                with telemetry.stage(job, 'stream'):
+                    step_stream(job)
+                stats['downloaded'] += 1
+            else:
+                with telemetry.stage(job, 'download'):
+                    step_fetch(job)
+                with telemetry.stage(job, 'transcode'):
+                    step_transcode(job)
+                stats['downloaded'] += 1
+                mark(index, job, 'downloaded')
+                with telemetry.stage(job, 'upload'):
+                    step_upload(job)
+        except StepFailed as e:
+            logger.error(f'  ❌ {e}')
+            stats['failed'] += 1
+            mark(index, job, 'failed', error=str(e))
+            finish_job(job, stats, 'failed', e)
+            continue
+
+        step_record(job, ia_mapping, stats)
+        mark(index, job, 'uploaded')
+        finish_job(job, stats, 'uploaded')
+
+
+# ── Pipeline 模式 ─────────────────────────────────────
+# discover → qualify → resolve → download → transcode → upload → record
+# 每個 stage 有自己嘅 worker 數，stage 之間用有上限嘅 queue 連接
+_PIPELINE_DONE = object()
+
+
+def _stage_worker(name, fn, in_q, out_q, on_fail, on_done):
+    while True:
+        job = in_q.get()
+        if job is _PIPELINE_DONE:
+            # 放返個結束標記，等同一 stage 其他 worker 都收到
+            in_q.put(_PIPELINE_DONE)
+            return
+        telemetry.dequeued(job, name)
+        try:
+            with telemetry.stage(job, name):
+                result = fn(job)
+        except Exception as e:
+            on_fail(job, e)
+            continue
+        if result is None:
+            # 呢集喺呢個 stage 完結（唔符合條件／DRY_RUN／已記錄）
+            on_done(job)
+        else:
+            telemetry.enqueued(result)
+            out_q.put(result)
 
-            # RTHK 有時會出「節目暫停／特備節目通知」item，符合主持人字眼但沒有音頻。
-            if is_skip_notice_episode(title):
-                logger.info(f'  節目暫停/特備節目通知，跳過')
-                continue
 
-            # 檢查主持人條件
-            qualify, matched = check_host_qualification(ep_id, programme)
-            time.sleep(0.5)
+def run_pipeline(jobs, ia_mapping, stats, index=None, qualify=True):
+    """
+    index：記錄每集處理狀態嘅 DiscoveryIndex（None = 唔記）
+    qualify=False：冇 qualify stage，job 直接由 resolve 開始（修復已上傳過嘅集數時用）
+    """
+    lock = threading.Lock()
+
+    def on_fail(job, err):
+        logger.error(f'  ❌ {err}')
+        mark(index, job, 'failed', error=str(err))
+        with lock:
+            stats['failed'] += 1
+            finish_job(job, stats, 'failed', err)
+
+    def on_done(job):
+        with lock:
+            finish_job(job, stats, job.get('result', 'not_qualified'))
+
+    def qualify_stage(job):
+        qualified = step_qualify(job)
+        if qualified is None:
+            mark(index, job, 'not-qualified')
+        return qualified
+
+    def resolve(job):
+        step_resolve(job)
+        mark(index, job, 'resolved')
+        if DRY_RUN:
+            logger.info(f'  DRY_RUN：符合條件但跳過下載/上傳 (ID: {job["ep_id"]})')
+            with lock:
+                stats['uploaded_titles'].append(f'[DRY_RUN] {job["title"]} ({job["ep_date_str"]})')
+            job['result'] = 'dry_run'
+            return None
+        return job
 
-            if not qualify:
-                logger.info(f'  ❌ 唔符合主持人條件，跳過')
-                continue
+    def transcode_stage(job):
+        step_transcode(job)
+        mark(index, job, 'downloaded')
+        with lock:
+            stats['downloaded'] += 1
+        return job
 
-            logger.info(f'  ✅ 符合條件 (匹配: {matched})')
+    def stream(job):
+        step_stream(job)
+        with lock:
+            stats['downloaded'] += 1
+        return job
+
+    def record(job):
+        # 只有一個 worker，ia_mapping 寫入唔會互相覆蓋
+        with lock:
+            step_record(job, ia_mapping, stats)
+        mark(index, job, 'uploaded')
+        job['result'] = 'uploaded'
+
+    if STREAM:
+        # 串流模式下 download/transcode/upload 係同一個 stage
+        if transcode.TRANSCODE_VARIANTS:
+            logger.warning(f'串流模式只出主檔，TRANSCODE_VARIANTS（{",".join(transcode.TRANSCODE_VARIANTS)}）唔會生成')
+        transfer = [('stream', stream, PIPELINE_WORKERS['download'])]
+    else:
+        transfer = [
+            ('download', step_fetch, PIPELINE_WORKERS['download']),
+            ('transcode', transcode_stage, PIPELINE_WORKERS['transcode']),
+            ('upload', step_upload, PIPELINE_WORKERS['upload']),
+        ]
+    stages = [
+        *([('qualify', qualify_stage, PIPELINE_WORKERS['qualify'])] if qualify else []),
+        ('resolve', resolve, PIPELINE_WORKERS['resolve']),
+        *transfer,
+        ('record', record, 1),
+    ]
+    queues = [queue.Queue(maxsize=PIPELINE_QUEUE_SIZE) for _ in range(len(stages) + 1)]
+    threads = []
+    for i, (name, fn, workers) in enumerate(stages):
+        stage_threads = []
+        for n in range(max(1, workers)):
+            t = threading.Thread(target=_stage_worker, args=(name, fn, queues[i], queues[i + 1], on_fail, on_done),
+                                 name=f'{name}-{n}', daemon=True)
+            t.start()
+            stage_threads.append(t)
+        threads.append(stage_threads)
+    logger.info('Pipeline workers: ' + ', '.join(f'{name}={max(1, w)}' for name, _, w in stages))
+
+    # discover stage 喺主 thread 行
+    for job in jobs:
+        telemetry.enqueued(job)
+        queues[0].put(job)
+
+    # 逐個 stage 收尾：等上游全部 worker 完成先通知下游
+    for i, stage_threads in enumerate(threads):
+        queues[i].put(_PIPELINE_DONE)
+        for t in stage_threads:
+            t.join()
 
-            # 獲取音頻 URL
-            audio_url = get_audio_url(ep_id, programme)
-            if not audio_url:
-                logger.error(f'  ❌ 無法獲取音頻 URL')
-                stats['failed'] += 1
-                failed_dates.append(ep_date)
-                continue
 
-            if DRY_RUN:
-                logger.info(f'  DRY_RUN：符合條件但跳過下載/上傳')
-                stats['uploaded_titles'].append(f'[DRY_RUN] {title} ({ep_date_str})')
-                continue
+# ── 主流程 ────────────────────────────────────────────
+def open_index():
+    """讀 discovery index；DRY_RUN 唔寫 checkpoint"""
+    index = DiscoveryIndex(DISCOVERY_INDEX_FILE, checkpoint_every=0 if DRY_RUN else INDEX_CHECKPOINT_EVERY)
+    index.load()
+    return index
 
-            # 下載 MP3
-            logger.info(f'  下載 MP3...')
-            mp3_path = download_mp3(ep_id, audio_url, title)
-            if not mp3_path:
-                stats['failed'] += 1
-                failed_dates.append(ep_date)
-                continue
-            stats['downloaded'] += 1
 
-            # 上傳到 IA
-            logger.info(f'  上傳到 IA...')
-            ia_info = upload_to_ia(ep_id, mp3_path, title, ep_date_str)
-            if not ia_info:
-                stats['failed'] += 1
-                failed_dates.append(ep_date)
-                continue
+def backfill(start, end, ia_mapping=None):
+    """
+    補處理 start..end（date）之間嘅集數，唔郁 last_checked，返回 run_update 格式嘅 stats
+    進度記錄喺 discovery index（每 INDEX_CHECKPOINT_EVERY 次狀態變化寫一次檔），
+    中斷後用同一個範圍重跑會跳過已有結論嘅集數，失敗嘅會重試
+    """
+    started = time.monotonic()
+    if ia_mapping is None:
+        ia_mapping = EpisodeStore(IA_MAPPING_FILE)
+        ia_mapping.load(repair=True)
+    index = open_index()
+    stats = {'new_episodes': 0, 'downloaded': 0, 'uploaded': 0, 'failed': 0, 'uploaded_titles': [],
+             'episodes': []}
+    logger.info(f'Backfill {start.strftime("%d/%m/%Y")} → {end.strftime("%d/%m/%Y")}')
+
+    jobs = iter_backfill_episodes(start, end, ia_mapping, stats, index)
+    try:
+        if PIPELINE:
+            run_pipeline(jobs, ia_mapping, stats, index)
+        else:
+            run_sequential(jobs, ia_mapping, stats, index)
+    finally:
+        # Ctrl-C 都寫低目前進度
+        if not DRY_RUN:
+            index.save()
+        ia_mapping.compact()
 
-            # 加入 ia_mapping 並立即儲存
-            ia_mapping[ep_id] = ia_info
-            save_json(IA_MAPPING_FILE, ia_mapping)
-            stats['uploaded'] += 1
-            stats['uploaded_titles'].append(f'{title} ({ep_date_str})')
-            logger.info(f'  ✅ 已記錄到 ia_mapping.json')
+    stats['duration_seconds'] = round(time.monotonic() - started, 3)
+    logger.info(f'Backfill 完成！範圍內集數={stats["new_episodes"]}, 上傳={stats["uploaded"]}, '
+                f'失敗={stats["failed"]}，用時 {stats["duration_seconds"]:.1f}s')
+    return stats
 
-            # 下載後刪除本地 MP3（節省空間，IA 已有備份）
-            try:
-                os.remove(mp3_path)
-                logger.info(f'  🗑️  已刪除本地 MP3')
-            except:
-                pass
 
-            time.sleep(2)
+def main(ia_mapping=None, quick=QUICK_CHECK):
+    """
+    行一次完整更新，返回統計 dict（同寫入 STATS_FILE 嘅一樣；快速檢查冇新嘢時有 'noop': True，唔寫 STATS_FILE）
+    ia_mapping：已經 load 好嘅 EpisodeStore（podcast.py all 共用同一份），冇就自己讀
+    quick：先做快速檢查（見 quick_check）
+    """
+    started = time.monotonic()
+    if quick:
+        stats = quick_check(started)
+        if stats is not None:
+            return stats
+    # 讀取現有記錄
+    if ia_mapping is None:
+        ia_mapping = EpisodeStore(IA_MAPPING_FILE)
+        ia_mapping.load(repair=True)
+    last_checked = load_json(LAST_CHECKED_FILE, {'last_checked_date': '01/10/2025'})
+    last_checked_date = parse_date(last_checked.get('last_checked_date', '01/10/2025'))
+
+    logger.info(f'上次檢查日期: {last_checked_date}')
+    logger.info(f'ia_mapping 現有: {len(ia_mapping)} 集')
+
+    # 統計
+    stats = {'new_episodes': 0, 'downloaded': 0, 'uploaded': 0, 'failed': 0, 'uploaded_titles': [],
+             'episodes': []}
+    progress = {'latest_date_seen': last_checked_date}
+
+    index = open_index()
+    logger.info(f'discovery index 現有: {len(index)} 集')
+
+    # 之前 run 上唔到嘅 variant 先補（今次新上傳失敗嘅留待下次，唔會即刻重新下載；串流模式唔出 variant）
+    if not DRY_RUN and not STREAM:
+        retry_pending_variants(ia_mapping, index, stats)
+
+    jobs = iter_new_episodes(last_checked_date, ia_mapping, stats, progress, index)
+    if PIPELINE:
+        run_pipeline(jobs, ia_mapping, stats, index)
+    else:
+        run_sequential(jobs, ia_mapping, stats, index)
+    latest_date_seen = progress['latest_date_seen']
+
+    if not DRY_RUN and index.save():
+        logger.info(f'已更新 discovery index: {len(index)} 集')
+
+    # 將 journal 併入 ia_mapping.json（供 generate_rss.py / GitHub publish 使用）
+    if ia_mapping.compact():
+        logger.info(f'已輸出 ia_mapping.json: {len(ia_mapping)} 集')
 
     # 更新 last_checked.json
-    # 如果有集數處理失敗（例如拎唔到 audio URL、下載/上傳失敗），
-    # last_checked 不可推過最早失敗日期，否則下一次 rerun 會跳過失敗集數。
+    # 失敗集數（例如拎唔到 audio URL、下載/上傳失敗）已經喺 discovery index 記低 failed，
+    # 下次會由 index 直接重試，所以 last_checked 可以照推到今次見到嘅最新日期。
+    # index 要先寫好先推 last_checked，否則中途 crash 會漏咗失敗集數。
     target_last_checked_date = latest_date_seen
-    if failed_dates:
-        first_failed_date = min(failed_dates)
-        target_last_checked_date = min(target_last_checked_date, first_failed_date - timedelta(days=1))
-        logger.warning(
-            f'有 {len(failed_dates)} 集處理失敗；last_checked 最多只會更新至 '
-            f'{target_last_checked_date.strftime("%d/%m/%Y")}，避免跳過失敗集數'
-        )
+    if stats['failed']:
+        logger.warning(f'有 {stats["failed"]} 集處理失敗，已記錄喺 discovery index，'
+                       f'下次自動重試（最多 {EPISODE_MAX_ATTEMPTS} 次）')
 
     if target_last_checked_date > last_checked_date:
         new_last_checked = {
             'last_checked_date': target_last_checked_date.strftime('%d/%m/%Y'),
             'updated_at': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-            'note': '只記錄日期，唔記錄 ID（ID 係全台共用流水號）；如有失敗集數，不會推過最早失敗日期'
+            'note': '只記錄日期，唔記錄 ID（ID 係全台共用流水號）；失敗集數記錄喺 discovery_index.json 嘅 state'
         }
         if DRY_RUN:
             logger.info(f'DRY_RUN：不更新 last_checked_date（本來會更新至 {target_last_checked_date.strftime("%d/%m/%Y")}）')
@@ -430,9 +1284,9 @@ def main():
     else:
         logger.info('今次冇可安全推進的日期，last_checked.json 保持不變')
 
-    # 輸出統計
-    save_json(STATS_FILE, stats)
+    write_stats(stats, started)
     logger.info(f'完成！新集數={stats["new_episodes"]}, 下載={stats["downloaded"]}, 上傳={stats["uploaded"]}, 失敗={stats["failed"]}')
+    return stats
 
 
 if __name__ == '__main__':
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+IA 存檔完整性掃描：並行對 ia_mapping.json 每個 url 發 HEAD，比對 Content-Length 同記錄嘅 size
+  - missing：404／410
+  - truncated：Content-Length 細過記錄嘅 size
+  - size_mismatch：Content-Length 大過記錄（多數係記錄錯，只報告唔修）
+  - error：連線失敗／斷路（CircuitOpen）／其他 HTTP 錯誤／冇 Content-Length（可能係 IA 暫時出事，只報告唔修）
+同一時間最多 SCAN_WORKERS 個 HEAD 喺途；missing / truncated 可以交俾 repair_episodes.py 重新下載上傳
+用法：python3 scan_archive.py [--workers N] [--output problems.json] [--repair]
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+import config
+import http_client
+from episode_store import EpisodeStore
+
+IA_MAPPING_FILE = config.IA_MAPPING_FILE
+# 同時喺途嘅 HEAD 上限（唔好大過 HTTP_POOL_SIZE，否則連線池會開完即棄）
+SCAN_WORKERS = int(os.environ.get('SCAN_WORKERS', '16'))
+SCAN_TIMEOUT = int(os.environ.get('SCAN_TIMEOUT', '30'))
+# 會自動修復嘅問題類型
+REPAIR_REASONS = ('missing', 'truncated')
+
+logger = logging.getLogger(__name__)
+
+
+def check_episode(ep_id, info):
+    """HEAD 一集嘅 url，冇問題返回 None，否則返回 {'ep_id', 'url', 'reason', 'expected', 'actual', 'detail'}"""
+    url = info.get('url')
+    expected = info.get('size')
+
+    def problem(reason, actual=None, detail=''):
+        return {'ep_id': ep_id, 'url': url, 'reason': reason, 'expected': expected, 'actual': actual,
+                'detail': detail}
+
+    if not url:
+        return problem('missing', detail='記錄冇 url')
+    try:
+        # archive.org/download/... 會 302 去實際存放嘅節點
+        resp = http_client.head(url, allow_redirects=True, timeout=SCAN_TIMEOUT)
+    except requests.RequestException as e:
+        # timeout、DNS、斷路都唔代表檔案冇咗：當 missing 會令 --repair 重新上傳成個存檔
+        return problem('error', detail=str(e))
+    if resp.status_code in (404, 410):
+        return problem('missing', detail=f'HTTP {resp.status_code}')
+    if resp.status_code >= 400:
+        return problem('error', detail=f'HTTP {resp.status_code}')
+    length = resp.headers.get('Content-Length')
+    if length is None or not length.isdigit():
+        return problem('error', detail='冇 Content-Length')
+    actual = int(length)
+    if expected is None or actual == expected:
+        return None
+    if actual < expected:
+        return problem('truncated', actual)
+    return problem('size_mismatch', actual)
+
+
+def scan(ia_mapping, workers=SCAN_WORKERS):
+    """並行檢查 ia_mapping（dict 或 EpisodeStore）所有集數，返回問題列表（按 ep_id 排序）"""
+    items = list(ia_mapping.items())
+    problems = []
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        for n, result in enumerate(pool.map(lambda kv: check_episode(*kv), items), 1):
+            if result:
+                logger.warning(f'  ⚠️ {result["ep_id"]}: {result["reason"]} '
+                               f'(記錄 {result["expected"]}, IA {result["actual"]}) {result["detail"]}')
+                problems.append(result)
+            if n % 500 == 0:
+                logger.info(f'已檢查 {n}/{len(items)} 集...')
+    problems.sort(key=lambda p: p['ep_id'])
+    logger.info(f'掃描完成：{len(items)} 集，{len(problems)} 個問題，用時 {time.monotonic() - started:.1f}s')
+    return problems
+
+
+def repair_ids(problems):
+    return [p['ep_id'] for p in problems if p['reason'] in REPAIR_REASONS]
+
+
+def summarise(problems):
+    counts = {}
+    for p in problems:
+        counts[p['reason']] = counts.get(p['reason'], 0) + 1
+    return counts
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description='檢查 IA 上每集 MP3 是否齊全')
+    parser.add_argument('--mapping', default=IA_MAPPING_FILE)
+    parser.add_argument('--workers', type=int, default=SCAN_WORKERS)
+    parser.add_argument('--output', help='問題列表寫入 JSON 檔')
+    parser.add_argument('--repair', action='store_true', help='掃描後即刻修復 missing / truncated 集數')
+    args = parser.parse_args()
+
+    ia_mapping = EpisodeStore(args.mapping)
+    # --repair 會寫記錄，先要截 journal 爛尾
+    ia_mapping.load(repair=args.repair)
+    logger.info(f'掃描 {len(ia_mapping)} 集（同時 {args.workers} 個請求）...')
+    problems = scan(ia_mapping, args.workers)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(problems, f, ensure_ascii=False, indent=2)
+    counts = summarise(problems)
+    if counts:
+        logger.info('問題統計: ' + ', '.join(f'{k}={v}' for k, v in sorted(counts.items())))
+    logger.info(f'HTTP 延遲: {http_client.format_latency_stats()}')
+
+    to_repair = repair_ids(problems)
+    if args.repair and to_repair:
+        import repair_episodes
+        stats = repair_episodes.repair(to_repair, ia_mapping)
+        return 1 if stats['failed'] else 0
+    return 1 if to_repair else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
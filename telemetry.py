@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+run_update 逐集／逐 stage 量度
+  - stage(job, name)：計該 stage 用時，同埋期間嘅 HTTP 請求次數、延遲、retry、下載 bytes
+  - enqueued(job) / dequeued(job, name)：pipeline 模式下每個 stage 嘅排隊時間
+  - episode_summary()：每集一條記錄（寫入 stats 檔 'episodes'）
+  - summarise_stages()：各 stage 嘅次數、總用時、p50/p90/max
+  - write_prometheus()：node_exporter textfile collector 格式（原子寫入）
+"""
+import contextlib
+import os
+import time
+
+import http_client
+
+PROM_PREFIX = 'rthk_update'
+
+
+def _metrics(job):
+    return job.setdefault('metrics', {'stages': {}, 'queue_wait': {}})
+
+
+@contextlib.contextmanager
+def stage(job, name):
+    m = _metrics(job)
+    t0 = time.monotonic()
+    with http_client.track() as tracker:
+        try:
+            yield
+        finally:
+            st = m['stages'].setdefault(name, {'seconds': 0.0, 'http_requests': 0, 'http_seconds': 0.0,
+                                               'retries': 0, 'bytes_in': 0})
+            st['seconds'] += time.monotonic() - t0
+            st['http_requests'] += tracker.requests
+            st['http_seconds'] += tracker.seconds
+            st['retries'] += tracker.retries
+            st['bytes_in'] += tracker.bytes_in
+
+
+def enqueued(job):
+    _metrics(job)['queued_at'] = time.monotonic()
+
+
+def dequeued(job, name):
+    m = _metrics(job)
+    queued_at = m.pop('queued_at', None)
+    if queued_at is not None:
+        m['queue_wait'][name] = round(m['queue_wait'].get(name, 0.0) + time.monotonic() - queued_at, 3)
+
+
+def episode_summary(job, result, error=None):
+    m = _metrics(job)
+    stages = {
+        name: {k: round(v, 3) if isinstance(v, float) else v for k, v in st.items()}
+        for name, st in m['stages'].items()
+    }
+    summary = {
+        'ep_id': job['ep_id'],
+        'title': job['title'],
+        'date': job['ep_date_str'],
+        'programme': job['programme'],
+        'result': result,
+        'seconds': round(sum(st['seconds'] for st in m['stages'].values()), 3),
+        'stages': stages,
+        'queue_wait': dict(m['queue_wait']),
+        'http_requests': sum(st['http_requests'] for st in stages.values()),
+        'http_seconds': round(sum(st['http_seconds'] for st in stages.values()), 3),
+        'retries': sum(st['retries'] for st in stages.values()),
+        'bytes_downloaded': sum(st['bytes_in'] for st in stages.values()),
+        'bytes_uploaded': job.get('bytes_uploaded', 0),
+        'transcode_cpu_seconds': (job.get('transcode') or {}).get('cpu_seconds', 0.0),
+    }
+    if error:
+        summary['error'] = str(error)
+    return summary
+
+
+def _percentile(ordered, p):
+    return ordered[max(0, -(-p * len(ordered) // 100) - 1)]
+
+
+def summarise_stages(episodes):
+    """{stage: {'count', 'total', 'p50', 'p90', 'max', 'queue_wait'}}（秒）"""
+    samples, waits = {}, {}
+    for ep in episodes:
+        for name, st in ep['stages'].items():
+            samples.setdefault(name, []).append(st['seconds'])
+        for name, wait in ep['queue_wait'].items():
+            waits[name] = waits.get(name, 0.0) + wait
+    summary = {}
+    for name, values in samples.items():
+        values.sort()
+        summary[name] = {
+            'count': len(values),
+            'total': round(sum(values), 3),
+            'p50': round(_percentile(values, 50), 3),
+            'p90': round(_percentile(values, 90), 3),
+            'max': round(values[-1], 3),
+            'queue_wait': round(waits.get(name, 0.0), 3),
+        }
+    return summary
+
+
+def format_stage_summary(summary):
+    return '; '.join(
+        f'{name}: {st["count"]} 次, 共 {st["total"]:.1f}s, p50 {st["p50"]:.1f}s, p90 {st["p90"]:.1f}s'
+        + (f', 排隊 {st["queue_wait"]:.1f}s' if st['queue_wait'] else '')
+        for name, st in summary.items()
+    )
+
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_lines(stats, now=None):
+    p = PROM_PREFIX
+    lines = []
+
+    def metric(name, mtype, help_text, samples):
+        lines.append(f'# HELP {p}_{name} {help_text}')
+        lines.append(f'# TYPE {p}_{name} {mtype}')
+        for labels, value in samples:
+            label_str = ','.join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            lines.append(f'{p}_{name}{{{label_str}}} {value}' if label_str else f'{p}_{name} {value}')
+
+    episodes = stats.get('episodes', [])
+    stage_summary = stats.get('stage_summary', {})
+    http = stats.get('http', {})
+
+    metric('last_run_timestamp_seconds', 'gauge', 'Unix time the last non-no-op run finished',
+           [({}, int(now or time.time()))])
+    metric('duration_seconds', 'gauge', 'Wall time of the last run',
+           [({}, stats.get('duration_seconds', 0))])
+    metric('episodes', 'gauge', 'Episodes by outcome in the last run',
+           [({'result': k}, stats.get(k, 0)) for k in ('new_episodes', 'downloaded', 'uploaded', 'failed')])
+    lines.append(f'# HELP {p}_stage_seconds Per-episode stage time in the last run')
+    lines.append(f'# TYPE {p}_stage_seconds summary')
+    for name, st in stage_summary.items():
+        stage_label = _label(name)
+        for q, key in (('0.5', 'p50'), ('0.9', 'p90'), ('1', 'max')):
+            lines.append(f'{p}_stage_seconds{{stage="{stage_label}",quantile="{q}"}} {st[key]}')
+        lines.append(f'{p}_stage_seconds_sum{{stage="{stage_label}"}} {st["total"]}')
+        lines.append(f'{p}_stage_seconds_count{{stage="{stage_label}"}} {st["count"]}')
+    metric('stage_queue_wait_seconds', 'gauge', 'Total time jobs waited in each stage queue',
+           [({'stage': name}, st['queue_wait']) for name, st in stage_summary.items()])
+    metric('bytes', 'gauge', 'Bytes moved in the last run',
+           [({'direction': 'download'}, sum(ep['bytes_downloaded'] for ep in episodes)),
+            ({'direction': 'upload'}, sum(ep['bytes_uploaded'] for ep in episodes))])
+    metric('transcode_cpu_seconds', 'gauge', 'ffmpeg CPU time in the last run',
+           [({}, stats.get('transcode_cpu_seconds', 0))])
+    metric('http_requests', 'gauge', 'HTTP requests per host in the last run',
+           [({'host': host}, st['count']) for host, st in http.items()])
+    metric('http_retries', 'gauge', 'HTTP retries per host in the last run',
+           [({'host': host}, st['retries']) for host, st in http.items()])
+    metric('http_errors', 'gauge', 'HTTP requests that raised per host in the last run',
+           [({'host': host}, st['errors']) for host, st in http.items()])
+
+    lines.append(f'# HELP {p}_http_request_duration_seconds HTTP latency per host in the last run')
+    lines.append(f'# TYPE {p}_http_request_duration_seconds histogram')
+    for host, st in http.items():
+        cumulative = 0
+        for le, n in zip(http_client.LATENCY_BUCKETS, st['buckets']):
+            cumulative += n
+            lines.append(f'{p}_http_request_duration_seconds_bucket{{host="{_label(host)}",le="{le}"}} {cumulative}')
+        lines.append(f'{p}_http_request_duration_seconds_bucket{{host="{_label(host)}",le="+Inf"}} {st["count"]}')
+        lines.append(f'{p}_http_request_duration_seconds_sum{{host="{_label(host)}"}} {st["total"]}')
+        lines.append(f'{p}_http_request_duration_seconds_count{{host="{_label(host)}"}} {st["count"]}')
+    return lines
+
+
+def write_prometheus(path, stats):
+    """寫入 textfile collector 檔案；先寫暫存檔再 rename，node_exporter 唔會讀到一半"""
+    tmp = f'{path}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(prometheus_lines(stats)) + '\n')
+    os.replace(tmp, path)
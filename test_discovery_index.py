@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+discovery_index 單元測試：集數記錄、狀態轉移、重試次數、variant 補上傳、checkpoint
+用法：python3 -m pytest test_discovery_index.py（或者 python3 test_discovery_index.py）
+"""
+import json
+import os
+import tempfile
+import unittest
+from datetime import date
+
+from discovery_index import FINAL_STATES, DiscoveryIndex, month_range
+
+
+class DiscoveryIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, 'discovery_index.json')
+        self.index = DiscoveryIndex(self.path)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_add_keeps_first_programme(self):
+        entry, new = self.index.add('1', '01/02/2026', 'Free_as_the_wind', '甲')
+        self.assertTrue(new)
+        entry, new = self.index.add('1', '02/02/2026', 'free_as_the_wind_sunday', '乙')
+        self.assertFalse(new)
+        self.assertEqual((entry['programme'], entry['date'], entry['title']),
+                         ('Free_as_the_wind', '02/02/2026', '乙'))
+
+    def test_state_flow_to_final(self):
+        self.index.add('1', '01/02/2026', 'p', 't')
+        for state in ('discovered', 'resolved', 'downloaded'):
+            entry = self.index.set_state('1', state)
+            self.assertTrue(DiscoveryIndex.needs_work(entry, 5), state)
+        for state in FINAL_STATES:
+            self.assertFalse(DiscoveryIndex.needs_work(self.index.set_state('1', state), 5), state)
+
+    def test_unknown_state_and_episode(self):
+        with self.assertRaises(ValueError):
+            self.index.set_state('1', 'done')
+        self.assertIsNone(self.index.set_state('missing', 'failed'))
+
+    def test_failed_counts_attempts_until_limit(self):
+        self.index.add('1', '01/02/2026', 'p', 't')
+        for n in range(1, 4):
+            entry = self.index.set_state('1', 'failed', error=f'第 {n} 次')
+            self.assertEqual(entry['attempts'], n)
+        self.assertTrue(DiscoveryIndex.needs_work(entry, 4))
+        self.assertFalse(DiscoveryIndex.needs_work(entry, 3))
+        # 成功之後清走 error，attempts 保留
+        entry = self.index.set_state('1', 'resolved', hosts=['蘇奭'], guests=[])
+        self.assertNotIn('error', entry)
+        self.assertEqual((entry['attempts'], entry['hosts']), (3, ['蘇奭']))
+
+    def test_legacy_entry_without_state_is_settled(self):
+        self.assertFalse(DiscoveryIndex.needs_work({'date': '01/02/2026'}, 5))
+
+    def test_pending_sorted_oldest_first(self):
+        for ep_id, d in (('1', '03/02/2026'), ('2', '01/02/2026'), ('3', '02/02/2026'), ('4', '04/02/2026')):
+            self.index.add(ep_id, d, 'p', 't')
+        self.index.set_state('1', 'failed')
+        self.index.set_state('2', 'downloaded')
+        self.index.set_state('3', 'uploaded')
+        self.assertEqual([ep_id for ep_id, _ in self.index.pending(5)], ['2', '1'])
+
+    def test_variants_pending(self):
+        self.index.add('1', '01/02/2026', 'p', 't')
+        self.index.add('2', '02/02/2026', 'p', 't')
+        self.index.set_state('1', 'uploaded', variants_pending=['speech'], variant_attempts=0)
+        self.index.set_state('2', 'uploaded', variants_pending=[], variant_attempts=0)
+        self.assertEqual([ep_id for ep_id, _ in self.index.variants_pending(2)], ['1'])
+        self.index.set_state('1', 'uploaded', variants_pending=['speech'], variant_attempts=2)
+        self.assertEqual(self.index.variants_pending(2), [])
+
+    def test_save_only_when_dirty(self):
+        self.assertFalse(self.index.save())
+        self.index.add('1', '01/02/2026', 'p', 't')
+        self.assertTrue(self.index.save())
+        self.assertFalse(self.index.save())
+        reloaded = DiscoveryIndex(self.path)
+        self.assertEqual(list(reloaded.load()), ['1'])
+
+    def test_checkpoint_every(self):
+        index = DiscoveryIndex(self.path, checkpoint_every=2)
+        index.add('1', '01/02/2026', 'p', 't')
+        index.set_state('1', 'resolved')
+        self.assertFalse(os.path.exists(self.path))
+        index.set_state('1', 'downloaded')
+        with open(self.path, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['1']['state'], 'downloaded')
+
+    def test_month_range_newest_first(self):
+        self.assertEqual(month_range(date(2025, 11, 15), date(2026, 2, 1)), ['202602', '202601', '202512', '202511'])
+        self.assertEqual(month_range(date(2026, 3, 1), date(2026, 2, 1)), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+episode_store 單元測試：journal 重播、爛尾處理、compact
+用法：python3 -m pytest test_episode_store.py（或者 python3 test_episode_store.py）
+"""
+import json
+import os
+import tempfile
+import unittest
+
+from episode_store import EpisodeStore
+
+
+class EpisodeStoreTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.snapshot = os.path.join(self.tmp.name, 'ia_mapping.json')
+        self.journal = os.path.join(self.tmp.name, 'ia_mapping.journal')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def store(self):
+        return EpisodeStore(self.snapshot, compact_every=0)
+
+    def test_replay_journal_over_snapshot(self):
+        with open(self.snapshot, 'w', encoding='utf-8') as f:
+            json.dump({'1': {'title': '舊'}, '2': {'title': '刪'}}, f)
+        writer = self.store()
+        writer.load(repair=True)
+        writer.put('1', {'title': '新'})
+        writer.put('3', {'title': '三'})
+        writer.delete('2')
+
+        episodes = self.store().load()
+        self.assertEqual(episodes, {'1': {'title': '新'}, '3': {'title': '三'}})
+
+    def test_truncated_tail_is_skipped_read_only(self):
+        writer = self.store()
+        writer.load(repair=True)
+        writer.put('1', {'title': '一'})
+        with open(self.journal, 'a', encoding='utf-8') as f:
+            f.write('{"op": "put", "id": "2", "info": {"ti')
+        size = os.path.getsize(self.journal)
+
+        episodes = self.store().load()
+        self.assertEqual(episodes, {'1': {'title': '一'}})
+        # 唯讀讀者唔可以截走（可能係另一個程序寫緊嘅）記錄
+        self.assertEqual(os.path.getsize(self.journal), size)
+
+    def test_truncated_tail_is_repaired_by_writer(self):
+        writer = self.store()
+        writer.load(repair=True)
+        writer.put('1', {'title': '一'})
+        good = os.path.getsize(self.journal)
+        with open(self.journal, 'a', encoding='utf-8') as f:
+            f.write('{"op": "put", "id": "2"')
+
+        writer = self.store()
+        writer.load(repair=True)
+        self.assertEqual(os.path.getsize(self.journal), good)
+        # 截咗爛尾之後 append 嘅記錄要讀得返
+        writer.put('3', {'title': '三'})
+        self.assertEqual(sorted(self.store().load()), ['1', '3'])
+
+    def test_compact_writes_snapshot_and_clears_journal(self):
+        writer = self.store()
+        writer.load(repair=True)
+        self.assertFalse(writer.compact())
+        writer.put('1', {'title': '一'})
+        self.assertTrue(writer.compact())
+
+        self.assertEqual(os.path.getsize(self.journal), 0)
+        with open(self.snapshot, 'r', encoding='utf-8') as f:
+            self.assertEqual(json.load(f), {'1': {'title': '一'}})
+        self.assertFalse(writer.compact())
+
+    def test_compact_keeps_records_from_other_writers(self):
+        # 兩個程序（例如常駐更新同 scan_archive --repair）同時寫同一個 store
+        a, b = self.store(), self.store()
+        a.load(repair=True)
+        b.load(repair=True)
+        a.put('1', {'title': '一'})
+        b.put('2', {'title': '二'})
+        self.assertTrue(a.compact())
+        self.assertEqual(sorted(a.episodes), ['1', '2'])
+        b.put('3', {'title': '三'})
+        b.delete('2')
+        a.put('4', {'title': '四'})
+        self.assertTrue(b.compact())
+
+        self.assertEqual(os.path.getsize(self.journal), 0)
+        with open(self.snapshot, 'r', encoding='utf-8') as f:
+            self.assertEqual(sorted(json.load(f)), ['1', '3', '4'])
+
+    def test_auto_compact_every_n_puts(self):
+        writer = EpisodeStore(self.snapshot, compact_every=2)
+        writer.load(repair=True)
+        writer.put('1', {})
+        self.assertFalse(os.path.exists(self.snapshot))
+        writer.put('2', {})
+        self.assertTrue(os.path.exists(self.snapshot))
+        self.assertEqual(os.path.getsize(self.journal), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
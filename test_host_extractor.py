@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+host_extractor 單元測試：同舊版 regex 實作（bench_host_extractor.legacy_analyse）逐個頁面比對結果
+用法：python3 -m pytest test_host_extractor.py（或者 python3 test_host_extractor.py）
+"""
+import unittest
+
+import host_extractor
+from bench_host_extractor import ALLOWED_HOSTS, legacy_analyse
+
+
+def page(desc, before_desc='', tail='</div>\n</div>'):
+    """砌一個同 RTHK 集數頁面結構一樣嘅 popEpiTit 區塊（epidesc 之後緊接兩個 </div> 收尾）"""
+    return ('<html><body><div class="popEpiTit"><h2>講東講西</h2>'
+            f'{before_desc}<div class="epidesc">{desc}</div>\n{tail}'
+            '<div class="prog">主持人：王五</div></body></html>')
+
+
+PAGES = {
+    'episode_host': page('主持：馬鼎盛<br>嘉賓：張三'),
+    'guest_only_match': page('主持：王五<br>嘉賓：邱逸、李四'),
+    'not_qualified': page('主持：王五<br>嘉賓：李四'),
+    'half_width_colon': page('主持:岑逸飛\n嘉賓:李四'),
+    'nested_tags': page('<p>主持：<b>馮天樂</b></p><p>嘉賓：<i>李四</i></p>'),
+    'empty_values': page('主持：<br>嘉賓：  <br>'),
+    # epidesc 冇本集主持 → 用節目主持人
+    'programme_hosts_fallback': page('今集講香港歷史', '<p>主持人：蘇奭、邱逸</p>'),
+    # 「主持人」唔係本集主持
+    'host_person_label': page('節目主持人：王五<br>嘉賓：李四', '<p>主持人：岑逸飛</p>'),
+    'multiple_hosts': page('主持：蘇奭<br>主持：邱逸<br>嘉賓：馬鼎盛'),
+    'no_section': '<html><body><div>主持：蘇奭</div></body></html>',
+    'unclosed_section': '<div class="popEpiTit"><div class="epidesc">主持：蘇奭</div>',
+    'no_epidesc': '<div class="popEpiTit"><p>主持人：馬鼎盛</p></div>\n</div>\n</div>',
+    'spaced_closes': page('主持：邱逸', tail='  </div>  \n\t</div>'),
+}
+
+
+class HostExtractorParityTest(unittest.TestCase):
+    def setUp(self):
+        self.matcher = host_extractor.HostMatcher(ALLOWED_HOSTS)
+
+    def test_matches_legacy_regex(self):
+        for name, html in PAGES.items():
+            with self.subTest(page=name):
+                new = host_extractor.analyse(html, self.matcher)
+                self.assertEqual({k: new[k] for k in ('qualify', 'matched', 'hosts', 'guests')},
+                                 legacy_analyse(html))
+
+    def test_expected_results(self):
+        self.assertEqual(host_extractor.analyse(PAGES['episode_host'], self.matcher)['matched'], ['馬鼎盛'])
+        self.assertTrue(host_extractor.analyse(PAGES['guest_only_match'], self.matcher)['qualify'])
+        self.assertFalse(host_extractor.analyse(PAGES['not_qualified'], self.matcher)['qualify'])
+        fallback = host_extractor.analyse(PAGES['programme_hosts_fallback'], self.matcher)
+        self.assertEqual(fallback['hosts'], [])
+        self.assertEqual(fallback['matched'], ['蘇奭', '邱逸'])
+
+    def test_matcher_keeps_list_order(self):
+        self.assertEqual(self.matcher.match(['岑逸飛、蘇奭', '嘉賓邱逸']), ['蘇奭', '邱逸', '岑逸飛'])
+        self.assertEqual(self.matcher.match([]), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
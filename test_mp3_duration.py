@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+mp3_duration 單元測試：frame header 解析、Xing / VBRI / CBR 長度計算、ID3v2 tag 跳過
+用合成嘅 MPEG-1 Layer III frame（唔使真音頻檔）
+用法：python3 -m pytest test_mp3_duration.py（或者 python3 test_mp3_duration.py）
+"""
+import os
+import struct
+import tempfile
+import unittest
+
+import mp3_duration
+
+# MPEG-1 Layer III，冇 CRC；128 kbps（index 9）、44100 Hz（index 0）
+HEADER_128K = bytes([0xff, 0xfb, 0x90, 0x00])
+HEADER_128K_MONO = bytes([0xff, 0xfb, 0x90, 0xc0])
+FRAME_LEN = 1152 // 8 * 128000 // 44100  # 417
+
+
+def frame(header=HEADER_128K, payload=b''):
+    body = header + payload
+    return body + b'\0' * (FRAME_LEN - len(body))
+
+
+def xing_frame(frames, header=HEADER_128K, tag=b'Xing'):
+    side_info = 17 if header[3] >> 6 == 3 else 32
+    return frame(header, b'\0' * side_info + tag + struct.pack('>II', 1, frames))
+
+
+def vbri_frame(frames):
+    return frame(HEADER_128K, b'\0' * 32 + b'VBRI' + b'\0' * 10 + struct.pack('>I', frames))
+
+
+def id3v2(size):
+    """ID3v2.3 tag（synchsafe 長度），內容係 size bytes 0"""
+    synchsafe = bytes([(size >> 21) & 0x7f, (size >> 14) & 0x7f, (size >> 7) & 0x7f, size & 0x7f])
+    return b'ID3\x03\x00\x00' + synchsafe + b'\0' * size
+
+
+def duration_of(data):
+    return mp3_duration.duration_from_reader(lambda start, length: data[start:start + length], len(data))
+
+
+class FrameHeaderTest(unittest.TestCase):
+    def test_parse_mpeg1_layer3(self):
+        info = mp3_duration.parse_frame_header(HEADER_128K, 0)
+        self.assertEqual((info['version'], info['layer'], info['bitrate'], info['sample_rate']),
+                         (1, 3, 128000, 44100))
+        self.assertEqual((info['samples'], info['length'], info['mono']), (1152, FRAME_LEN, False))
+        self.assertTrue(mp3_duration.parse_frame_header(HEADER_128K_MONO, 0)['mono'])
+
+    def test_padding_adds_a_byte(self):
+        padded = bytes([0xff, 0xfb, 0x92, 0x00])
+        self.assertEqual(mp3_duration.parse_frame_header(padded, 0)['length'], FRAME_LEN + 1)
+
+    def test_invalid_headers(self):
+        for buf in (b'\xff\xfb\xf0\x00',   # bitrate index 15
+                    b'\xff\xfb\x9c\x00',   # sample rate index 3
+                    b'\xff\xf9\x90\x00',   # reserved layer
+                    b'\x00\xfb\x90\x00',   # 冇 sync
+                    b'\xff\xfb'):          # 唔夠 4 bytes
+            with self.subTest(buf=buf):
+                self.assertIsNone(mp3_duration.parse_frame_header(buf, 0))
+
+
+class DurationTest(unittest.TestCase):
+    def test_cbr_from_file_size(self):
+        data = frame() * 1000
+        result = duration_of(data)
+        self.assertEqual(result['method'], 'cbr')
+        self.assertAlmostEqual(result['duration'], len(data) * 8 / 128000, places=2)
+
+    def test_xing_frame_count(self):
+        # Xing 記錄 5000 frames，檔案本身短好多：應該用 frame 數，唔用檔案大小
+        data = xing_frame(5000) + frame() * 10
+        result = duration_of(data)
+        self.assertEqual(result['method'], 'xing')
+        self.assertAlmostEqual(result['duration'], round(5000 * 1152 / 44100, 2))
+        self.assertEqual(mp3_duration.vbr_frame_count(data, 0, mp3_duration.parse_frame_header(data, 0)),
+                         (5000, 'xing'))
+
+    def test_info_tag_mono(self):
+        data = xing_frame(100, HEADER_128K_MONO, b'Info') + frame(HEADER_128K_MONO) * 3
+        self.assertEqual(duration_of(data)['method'], 'xing')
+
+    def test_vbri(self):
+        data = vbri_frame(2000) + frame() * 3
+        result = duration_of(data)
+        self.assertEqual(result['method'], 'vbri')
+        self.assertAlmostEqual(result['duration'], round(2000 * 1152 / 44100, 2))
+
+    def test_skips_id3v2_tag(self):
+        audio = frame() * 200
+        result = duration_of(id3v2(300) + audio)
+        self.assertAlmostEqual(result['duration'], len(audio) * 8 / 128000, places=2)
+
+    def test_id3v2_larger_than_first_read(self):
+        # 封面圖大過 HEAD_BYTES：要由音頻開始位置再讀
+        audio = xing_frame(700) + frame() * 3
+        result = duration_of(id3v2(mp3_duration.HEAD_BYTES * 2) + audio)
+        self.assertEqual(result['method'], 'xing')
+
+    def test_false_sync_in_junk(self):
+        # 0xff 0xfb 開頭但下一個 frame 對唔上嘅垃圾唔可以當 frame
+        junk = HEADER_128K + b'\x01' * 100
+        result = duration_of(junk + xing_frame(50) + frame())
+        self.assertEqual(result['method'], 'xing')
+
+    def test_no_frame(self):
+        with self.assertRaises(mp3_duration.MP3HeaderError):
+            duration_of(b'\0' * 4096)
+
+    def test_duration_from_file(self):
+        with tempfile.NamedTemporaryFile(suffix='.mp3', delete=False) as f:
+            f.write(xing_frame(1234) + frame() * 3)
+        try:
+            self.assertAlmostEqual(mp3_duration.duration_from_file(f.name)['duration'],
+                                   round(1234 * 1152 / 44100, 2))
+        finally:
+            os.remove(f.name)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+rate_limit 單元測試：Retry-After 解析、AIMD 調速、暫停、circuit breaker、token bucket
+全部直接郁 HostLimiter，唔發 HTTP 請求
+用法：python3 -m pytest test_rate_limit.py（或者 python3 test_rate_limit.py）
+"""
+import time
+import unittest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import rate_limit
+from rate_limit import HostLimiter
+
+
+class ParseRetryAfterTest(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(rate_limit.parse_retry_after('120'), 120.0)
+        self.assertEqual(rate_limit.parse_retry_after(' 5 '), 5.0)
+
+    def test_http_date(self):
+        now = datetime(2026, 2, 1, 12, 0, 0, tzinfo=timezone.utc)
+        value = format_datetime(now + timedelta(seconds=90), usegmt=True)
+        self.assertEqual(rate_limit.parse_retry_after(value, now), 90.0)
+        # 已經過咗嘅時間 → 0
+        past = format_datetime(now - timedelta(seconds=30), usegmt=True)
+        self.assertEqual(rate_limit.parse_retry_after(past, now), 0.0)
+
+    def test_unparseable(self):
+        for value in (None, '', 'soon', '-1'):
+            with self.subTest(value=value):
+                self.assertIsNone(rate_limit.parse_retry_after(value))
+
+    def test_host_limits(self):
+        self.assertEqual(rate_limit._parse_host_limits('a.com=4:10, b.com=2'),
+                         {'a.com': (4.0, 10.0), 'b.com': (2.0, max(2.0, rate_limit.RATE_LIMIT_MAX))})
+
+
+class HostLimiterTest(unittest.TestCase):
+    def test_additive_increase_up_to_max(self):
+        limiter = HostLimiter('h', rate=4, max_rate=4 + 2 * rate_limit.RATE_LIMIT_STEP)
+        for _ in range(5):
+            limiter.record(200)
+        self.assertEqual(limiter.rate, limiter.max_rate)
+
+    def test_throttle_halves_rate_and_pauses(self):
+        limiter = HostLimiter('h', rate=8, max_rate=16)
+        before = time.monotonic()
+        limiter.record(429, '30')
+        self.assertEqual(limiter.rate, 4)
+        self.assertEqual(limiter.throttled, 1)
+        self.assertGreaterEqual(limiter.paused_until, before + 30)
+        limiter.record(503)
+        self.assertEqual(limiter.rate, 2)
+
+    def test_rate_never_below_min(self):
+        limiter = HostLimiter('h', rate=rate_limit.RATE_LIMIT_MIN, max_rate=1)
+        limiter.record(429, '0')
+        self.assertEqual(limiter.rate, rate_limit.RATE_LIMIT_MIN)
+
+    def test_retry_after_capped(self):
+        limiter = HostLimiter('h')
+        before = time.monotonic()
+        limiter.record(429, '86400')
+        self.assertLessEqual(limiter.paused_until, time.monotonic() + rate_limit.RATE_LIMIT_MAX_WAIT)
+        self.assertGreaterEqual(limiter.paused_until, before + rate_limit.RATE_LIMIT_MAX_WAIT)
+
+    def test_breaker_opens_after_consecutive_failures(self):
+        limiter = HostLimiter('h')
+        for _ in range(rate_limit.RATE_LIMIT_BREAKER_FAILURES - 1):
+            limiter.record(None)
+        limiter.record(200)
+        # 中間有成功，重新計
+        for _ in range(rate_limit.RATE_LIMIT_BREAKER_FAILURES - 1):
+            limiter.record(500)
+        self.assertEqual(limiter.opened, 0)
+        limiter.acquire()
+        limiter.record(None)
+        self.assertEqual(limiter.opened, 1)
+        with self.assertRaises(rate_limit.CircuitOpen):
+            limiter.acquire()
+
+    def test_breaker_reopens_on_first_failure_after_cooldown(self):
+        limiter = HostLimiter('h')
+        for _ in range(rate_limit.RATE_LIMIT_BREAKER_FAILURES):
+            limiter.record(502)
+        limiter.open_until = 0.0  # 當冷卻完
+        limiter.acquire()
+        limiter.record(None)
+        self.assertEqual(limiter.opened, 2)
+        with self.assertRaises(rate_limit.CircuitOpen):
+            limiter.acquire()
+
+    def test_half_open_admits_single_probe(self):
+        limiter = HostLimiter('h')
+        for _ in range(rate_limit.RATE_LIMIT_BREAKER_FAILURES):
+            limiter.record(None)
+        limiter.open_until = 0.0
+        limiter.acquire()
+        # 試探請求未有結果，其他 worker 唔放行
+        with self.assertRaises(rate_limit.CircuitOpen):
+            limiter.acquire()
+        limiter.record(200)
+        limiter.acquire()
+        limiter.acquire()
+        self.assertEqual(limiter.opened, 1)
+        # 恢復之後要再連續失敗夠次數先斷路
+        limiter.record(None)
+        limiter.acquire()
+
+    @unittest.skipUnless(rate_limit.RATE_LIMIT_ENABLED, 'RATE_LIMIT=0 時 backoff 直接 sleep')
+    def test_backoff_never_shorter_than_base(self):
+        limiter = rate_limit.for_host('backoff.example')
+        before = time.monotonic()
+        rate_limit.backoff('https://backoff.example/x', 2, base=30)
+        self.assertGreaterEqual(limiter.paused_until, before + 60)
+        self.assertLessEqual(limiter.paused_until, time.monotonic() + 90)
+
+    def test_circuit_open_is_connection_error(self):
+        import requests
+        self.assertTrue(issubclass(rate_limit.CircuitOpen, requests.ConnectionError))
+
+    def test_token_bucket_spends_burst_then_waits(self):
+        limiter = HostLimiter('h', rate=1000, max_rate=1000)
+        limiter.tokens = 2
+        limiter.acquire()
+        limiter.acquire()
+        self.assertLess(limiter.tokens, 1)
+        t0 = time.monotonic()
+        limiter.acquire()
+        # 1000/s：等一個 token 大約 1ms
+        self.assertLess(time.monotonic() - t0, 0.5)
+
+    def test_stats(self):
+        limiter = HostLimiter('h', rate=4, max_rate=8)
+        limiter.record(429, '0')
+        self.assertEqual(limiter.stats(), {'rate': 2.0, 'throttled': 1, 'circuit_opened': 0})
+
+
+if __name__ == '__main__':
+    unittest.main()
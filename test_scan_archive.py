@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+scan_archive 單元測試：HEAD 結果分類、只有 missing / truncated 會交去修復
+http_client.head 用 mock 代替，唔發 HTTP 請求
+用法：python3 -m pytest test_scan_archive.py（或者 python3 test_scan_archive.py）
+"""
+import unittest
+from unittest import mock
+
+import requests
+
+import rate_limit
+import scan_archive
+
+
+class FakeResponse:
+    def __init__(self, status_code, length=None):
+        self.status_code = status_code
+        self.headers = {} if length is None else {'Content-Length': str(length)}
+
+
+def scan_with(head):
+    mapping = {'1': {'url': 'https://archive.org/download/a/1.mp3', 'size': 100},
+               '2': {'url': 'https://archive.org/download/a/2.mp3', 'size': 100}}
+    with mock.patch('scan_archive.http_client.head', side_effect=head):
+        return scan_archive.scan(mapping, workers=2)
+
+
+class CheckEpisodeTest(unittest.TestCase):
+    def test_status_classification(self):
+        for status, length, reason in ((404, None, 'missing'), (410, None, 'missing'),
+                                       (500, None, 'error'), (200, None, 'error'),
+                                       (200, 50, 'truncated'), (200, 150, 'size_mismatch')):
+            with self.subTest(status=status, length=length):
+                problems = scan_with(lambda url, **kw: FakeResponse(status, length))
+                self.assertEqual([p['reason'] for p in problems], [reason, reason])
+
+    def test_ok(self):
+        self.assertEqual(scan_with(lambda url, **kw: FakeResponse(200, 100)), [])
+
+    def test_transport_errors_are_never_repaired(self):
+        for exc in (requests.ConnectionError('reset'), requests.Timeout('timeout'),
+                    rate_limit.CircuitOpen('archive.org 斷路中')):
+            with self.subTest(exc=type(exc).__name__):
+                def head(url, **kw):
+                    raise exc
+                problems = scan_with(head)
+                self.assertEqual([p['reason'] for p in problems], ['error', 'error'])
+                self.assertEqual(scan_archive.repair_ids(problems), [])
+
+    def test_missing_url_is_repaired(self):
+        problem = scan_archive.check_episode('1', {'size': 100})
+        self.assertEqual(scan_archive.repair_ids([problem]), ['1'])
+
+
+if __name__ == '__main__':
+    unittest.main()
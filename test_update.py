@@ -16,9 +16,11 @@ import os
 import shutil
 from datetime import datetime
 
-BASE_DIR = '/home/ubuntu/rthk_podcast'
-LAST_CHECKED_FILE = f'{BASE_DIR}/last_checked.json'
-IA_MAPPING_FILE = f'{BASE_DIR}/ia_mapping.json'
+import config
+from episode_store import EpisodeStore
+
+LAST_CHECKED_FILE = config.LAST_CHECKED_FILE
+IA_MAPPING_FILE = config.IA_MAPPING_FILE
 
 print("=" * 60)
 print("測試開始：驗證 run_update.py 的邏輯")
@@ -28,8 +30,8 @@ print("=" * 60)
 shutil.copy(LAST_CHECKED_FILE, LAST_CHECKED_FILE + '.bak')
 print(f"\n✅ 已備份 last_checked.json")
 
-# 讀取現有 ia_mapping
-ia_mapping = json.load(open(IA_MAPPING_FILE))
+# 讀取現有 ia_mapping（snapshot + journal，同 run_update 睇到嘅一樣）
+ia_mapping = EpisodeStore(IA_MAPPING_FILE).load()
 print(f"✅ ia_mapping 現有 {len(ia_mapping)} 集")
 
 # 讀取原始 last_checked_date
@@ -58,7 +60,7 @@ print("=" * 60)
 # 執行 run_update.py
 import subprocess
 result = subprocess.run(
-    ['python3', f'{BASE_DIR}/run_update.py'],
+    ['python3', os.path.join(config.SCRIPT_DIR, 'run_update.py')],
     capture_output=False,
     timeout=300
 )
@@ -68,7 +70,7 @@ print("驗證結果：")
 print("=" * 60)
 
 # 驗證 1: ia_mapping 集數是否保持不變
-ia_mapping_after = json.load(open(IA_MAPPING_FILE))
+ia_mapping_after = EpisodeStore(IA_MAPPING_FILE).load()
 ia_count_ok = len(ia_mapping_after) == len(ia_mapping)
 print(f"\n{'✅' if ia_count_ok else '❌'} ia_mapping 集數: {len(ia_mapping_after)} 集 (預期: {len(ia_mapping)} 集)")
 
@@ -79,7 +81,7 @@ date_updated = new_date > '17/02/2026'  # 應該更新到 20/02/2026 或更新
 print(f"{'✅' if date_updated else '❌'} last_checked_date: {new_date} (預期: > 17/02/2026)")
 
 # 驗證 3: 統計檔案
-stats_file = '/tmp/rthk_update_stats.json'
+stats_file = config.STATS_FILE
 if os.path.exists(stats_file):
     stats = json.load(open(stats_file))
     print(f"\n📊 統計：")
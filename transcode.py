@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+轉檔排程：ffmpeg worker pool（大小 = CPU 核心數）+ 可揀嘅轉檔 profile
+  mp3-128  128k MP3（預設，同以前一樣）
+  speech   單聲道 48k MP3，適合講嘢節目
+  copy     唔重新編碼，直接將 AAC 串流 remux 做 .m4a（唔佔 CPU slot）
+TRANSCODE_VARIANTS（逗號分隔 profile 名，例如 speech）：同一個 ffmpeg 順手多出幾個輸出，
+只 decode 一次，輸出檔名 {ep_id}_0_{profile}.{ext}
+每集會記錄 ffmpeg 用咗幾多 CPU 秒（user + sys）、輸出檔嘅 MD5 / SHA-256，
+同埋由 ffmpeg -progress（經 stderr）讀到嘅實際長度（秒），唔使再 decode 一次
+
+批量轉檔：python3 transcode.py [--profile copy] [--variant speech] a_raw.mp4 b_raw.mp4 ...
+"""
+import argparse
+import collections
+import os
+import re
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import content_hash
+
+PROFILES = {
+    'mp3-128': {
+        'ext': 'mp3',
+        'mime': 'audio/mpeg',
+        'args': ['-acodec', 'libmp3lame', '-b:a', '128k'],
+        'format': ['-f', 'mp3'],
+        'bitrate': 128000,
+    },
+    'speech': {
+        'ext': 'mp3',
+        'mime': 'audio/mpeg',
+        'args': ['-acodec', 'libmp3lame', '-ac', '1', '-b:a', '48k'],
+        'format': ['-f', 'mp3'],
+        'bitrate': 48000,
+    },
+    'copy': {
+        'ext': 'm4a',
+        'mime': 'audio/mp4',
+        'args': ['-vn', '-c:a', 'copy', '-bsf:a', 'aac_adtstoasc'],
+        # 輸出去 pipe 時 mp4 要用 fragmented 格式
+        'format': ['-f', 'mp4', '-movflags', 'frag_keyframe+empty_moov'],
+        'bitrate': None,
+        'remux': True,
+    },
+}
+MIME_BY_EXT = {p['ext']: p['mime'] for p in PROFILES.values()}
+
+# ── 設定 ──────────────────────────────────────────────
+TRANSCODE_PROFILE = os.environ.get('TRANSCODE_PROFILE', 'mp3-128')
+TRANSCODE_VARIANTS = [v.strip() for v in os.environ.get('TRANSCODE_VARIANTS', '').split(',') if v.strip()]
+TRANSCODE_WORKERS = int(os.environ.get('TRANSCODE_WORKERS', '0')) or os.cpu_count() or 1
+TRANSCODE_TIMEOUT = 600
+# 進度（out_time_us=...）寫去 stderr；其他 log 只留錯誤
+PROGRESS_ARGS = ['-hide_banner', '-nostats', '-loglevel', 'error', '-progress', 'pipe:2']
+_PROGRESS_LINE = re.compile(r'^[a-z_0-9]+=')
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_profile(name=None):
+    name = name or TRANSCODE_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f'未知轉檔 profile: {name}（可選: {", ".join(PROFILES)}）')
+    return PROFILES[name]
+
+
+def mime_for(path):
+    return MIME_BY_EXT.get(os.path.splitext(path)[1].lstrip('.').lower(), 'audio/mpeg')
+
+
+def get_ffmpeg_bin():
+    try:
+        import imageio_ffmpeg
+        return os.environ.get('FFMPEG_BIN') or imageio_ffmpeg.get_ffmpeg_exe()
+    except Exception:
+        return os.environ.get('FFMPEG_BIN', 'ffmpeg')
+
+
+def output_path(src_dir, ep_id, profile=None):
+    return os.path.join(src_dir, f'{ep_id}_0.{get_profile(profile)["ext"]}')
+
+
+def variant_path(src_dir, ep_id, profile):
+    return os.path.join(src_dir, f'{ep_id}_0_{profile}.{get_profile(profile)["ext"]}')
+
+
+class ProgressReader(threading.Thread):
+    """讀 ffmpeg PROGRESS_ARGS 寫去 stderr 嘅進度：duration = 最後一個 out_time（秒），errors = 最後幾行錯誤"""
+
+    def __init__(self, stream):
+        super().__init__(daemon=True)
+        self.stream = stream
+        self.duration = None
+        self.errors = collections.deque(maxlen=10)
+
+    def run(self):
+        for raw in self.stream:
+            line = raw.decode('utf-8', 'replace').strip()
+            key, _, value = line.partition('=')
+            # 舊版 ffmpeg 只有 out_time_ms（單位其實都係微秒）；開頭未有輸出時係 N/A 或負數
+            if key in ('out_time_us', 'out_time_ms') and value.isdigit():
+                self.duration = int(value) / 1e6
+            elif line and not _PROGRESS_LINE.match(line):
+                self.errors.append(line)
+
+
+def run_ffmpeg(args, timeout=TRANSCODE_TIMEOUT):
+    """
+    執行 ffmpeg，返回 (returncode, cpu_seconds, wall_seconds, progress)
+    用 wait4 攞子進程自己嘅 CPU 用量；progress.duration 係輸出長度（秒，讀唔到係 None）
+    """
+    t0 = time.monotonic()
+    proc = subprocess.Popen([get_ffmpeg_bin()] + PROGRESS_ARGS + args, stdin=subprocess.DEVNULL,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    progress = ProgressReader(proc.stderr)
+    progress.start()
+    timer = threading.Timer(timeout, proc.kill)
+    timer.start()
+    try:
+        _, status, usage = os.wait4(proc.pid, 0)
+    finally:
+        timer.cancel()
+        progress.join(timeout=5)
+        proc.stderr.close()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    return proc.returncode, usage.ru_utime + usage.ru_stime, time.monotonic() - t0, progress
+
+
+def transcode_file(src, dst, profile=None, variants=None):
+    """
+    將下載嘅 TS 轉成 profile 指定格式；variants（{profile: 路徑}）喺同一個 ffmpeg 做額外輸出，只 decode 一次
+    返回 {'path', 'profile', 'returncode', 'cpu_seconds', 'wall_seconds', 'duration'}，
+    成功時再加 'md5', 'sha256', 'size'（有 variants 就加 'variants': {profile: {'path', 'profile', 'md5', ...}}），
+    失敗時加 'errors'（ffmpeg 最後幾行錯誤）
+    """
+    name = profile or TRANSCODE_PROFILE
+    p = get_profile(name)
+    variants = variants or {}
+    args = ['-y', '-f', 'mpegts', '-i', src] + p['args'] + [dst]
+    for v, path in variants.items():
+        args += get_profile(v)['args'] + [path]
+    rc, cpu, wall, progress = run_ffmpeg(args)
+    result = {'path': dst, 'profile': name, 'returncode': rc, 'cpu_seconds': round(cpu, 2),
+              'wall_seconds': round(wall, 2),
+              'duration': round(progress.duration, 2) if progress.duration is not None else None}
+    if rc != 0:
+        result['errors'] = list(progress.errors)
+    # ffmpeg 要寫落可 seek 嘅檔案先會補返 Xing header，所以唔經 pipe；轉完即刻喺同一個 worker 計雜湊
+    if rc == 0 and os.path.exists(dst):
+        result.update(content_hash.hash_file(dst))
+        if variants:
+            result['variants'] = {v: {'path': path, 'profile': v, 'duration': result['duration'],
+                                      **content_hash.hash_file(path)}
+                                  for v, path in variants.items() if os.path.exists(path)}
+    return result
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ThreadPoolExecutor(max_workers=TRANSCODE_WORKERS, thread_name_prefix='ffmpeg')
+    return _pool
+
+
+def submit(src, dst, profile=None, variants=None):
+    """排隊轉檔，返回 Future；同時最多 TRANSCODE_WORKERS 個 ffmpeg。copy profile（冇 variants）唔使排隊"""
+    if get_profile(profile).get('remux') and not variants:
+        f = Future()
+        try:
+            f.set_result(transcode_file(src, dst, profile))
+        except Exception as e:
+            f.set_exception(e)
+        return f
+    return get_pool().submit(transcode_file, src, dst, profile, variants)
+
+
+def transcode(src, dst, profile=None, variants=None):
+    return submit(src, dst, profile, variants).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='批量並行轉檔（輸出同輸入同一個資料夾）')
+    parser.add_argument('--profile', default=TRANSCODE_PROFILE, choices=sorted(PROFILES))
+    parser.add_argument('--variant', action='append', default=None, choices=sorted(PROFILES),
+                        help='同一次 decode 額外輸出嘅 profile（可以重複；預設 TRANSCODE_VARIANTS）')
+    parser.add_argument('files', nargs='+')
+    args = parser.parse_args()
+
+    variant_names = TRANSCODE_VARIANTS if args.variant is None else args.variant
+    t0 = time.monotonic()
+    futures = []
+    for src in args.files:
+        base = os.path.basename(src).split('_raw')[0].split('.')[0]
+        out_dir = os.path.dirname(src) or '.'
+        variants = {v: variant_path(out_dir, base, v) for v in variant_names}
+        futures.append(submit(src, output_path(out_dir, base, args.profile), args.profile, variants))
+    failed = 0
+    total_cpu = 0.0
+    for f in futures:
+        r = f.result()
+        total_cpu += r['cpu_seconds']
+        ok = r['returncode'] == 0
+        failed += not ok
+        print(f"{'✅' if ok else '❌'} {r['path']}  CPU {r['cpu_seconds']:.1f}s  用時 {r['wall_seconds']:.1f}s")
+        for v in r.get('variants', {}).values():
+            print(f"   + {v['path']}  {v['size'] / 1024 / 1024:.1f}MB")
+    print(f'[{args.profile}] {len(futures)} 個檔案，{TRANSCODE_WORKERS} 個 worker，'
+          f'總 CPU {total_cpu:.1f}s，總用時 {time.monotonic() - t0:.1f}s')
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
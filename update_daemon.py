@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+常駐更新模式：取代 cron 每日冷啟動一次 daily_update_ia.sh
+  - 同一個 process 重複行 run_update.main()：HTTP 連線池、轉檔 worker pool 同 page cache 一直保持暖
+  - 按廣播時間調節 poll 頻率：節目（平日／星期日）開播後 DAEMON_HOT_HOURS 小時內，
+    未收到嗰集就每 DAEMON_HOT_INTERVAL 秒 poll 一次；收到之後或者其他時間每 DAEMON_COLD_INTERVAL 秒一次
+  - 合併發佈：有新集數之後，等到下一次 poll 冇再多嘢（或者已經等咗 DAEMON_PUBLISH_MAX_DELAY 秒），
+    先一次過生成 RSS、推去 GitHub（publish_github batch 模式）同發 Telegram 通知
+用法：python3 update_daemon.py [--once]
+（SIGTERM / Ctrl-C 會等目前一輪完成、發佈埋未發佈嘅更新先退出）
+"""
+import argparse
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+# config 會載入 .env，要喺其他本地模組之前 import
+import config
+import run_update
+import generate_rss
+import http_client
+import publish_github
+import report
+import telemetry
+
+logger = run_update.logger
+
+# ── 設定 ──────────────────────────────────────────────
+TZ = ZoneInfo('Asia/Hong_Kong')
+# 有節目嘅日子（星期一 = 0）同開播時間（香港時間）
+BROADCAST_DAYS = {int(d) for d in os.environ.get('DAEMON_BROADCAST_DAYS', '0,1,2,3,4,6').split(',')}
+BROADCAST_TIME = os.environ.get('DAEMON_BROADCAST_TIME', '22:30')
+DAEMON_HOT_HOURS = float(os.environ.get('DAEMON_HOT_HOURS', '6'))
+DAEMON_HOT_INTERVAL = int(os.environ.get('DAEMON_HOT_INTERVAL', '600'))
+DAEMON_COLD_INTERVAL = int(os.environ.get('DAEMON_COLD_INTERVAL', str(3 * 3600)))
+DAEMON_PUBLISH_MAX_DELAY = int(os.environ.get('DAEMON_PUBLISH_MAX_DELAY', '1800'))
+# 兩次 poll 之間最少隔幾耐（避免窗口邊界附近密集 poll）
+DAEMON_MIN_INTERVAL = 60
+
+# 合併統計時逐個加埋嘅欄位
+_SUMMED = ('new_episodes', 'downloaded', 'uploaded', 'failed', 'duration_seconds', 'transcode_cpu_seconds')
+
+
+def broadcast_start(day):
+    """day（date）嗰日開播時間（aware datetime）"""
+    hour, minute = (int(x) for x in BROADCAST_TIME.split(':'))
+    return datetime(day.year, day.month, day.day, hour, minute, tzinfo=TZ)
+
+
+def hot_window(now, received_through):
+    """
+    now 係咪喺某集「開播後、未收到」嘅窗口入面；返回該集日期或 None
+    received_through：last_checked 日期（呢日或之前嘅集數已經處理過）
+    """
+    for back in (0, 1):  # 窗口可能跨過午夜
+        day = (now - timedelta(days=back)).date()
+        if day.weekday() not in BROADCAST_DAYS or day <= received_through:
+            continue
+        start = broadcast_start(day)
+        if start <= now < start + timedelta(hours=DAEMON_HOT_HOURS):
+            return day
+    return None
+
+
+def next_window_start(now):
+    for ahead in range(8):
+        day = (now + timedelta(days=ahead)).date()
+        if day.weekday() in BROADCAST_DAYS and broadcast_start(day) > now:
+            return broadcast_start(day)
+    return now + timedelta(seconds=DAEMON_COLD_INTERVAL)
+
+
+def next_poll_delay(now, received_through):
+    """下一次 poll 要等幾多秒"""
+    if hot_window(now, received_through):
+        return DAEMON_HOT_INTERVAL
+    until_window = (next_window_start(now) - now).total_seconds()
+    return max(DAEMON_MIN_INTERVAL, min(DAEMON_COLD_INTERVAL, until_window))
+
+
+def received_through():
+    last_checked = run_update.load_json(run_update.LAST_CHECKED_FILE, {})
+    return run_update.parse_date(last_checked.get('last_checked_date', '')) or datetime.min.date()
+
+
+def merge_stats(pending, stats):
+    """將今輪統計併入等緊發佈嘅統計"""
+    if pending is None:
+        pending = {k: 0 for k in _SUMMED}
+        pending.update({'uploaded_titles': [], 'episodes': [], 'cycles': 0})
+    for k in _SUMMED:
+        pending[k] = round(pending[k] + stats.get(k, 0), 3)
+    pending['uploaded_titles'] += stats.get('uploaded_titles', [])
+    pending['episodes'] += stats.get('episodes', [])
+    pending['stage_summary'] = telemetry.summarise_stages(pending['episodes'])
+    pending['cycles'] += 1
+    return pending
+
+
+def publish(pending):
+    """生成 RSS → 一個 commit 推去 GitHub → Telegram 通知"""
+    logger.info(f'[daemon] 發佈 {pending["cycles"]} 輪累積嘅更新（上傳 {pending["uploaded"]} 集）')
+    if not generate_rss.generate_rss_incremental():
+        logger.error('[daemon] 生成 RSS 失敗，下一輪再試')
+        return False
+    if publish_github.TOKEN:
+        try:
+            publish_github.publish_batch(publish_github.publish_names())
+        except Exception as e:
+            logger.error(f'[daemon] GitHub 發佈失敗，下一輪再試: {e}')
+            return False
+    mapping = report.load_json(run_update.IA_MAPPING_FILE, None)
+    if pending['uploaded'] or pending['failed']:
+        report.send_telegram(report.build_message(pending, len(mapping) if mapping is not None else '?'))
+    return True
+
+
+def run(stop, once=False):
+    pending = None
+    pending_since = None
+    while not stop.is_set():
+        http_client.reset_latency_stats()
+        try:
+            stats = run_update.main()
+        except Exception:
+            logger.exception('[daemon] 更新失敗')
+            stats = None
+
+        changed = bool(stats and (stats['new_episodes'] or stats['uploaded']))
+        if changed:
+            pending = merge_stats(pending, stats)
+            pending_since = pending_since or time.monotonic()
+        # 今輪冇再多新嘢 = 一批新集數已經齊，即刻發佈；一直有新嘢就最多等 DAEMON_PUBLISH_MAX_DELAY
+        settled = stats is not None and not changed
+        if pending and (settled or once or time.monotonic() - pending_since >= DAEMON_PUBLISH_MAX_DELAY):
+            if publish(pending):
+                pending = pending_since = None
+        if once:
+            break
+
+        now = datetime.now(TZ)
+        delay = next_poll_delay(now, received_through())
+        if pending:
+            # 等緊合併發佈：快啲再 poll 一次確認冇更多新集數
+            delay = min(delay, DAEMON_HOT_INTERVAL)
+        logger.info(f'[daemon] 下次檢查: {(now + timedelta(seconds=delay)).strftime("%Y-%m-%d %H:%M")}'
+                    f'（{int(delay)} 秒後）')
+        stop.wait(delay)
+
+    if pending:
+        publish(pending)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='常駐模式：按廣播時間自動 poll、合併發佈')
+    parser.add_argument('--once', action='store_true', help='只行一輪（更新 + 有需要就發佈）')
+    args = parser.parse_args()
+
+    stop = threading.Event()
+    for sig in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(sig, lambda *_: stop.set())
+    logger.info(f'[daemon] 啟動：節目日 {sorted(BROADCAST_DAYS)} {BROADCAST_TIME}，'
+                f'開播後 {DAEMON_HOT_HOURS:g} 小時內每 {DAEMON_HOT_INTERVAL} 秒檢查，其他時間每 {DAEMON_COLD_INTERVAL} 秒')
+    run(stop, args.once)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())